@@ -1,17 +1,213 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Iterable
 import pygame.midi
 
-pygame.midi.init()
-
 INSTRUMENT: int = 1
 
-midi_port = pygame.midi.get_default_output_id()
-midi_output = pygame.midi.Output(midi_port)
-midi_output.set_instrument(INSTRUMENT)
+# PortMidi only honours message timestamps when the output is opened with a latency above 0
+OUTPUT_LATENCY: int = 1
+
+# milliseconds between submitting a phrase and its first note, so the whole phrase is queued in time
+SCHEDULE_LEAD: int = 20
+
+# pygame.midi.Output.write accepts at most this many messages per call
+MAX_WRITE: int = 1024
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+# opened on first use by get_output, so importing this module does not touch MIDI devices
+_output = None
+_output_time = pygame.midi.time
+
+
+class NullOutput:
+    '''
+    NullOutput is used when there is no output device at all. It discards everything.
+    '''
+
+    @staticmethod
+    def time() -> int:
+        return int(time.perf_counter() * 1000)
+
+    def set_instrument(self, instrument_id: int, channel: int = 0) -> None:
+        pass
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        pass
+
+    def note_off(self, note: int, velocity: int = 0, channel: int = 0) -> None:
+        pass
+
+    def write(self, data: list) -> None:
+        pass
+
+
+def _open_synth():
+    # imported here, the synth pulls in pygame.mixer and NumPy only when it is needed
+    import synth
+
+    try:
+        return synth.SynthOutput()
+    except (pygame.error, OSError): # no audio device either, or the bank cannot be cached
+        return NullOutput()
+
+
+def _open_default_output():
+    if not pygame.midi.get_init():
+        pygame.midi.init()
+
+    midi_port = pygame.midi.get_default_output_id()
+
+    if midi_port == -1:
+        return _open_synth()
+
+    try:
+        output = pygame.midi.Output(midi_port, latency=OUTPUT_LATENCY)
+    except pygame.midi.MidiException:
+        return _open_synth()
+
+    output.set_instrument(INSTRUMENT)
+
+    return output
+
+
+def get_output():
+    '''
+    get_output returns the output notes are written to, opening the default MIDI
+    output the first time. Without a MIDI output device the built-in synth is
+    used, and a NullOutput if there is no audio device either.
+    '''
+    if _output is None:
+        use_output(_open_default_output())
+
+    return _output
+
+
+def output_time() -> int:
+    '''
+    output_time returns the current time of the output's clock in milliseconds.
+    '''
+    get_output()
+
+    return _output_time()
 
 
 def note_on(note: int, velocity: int = 127) -> None:
-    midi_output.note_on(note, velocity)
+    get_output().note_on(note, velocity)
 
 
 def note_off(note: int) -> None:
-    midi_output.note_off(note, 0)
+    get_output().note_off(note, 0)
+
+
+def use_output(output) -> None:
+    '''
+    use_output replaces the output that notes are written to, None goes back to
+    the default device. Outputs other than pygame.midi.Output provide their own
+    time() in milliseconds.
+    '''
+    global _output, _output_time
+
+    _output = output
+    _output_time = getattr(output, "time", pygame.midi.time)
+
+
+@dataclass
+class PhraseNote:
+    note: int
+    start: float # seconds after the start of the phrase
+    duration: float # seconds
+    velocity: int = 127
+
+
+def melody(notes: Iterable[int], note_length: float) -> list[PhraseNote]:
+    '''
+    melody returns a phrase playing the given notes one after another.
+    '''
+    return [PhraseNote(note, i * note_length, note_length) for i, note in enumerate(notes)]
+
+
+def phrase_messages(phrase: Iterable[PhraseNote], start: int) -> list[list]:
+    '''
+    phrase_messages returns the timestamped MIDI messages of a phrase starting at
+    start milliseconds, ordered by time. A note off is ordered before a note on
+    with the same timestamp so repeated notes are not cut short.
+    '''
+    timed = []
+
+    for n in phrase:
+        on = start + round(n.start * 1000)
+        off = start + round((n.start + n.duration) * 1000)
+
+        timed.append((on, 1, [NOTE_ON, n.note, n.velocity]))
+        timed.append((off, 0, [NOTE_OFF, n.note, 0]))
+
+    timed.sort(key=lambda t: (t[0], t[1]))
+
+    return [[message, timestamp] for timestamp, _, message in timed]
+
+
+def play_phrase(phrase: Iterable[PhraseNote]) -> asyncio.Future[None]:
+    '''
+    play_phrase writes a whole phrase to the output at once with every message
+    timestamped, so the timing does not depend on how busy the event loop is.
+    The returned future finishes when the last note has ended.
+    '''
+    start = output_time() + SCHEDULE_LEAD
+    messages = phrase_messages(phrase, start)
+
+    output = get_output()
+
+    for i in range(0, len(messages), MAX_WRITE):
+        output.write(messages[i:i + MAX_WRITE])
+
+    end = messages[-1][1] if messages else start
+
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+    loop.call_later(max(0, end - output_time()) / 1000, _finish, finished)
+
+    return finished
+
+
+def _finish(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class RecordingOutput:
+    '''
+    RecordingOutput stands in for a MIDI output and records every message with
+    the time it would be played at, for measuring timing in tests.
+    Timestamps are milliseconds on the time.perf_counter clock.
+    '''
+
+    def __init__(self):
+        self.messages: list[tuple[int, list[int]]] = []
+        self.writes = 0
+
+    @staticmethod
+    def time() -> int:
+        return int(time.perf_counter() * 1000)
+
+    def set_instrument(self, instrument_id: int, channel: int = 0) -> None:
+        pass
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        self.messages.append((self.time(), [NOTE_ON | channel, note, velocity]))
+
+    def note_off(self, note: int, velocity: int = 0, channel: int = 0) -> None:
+        self.messages.append((self.time(), [NOTE_OFF | channel, note, velocity]))
+
+    def write(self, data: list) -> None:
+        self.writes += 1
+        now = self.time()
+
+        # like PortMidi, messages with a timestamp in the past are played right away
+        self.messages.extend((max(timestamp, now), message) for message, timestamp in data)
+
+    def note_ons(self) -> list[tuple[int, int]]:
+        return [(timestamp, message[1]) for timestamp, message in self.messages if message[0] & 0xF0 == NOTE_ON and message[2] > 0]
@@ -0,0 +1,11 @@
+'''
+Headless benchmarks. Every module has a run() function returning a flat dict
+of measurements, python -m benchmarks runs all of them and saves the results
+as JSON.
+'''
+import os
+
+# SDL's dummy drivers let the render benchmarks run without a display or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
@@ -0,0 +1,89 @@
+'''
+Runs every benchmark and saves the results as JSON.
+
+    python -m benchmarks [--only render dispatch ...] [--output FILE] [--compare FILE]
+
+With --compare, every measurement is printed next to the one from an earlier run.
+'''
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+import traceback
+
+import pygame
+
+
+SUITES = ["render", "dispatch", "midi_input", "playback", "notes", "startup", "sessions", "text", "synth", "pitch", "results", "midi_file"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the headless benchmark suite.")
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="results file of an earlier run")
+
+    return parser.parse_args()
+
+
+def run_suites(names: list[str]) -> dict[str, dict]:
+    results = {}
+
+    for name in names:
+        print(f"running {name}...", file=sys.stderr)
+
+        try:
+            results[name] = importlib.import_module(f"benchmarks.{name}").run()
+        except Exception: # a broken suite should not lose the results of the others
+            results[name] = {"error": traceback.format_exc()}
+
+    return results
+
+
+def print_results(results: dict[str, dict], previous: dict[str, dict] | None) -> None:
+    for suite, measurements in results.items():
+        print(suite)
+
+        for name, value in measurements.items():
+            if not isinstance(value, (int, float)):
+                print(f"  {name}: {value}")
+                continue
+
+            line = f"  {name:>32}: {value:12.3f}"
+            old = (previous or {}).get(suite, {}).get(name)
+
+            if isinstance(old, (int, float)) and old:
+                line += f"  (was {old:.3f}, x{value / old:.2f})"
+
+            print(line)
+
+
+def main() -> None:
+    args = parse_args()
+
+    previous = None
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    results = run_suites(args.only)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_results(results, previous)
+
+
+if __name__ == "__main__":
+    main()
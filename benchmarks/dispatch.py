@@ -0,0 +1,79 @@
+'''
+Micro-benchmark for Context.fire_events.
+
+Registers a growing number of handlers for unrelated event types next to a
+single gather on KeyEvent and measures the cost of firing a KeyEvent. With the
+dispatch table the cost should stay flat as the handler count grows. Also
+compares a subscription filtered by a lambda with one using the declarative
+key and pressing filters.
+
+Run from the repository root with: python -m benchmarks.dispatch
+'''
+import asyncio
+import timeit
+from dataclasses import dataclass
+
+import pygame
+
+from context import Context
+from events import Event, KeyEvent, KeystrokeEvent
+
+
+HANDLER_COUNTS = [1, 10, 100, 1000, 10000]
+FIRES = 20000
+
+
+@dataclass
+class _UnrelatedEvent(Event):
+    pass
+
+
+async def _noop(_):
+    pass
+
+
+async def _measure(n_handlers: int) -> float:
+    ctx = Context(pygame.Surface((1, 1)))
+
+    for i in range(n_handlers):
+        ctx.register_event_handler(KeystrokeEvent if i % 2 else _UnrelatedEvent, _noop)
+
+    ctx.begin_gather(KeyEvent, 1)
+    event = KeyEvent(60, 127, True)
+
+    seconds = min(timeit.repeat(lambda: ctx.fire_events(event), number=FIRES, repeat=5))
+
+    return seconds / FIRES * 1e9
+
+
+async def _measure_filter(declarative: bool) -> float:
+    ctx = Context(pygame.Surface((1, 1)))
+
+    if declarative:
+        ctx.subscribe(KeyEvent, keys=range(60, 72), pressing=True)
+    else:
+        ctx.subscribe(KeyEvent, lambda e: e.pressing and 60 <= e.key < 72)
+
+    # rejected by the filter, so the queue stays empty
+    event = KeyEvent(40, 127, True)
+
+    seconds = min(timeit.repeat(lambda: ctx.fire_events(event), number=FIRES, repeat=5))
+
+    return seconds / FIRES * 1e9
+
+
+def run() -> dict[str, float]:
+    '''Returns the nanoseconds per fire_events call, keyed by handler count or filter kind.'''
+    async def measure_all():
+        result = {f"{n}_handlers_ns": await _measure(n) for n in HANDLER_COUNTS}
+        result["filter_lambda_ns"] = await _measure_filter(False)
+        result["filter_declarative_ns"] = await _measure_filter(True)
+
+        return result
+
+    return asyncio.run(measure_all())
+
+
+if __name__ == "__main__":
+    for name, ns in run().items():
+        print(f"{name:>22}: {ns:8.1f} ns/event")
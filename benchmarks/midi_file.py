@@ -0,0 +1,87 @@
+'''
+Benchmark for reading Standard MIDI Files: opening a large multi-track file,
+taking its first phrase, and decoding every track, in megabytes and notes per
+second.
+
+Run from the repository root with: python -m benchmarks.midi_file
+'''
+import os
+import random
+import tempfile
+import time
+
+from midi_file import MidiFile, write_midi_file
+
+
+TRACKS = 16
+NOTES_PER_TRACK = 20_000
+PHRASE_LENGTH = 4
+
+
+def _write_corpus(path: str) -> int:
+    rng = random.Random(0)
+    conductor = [(0, b"\xff\x51\x03\x07\xa1\x20")]
+    tracks = [conductor]
+
+    for channel in range(TRACKS):
+        track = []
+        tick = 0
+
+        for _ in range(NOTES_PER_TRACK):
+            key = rng.randint(36, 96)
+            length = rng.choice([120, 240, 480])
+            track += [(tick, bytes([0x90 | channel % 16, key, rng.randint(40, 127)])), (tick + length, bytes([0x80 | channel % 16, key, 0]))]
+            tick += length
+
+        tracks.append(track)
+
+    write_midi_file(path, tracks)
+
+    return TRACKS * NOTES_PER_TRACK
+
+
+def run() -> dict[str, float]:
+    '''Returns open and first phrase times in milliseconds and decoding throughput.'''
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.mid")
+        n_notes = _write_corpus(path)
+        megabytes = os.path.getsize(path) / 1_000_000
+
+        start = time.perf_counter()
+        midi = MidiFile(path)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        next(midi.phrases(PHRASE_LENGTH))
+        first_phrase_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+
+        for track in range(len(midi.tracks)):
+            for _ in midi.messages(track):
+                pass
+
+        decode_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+
+        for track in range(len(midi.tracks)):
+            for _ in midi.notes(track):
+                pass
+
+        notes_seconds = time.perf_counter() - start
+        midi.close()
+
+    return {
+        "file_mb": megabytes,
+        "open_ms": open_ms,
+        "first_phrase_ms": first_phrase_ms,
+        "decode_mb_per_s": megabytes / decode_seconds,
+        "decode_notes_per_s": n_notes / decode_seconds,
+        "notes_per_s": n_notes / notes_seconds,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>20}: {value:12.3f}")
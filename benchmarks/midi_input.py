@@ -0,0 +1,99 @@
+'''
+Benchmark for the MIDI reader thread against FakeMidiInput.
+
+Measures how many messages per second reach the asyncio loop when the device
+is flooded, the latency from feeding a single message to its dispatch, and
+the cost of packing and decoding messages on the loop.
+
+Run from the repository root with: python -m benchmarks.midi_input
+'''
+import asyncio
+import time
+import timeit
+
+from midi_input import FakeMidiInput, MidiReader, decode_packed, pack
+
+
+BURST_MESSAGES = 200000
+LATENCY_SAMPLES = 200
+DECODE_MESSAGES = 100000
+
+
+async def _throughput() -> float:
+    device = FakeMidiInput()
+    received = 0
+    done = asyncio.Event()
+
+    def dispatch(batch):
+        nonlocal received
+        received += len(batch)
+
+        if received == BURST_MESSAGES:
+            done.set()
+
+    device.feed([[0x90, i % 128, 100, 0] for i in range(BURST_MESSAGES)])
+
+    reader = MidiReader(device, asyncio.get_running_loop(), dispatch)
+    start = time.perf_counter()
+    reader.start()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    reader.stop()
+
+    return BURST_MESSAGES / elapsed
+
+
+async def _latency() -> list[float]:
+    device = FakeMidiInput()
+    latencies = []
+    sent_at = 0.0
+    arrived = asyncio.Event()
+
+    def dispatch(_):
+        latencies.append(time.perf_counter() - sent_at)
+        arrived.set()
+
+    reader = MidiReader(device, asyncio.get_running_loop(), dispatch)
+    reader.start()
+
+    for _ in range(LATENCY_SAMPLES):
+        arrived.clear()
+        await asyncio.sleep(0.002)
+        sent_at = time.perf_counter()
+        device.feed([[0x90, 60, 100, 0]])
+        await arrived.wait()
+
+    reader.stop()
+
+    return sorted(latencies)
+
+
+def _decode_ns() -> dict[str, float]:
+    # a trill with the sustain pedal and the pitch wheel moving
+    statuses = [0x90, 0x80, 0xB0, 0xE0]
+    messages = [[[statuses[i % 4], 60 + i % 2, 100, 0], i] for i in range(DECODE_MESSAGES)]
+    packed = pack(messages)
+
+    return {
+        "pack_ns_per_message": min(timeit.repeat(lambda: pack(messages), number=1, repeat=5)) / DECODE_MESSAGES * 1e9,
+        "decode_ns_per_message": min(timeit.repeat(lambda: decode_packed(packed), number=1, repeat=5)) / DECODE_MESSAGES * 1e9,
+    }
+
+
+def run() -> dict[str, float]:
+    '''Returns the throughput in messages per second, latency percentiles in milliseconds and decoding costs in nanoseconds.'''
+    async def measure():
+        latencies = await _latency()
+
+        return {
+            "messages_per_second": await _throughput(),
+            "latency_ms_p50": latencies[len(latencies) // 2] * 1000,
+            "latency_ms_p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        }
+
+    return {**asyncio.run(measure()), **_decode_ns()}
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name}: {value:.3f}")
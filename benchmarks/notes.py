@@ -0,0 +1,62 @@
+'''
+Benchmark for note conversion: the lookup-table scalar functions and the NumPy
+batch functions in notes.py against the original computation they replaced,
+and advancing scrolling notes in a NotePool against a list of tuples.
+
+Run from the repository root with: python -m benchmarks.notes
+'''
+import timeit
+
+import numpy as np
+
+import notes
+from note_pool import NotePool
+
+
+N_NOTES = 100000
+
+# notes on the staff at once when comparing the per-frame update
+N_SCROLLING = 256
+
+
+def run() -> dict[str, float]:
+    '''Returns the nanoseconds per converted note of each implementation.'''
+    batch = np.random.default_rng(0).integers(0, 128, N_NOTES)
+    values = batch.tolist()
+
+    cases = {
+        "diatonic_computed": lambda: [notes._compute_chromatic_to_diatonic(n) for n in values],
+        "diatonic_scalar": lambda: [notes.chromatic_to_diatonic(n) for n in values],
+        "diatonic_batch": lambda: notes.chromatic_to_diatonic_batch(batch),
+        "name_computed": lambda: [notes._compute_format_note_as_str(n, False) for n in values],
+        "name_scalar": lambda: [notes.format_note_as_str(n) for n in values],
+        "name_batch": lambda: notes.format_notes_as_str(batch),
+        "is_black_scalar": lambda: [notes.is_black(n) for n in values],
+        "is_black_batch": lambda: notes.is_black_batch(batch),
+    }
+
+    result = {name: min(timeit.repeat(case, number=1, repeat=5)) / N_NOTES * 1e9 for name, case in cases.items()}
+
+    # the update staffwars did before NotePool: rebuilding a list of (note, offset) every frame
+    scrolling = [(n, 1.0) for n in values[:N_SCROLLING]]
+
+    def advance_list():
+        nonlocal scrolling
+        scrolling = [(note, offset - 1e-9) for note, offset in scrolling if offset >= 0]
+
+    pool = NotePool(N_SCROLLING)
+
+    for n in values[:N_SCROLLING]:
+        pool.spawn(n, 0.0)
+
+    frames = N_NOTES // N_SCROLLING
+
+    for name, case in {"advance_list": advance_list, "advance_pool": lambda: pool.advance(1e-9)}.items():
+        result[name] = min(timeit.repeat(case, number=frames, repeat=5)) / (frames * N_SCROLLING) * 1e9
+
+    return result
+
+
+if __name__ == "__main__":
+    for name, ns in run().items():
+        print(f"{name:>18}: {ns:8.2f} ns/note")
@@ -0,0 +1,79 @@
+'''
+Benchmark for pitch input: the CPU cost of analysing one block of audio, and
+the latency from a note starting in the audio to its key event, measured in
+audio time on a generated melody read from a WAV file.
+
+Run from the repository root with: python -m benchmarks.pitch
+'''
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import pitch_input
+
+
+NOTES = [48, 55, 60, 64, 67, 72, 76, 79]
+NOTE_SECONDS = 0.4
+REST_SECONDS = 0.1
+
+
+def _melody() -> tuple[np.ndarray, list[float]]:
+    rate = pitch_input.SAMPLE_RATE
+    t = np.arange(int(NOTE_SECONDS * rate)) / rate
+    rest = np.zeros(int(REST_SECONDS * rate))
+    parts, onsets = [], []
+
+    for note in NOTES:
+        onsets.append(sum(len(part) for part in parts) / rate * 1000)
+        parts += [0.3 * np.sin(2 * np.pi * 440 * 2 ** ((note - 69) / 12) * t), rest]
+
+    return np.concatenate(parts), onsets
+
+
+def run() -> dict[str, float]:
+    '''Returns block costs and detection latencies in milliseconds.'''
+    samples, onsets = _melody()
+    path = os.path.join(tempfile.mkdtemp(), "melody.wav")
+    pitch_input.write_wav(path, samples)
+
+    try:
+        source = pitch_input.WavSource(path)
+        tracker = pitch_input.PitchTracker(source.sample_rate)
+        block_times = []
+        detected = [] # audio ms at which each press was reported, and its timestamp
+
+        while (block := source.read()) is not None:
+            start = time.perf_counter()
+            events = tracker.process(block)
+            block_times.append(time.perf_counter() - start)
+
+            reported = tracker.buffer.written / source.sample_rate * 1000
+            detected += [(reported, event.timestamp) for event in events if event.pressing]
+
+        source.close()
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+    if len(detected) != len(onsets):
+        raise RuntimeError(f"detected {len(detected)} of {len(onsets)} notes")
+
+    latencies = [reported - onset for (reported, _), onset in zip(detected, onsets)]
+    errors = [abs(timestamp - onset) for (_, timestamp), onset in zip(detected, onsets)]
+    block_times.sort()
+
+    return {
+        "block_audio_ms": pitch_input.BLOCK_SIZE / pitch_input.SAMPLE_RATE * 1000,
+        "block_cpu_ms_mean": sum(block_times) / len(block_times) * 1000,
+        "block_cpu_ms_p99": block_times[int(len(block_times) * 0.99)] * 1000,
+        "detection_latency_ms_mean": sum(latencies) / len(latencies),
+        "detection_latency_ms_max": max(latencies),
+        "timestamp_error_ms_max": max(errors),
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>26}: {value:8.3f}")
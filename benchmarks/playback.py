@@ -0,0 +1,79 @@
+'''
+Benchmark comparing the note onset timing of sleep-driven playback against
+audio.play_phrase while the event loop is busy, using audio.RecordingOutput.
+
+Run from the repository root with: python -m benchmarks.playback
+'''
+import asyncio
+import time
+
+import audio
+
+
+NOTES = [60, 62, 64, 65, 67, 69, 71, 72] * 4
+NOTE_LENGTH = 0.05
+FRAME_TIME = 0.012
+
+
+async def _busy_frames(stop: asyncio.Event) -> None:
+    # stands in for a render loop that blocks for a whole frame at a time
+    while not stop.is_set():
+        end = time.perf_counter() + FRAME_TIME
+        while time.perf_counter() < end:
+            pass
+        await asyncio.sleep(0)
+
+
+async def _sleep_driven(output: audio.RecordingOutput) -> int:
+    start = output.time()
+
+    for note in NOTES:
+        audio.note_on(note, 127)
+        await asyncio.sleep(NOTE_LENGTH)
+        audio.note_off(note)
+
+    return start
+
+
+async def _scheduled(output: audio.RecordingOutput) -> int:
+    start = output.time() + audio.SCHEDULE_LEAD
+    await audio.play_phrase(audio.melody(NOTES, NOTE_LENGTH))
+
+    return start
+
+
+async def _onset_errors(play) -> list[float]:
+    output = audio.RecordingOutput()
+    audio.use_output(output)
+
+    stop = asyncio.Event()
+    busy = asyncio.create_task(_busy_frames(stop))
+    start = await play(output)
+    stop.set()
+    await busy
+
+    onsets = [timestamp for timestamp, _ in output.note_ons()]
+
+    return sorted(abs(onset - (start + i * NOTE_LENGTH * 1000)) for i, onset in enumerate(onsets))
+
+
+def run() -> dict[str, float]:
+    '''Returns the median and maximum onset error in milliseconds of both playback methods.'''
+    async def measure():
+        result = {}
+
+        for name, play in [("sleep", _sleep_driven), ("scheduled", _scheduled)]:
+            errors = await _onset_errors(play)
+            result[f"{name}_error_ms_p50"] = errors[len(errors) // 2]
+            result[f"{name}_error_ms_max"] = errors[-1]
+
+        audio.use_output(None)
+
+        return result
+
+    return asyncio.run(measure())
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name}: {value:.1f}")
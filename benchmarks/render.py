@@ -0,0 +1,81 @@
+'''
+Benchmark for frame rendering: filling the window, drawing a staff with a
+number of notes and drawing the keyboard emulator, at several window sizes.
+Every case is measured redrawing and presenting the whole window, and through
+the compositor, which only repaints and presents the regions that changed.
+
+Run from the repository root with: python -m benchmarks.render
+'''
+import random
+import timeit
+
+import pygame
+
+from compositor import Compositor
+from context import Context, VisualNote, TREBLE_CLEFF
+from emulator import KeyboardEmulator
+
+
+WINDOW_SIZES = [(800, 600), (1280, 720), (1920, 1080), (3840, 2160)]
+NOTE_COUNTS = [0, 4, 16, 64]
+FRAMES = 200
+
+
+def _staff_rect(surface: pygame.surface.Surface) -> pygame.rect.Rect:
+    surf_width, surf_height = surface.get_size()
+
+    return pygame.rect.Rect(surf_width * 0.1, surf_height / 2 - surf_width * 0.05, surf_width * 0.8, surf_width * 0.1)
+
+
+def _frame_ms(size: tuple[int, int], n_notes: int, composited: bool) -> float:
+    window = pygame.display.set_mode(size)
+    compositor = Compositor(window) if composited else None
+    ctx = Context(window, compositor)
+    keyboard = KeyboardEmulator(window, compositor)
+    rng = random.Random(n_notes)
+    notes = [VisualNote(rng.randint(48, 84), pygame.color.Color(0, 0, 0), i / max(1, n_notes)) for i in range(n_notes)]
+    frame = 0
+
+    def render():
+        nonlocal frame
+        frame += 1
+
+        # press a different key every frame so keyboard repaints are included
+        keyboard.keys_pressed = {frame % 88}
+
+        if compositor is not None:
+            compositor.begin_frame()
+        else:
+            window.fill((255, 255, 255))
+
+        ctx.brush.draw_staff(TREBLE_CLEFF, 30, _staff_rect(window), notes)
+        keyboard.draw()
+
+        if compositor is not None:
+            compositor.present()
+        else:
+            pygame.display.update()
+
+    render()
+
+    return min(timeit.repeat(render, number=FRAMES, repeat=3)) / FRAMES * 1000
+
+
+def run() -> dict[str, float]:
+    '''Returns milliseconds per frame keyed by window size and note count.'''
+    pygame.display.init()
+
+    try:
+        return {
+            f"{width}x{height}_{n_notes}_notes{'_composited' if composited else ''}_ms": _frame_ms((width, height), n_notes, composited)
+            for width, height in WINDOW_SIZES
+            for n_notes in NOTE_COUNTS
+            for composited in (False, True)
+        }
+    finally:
+        pygame.display.quit()
+
+
+if __name__ == "__main__":
+    for name, ms in run().items():
+        print(f"{name:>39}: {ms:7.3f}")
@@ -0,0 +1,70 @@
+'''
+Benchmark for the results store: the cost of recording a result on the render
+thread, how fast queued results are written to the file, and the aggregate
+queries over a year of one student's history.
+
+Run from the repository root with: python -m benchmarks.results
+'''
+import os
+import random
+import tempfile
+import time
+import timeit
+
+import results
+from results import ResultStore
+
+
+HISTORY = 200_000
+RECORDS = 10_000
+STUDENTS = 20
+YEAR = 365 * 24 * 3600
+
+
+def run() -> dict[str, float]:
+    '''Returns recording costs in microseconds and write and query times in milliseconds.'''
+    with tempfile.TemporaryDirectory() as directory:
+        store = ResultStore(os.path.join(directory, "results.sqlite"))
+        rng = random.Random(0)
+        now = time.time()
+
+        # a history spread over a year, written directly rather than through the queue
+        rows = [
+            (f"student{rng.randrange(STUDENTS)}", "staffwars", i // 100, now - rng.uniform(0, YEAR), rng.randint(48, 72), rng.randint(-12, 12), rng.random() < 0.8, None)
+            for i in range(HISTORY)
+        ]
+
+        with store._db:
+            store._db.executemany(results.INSERT, rows)
+
+        notes = [rng.randint(48, 72) for _ in range(RECORDS)]
+        start = time.perf_counter()
+
+        for note in notes:
+            store.record("student0", "staffwars", -1, note, True, 2, 500.0)
+
+        record_us = (time.perf_counter() - start) / RECORDS * 1_000_000
+
+        start = time.perf_counter()
+        store.flush()
+        flush_ms = (time.perf_counter() - start) * 1000
+
+        month = now - YEAR / 12
+        by_note_ms = min(timeit.repeat(lambda: store.accuracy_by_note("student0", since=month), number=10, repeat=3)) / 10 * 1000
+        by_interval_ms = min(timeit.repeat(lambda: store.accuracy_by_interval("student0"), number=10, repeat=3)) / 10 * 1000
+        sessions_ms = min(timeit.repeat(lambda: store.sessions("student0"), number=10, repeat=3)) / 10 * 1000
+
+        store.close()
+
+    return {
+        "record_us": record_us,
+        f"flush_{RECORDS}_ms": flush_ms,
+        "accuracy_by_note_month_ms": by_note_ms,
+        "accuracy_by_interval_year_ms": by_interval_ms,
+        "sessions_year_ms": sessions_ms,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>30}: {value:8.3f}")
@@ -0,0 +1,71 @@
+'''
+Benchmark for the session host: runs a growing number of staffwars sessions on
+one loop, each with a fake MIDI keyboard playing a note every 100 ms, rendering
+every frame at 30 fps. From the cost per session it estimates how many sessions
+one process and the whole machine sustain.
+
+Run from the repository root with: python -m benchmarks.sessions
+'''
+import asyncio
+import os
+
+import audio
+from midi_input import FakeMidiInput
+from sessions import SessionHost
+
+
+SESSION_COUNTS = [1, 10, 30, 60]
+DURATION = 2
+FPS = 30
+KEY_INTERVAL = 0.1
+
+
+async def _measure(n_sessions: int) -> dict[str, float]:
+    host = SessionHost(FPS)
+    devices = [FakeMidiInput() for _ in range(n_sessions)]
+
+    for device in devices:
+        host.add("staffwars", device)
+
+    async def play():
+        note = 0
+
+        while True:
+            for device in devices:
+                device.feed([[0x90, 48 + note % 22, 100, 0], [0x80, 48 + note % 22, 0, 0]])
+
+            note += 1
+            await asyncio.sleep(KEY_INTERVAL)
+
+    player = asyncio.create_task(play())
+    stats = await host.run(DURATION)
+    player.cancel()
+
+    return {
+        f"{n_sessions}_sessions_tick_ms": stats.tick_ms_mean,
+        f"{n_sessions}_sessions_tick_ms_p95": stats.tick_ms_p95,
+        f"{n_sessions}_sessions_late_frames": stats.late_frames / max(1, stats.frames),
+    }
+
+
+def run() -> dict[str, float]:
+    '''Returns frame times by session count and the estimated sessions per process and per machine.'''
+    audio.use_output(audio.NullOutput())
+    result = {}
+
+    for n_sessions in SESSION_COUNTS:
+        result.update(asyncio.run(_measure(n_sessions)))
+
+    largest = SESSION_COUNTS[-1]
+    ms_per_session = result[f"{largest}_sessions_tick_ms_p95"] / largest
+    per_process = int(1000 / FPS / ms_per_session)
+
+    result["sessions_per_process"] = per_process
+    result["sessions_per_machine"] = per_process * (os.cpu_count() or 1)
+
+    return result
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>28}: {value:8.3f}")
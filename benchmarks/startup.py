@@ -0,0 +1,54 @@
+'''
+Benchmark for startup time: a fresh interpreter importing the engine modules
+and opening a window, and main.py from launch to its first presented frame.
+
+Run from the repository root with: python -m benchmarks.startup
+'''
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+REPEAT = 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import pygame
+import audio, context, emulator, frames, game_loader, midi_input, notes
+pygame.display.init()
+pygame.display.set_mode((800, 600))
+print(time.perf_counter() - start)
+"""
+
+
+def run() -> dict[str, float]:
+    '''Returns the best process, in-process and first frame startup times in milliseconds.'''
+    process_times = []
+    import_times = []
+    first_frame_times = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        process_times.append(time.perf_counter() - start)
+        import_times.append(float(output.split()[-1]))
+
+        output = subprocess.run([sys.executable, MAIN, "playnotes", "--quit-after", "1", "--frame-stats"], capture_output=True, text=True, check=True).stdout
+        first_frame_times.append(json.loads(output.splitlines()[-1])["startup_ms"])
+
+    return {
+        "process_ms": min(process_times) * 1000,
+        "import_and_window_ms": min(import_times) * 1000,
+        "first_frame_ms": min(first_frame_times),
+    }
+
+
+if __name__ == "__main__":
+    for name, ms in run().items():
+        print(f"{name}: {ms:.1f}")
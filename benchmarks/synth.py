@@ -0,0 +1,69 @@
+'''
+Benchmark for the built-in synth under SDL's dummy audio driver: loading the
+sample bank from its cache, mixing a block with every voice sounding, and the
+latency from note_on to the note's block being queued while playing.
+
+Run from the repository root with: python -m benchmarks.synth
+'''
+import shutil
+import tempfile
+import time
+import timeit
+
+import synth
+
+
+MIX_BLOCKS = 100
+NOTES = 50
+NOTE_INTERVAL = 0.02
+
+
+def run() -> dict[str, float]:
+    '''Returns the bank load times and mixing costs in milliseconds.'''
+    cache_dir = tempfile.mkdtemp()
+
+    try:
+        start = time.perf_counter()
+        synth.load_bank(synth.SAMPLE_RATE, cache_dir)
+        render_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        synth.load_bank(synth.SAMPLE_RATE, cache_dir)
+        cached_ms = (time.perf_counter() - start) * 1000
+
+        output = synth.SynthOutput(cache_dir=cache_dir)
+        output.close() # mixed by hand first
+
+        def sound_every_voice():
+            for note in range(48, 48 + synth.MAX_VOICES):
+                output.note_on(note, 100)
+
+            output.mix_block()
+
+        # fewer blocks than a note of the bank lasts, so every voice sounds throughout
+        full_mix_ms = min(timeit.repeat(output.mix_block, setup=sound_every_voice, number=MIX_BLOCKS, repeat=5)) / MIX_BLOCKS * 1000
+
+        output = synth.SynthOutput(cache_dir=cache_dir)
+
+        for i in range(NOTES):
+            output.note_on(48 + i % 24, 100)
+            time.sleep(NOTE_INTERVAL)
+            output.note_off(48 + i % 24)
+
+        stats = output.stats()
+        output.close()
+    finally:
+        shutil.rmtree(cache_dir)
+
+    return {
+        "bank_render_ms": render_ms,
+        "bank_cached_ms": cached_ms,
+        "block_ms": output.block_ms,
+        f"mix_{synth.MAX_VOICES}_voices_ms": full_mix_ms,
+        **stats,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>22}: {value:8.3f}")
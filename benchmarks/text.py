@@ -0,0 +1,40 @@
+'''
+Benchmark for Brush.draw_text: drawing the same label every frame through the
+text cache against rendering it with the font each time.
+
+Run from the repository root with: python -m benchmarks.text
+'''
+import timeit
+
+import pygame
+
+from context import Brush, get_font, text_cache
+
+
+DRAWS = 5000
+LABEL = "score 1200   hits 12   missed 3"
+
+
+def run() -> dict[str, float]:
+    '''Returns microseconds per drawn label, cached and uncached.'''
+    surface = pygame.Surface((800, 600))
+    brush = Brush(surface)
+    font = get_font("monospace", 24, False, False)
+
+    def uncached():
+        surface.blit(font.render(LABEL, True, (0, 0, 0)), (10, 10))
+
+    def cached():
+        brush.draw_text("monospace", 24, LABEL, (10, 10), (0, 0, 0))
+
+    text_cache.clear()
+
+    return {
+        "uncached_us": min(timeit.repeat(uncached, number=DRAWS, repeat=3)) / DRAWS * 1e6,
+        "cached_us": min(timeit.repeat(cached, number=DRAWS, repeat=3)) / DRAWS * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    for name, us in run().items():
+        print(f"{name:>12}: {us:8.2f} us/label")
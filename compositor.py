@@ -0,0 +1,179 @@
+from typing import Hashable
+import pygame
+from pygame import Rect
+
+
+# more dirty rects than this in a frame, after merging overlapping ones, are presented as their bounding rect
+MAX_UPDATE_RECTS = 32
+
+# overlapping rects are merged when their union is at most this much larger than both together
+MERGE_SLACK = 1.25
+
+
+def merge_rects(rects: list[Rect]) -> list[Rect]:
+    '''
+    merge_rects replaces rects that overlap by their union, so regions of
+    things that moved a little since the previous frame are presented once.
+    Rects whose union would mostly cover regions neither of them does, like a
+    row and a column crossing, are kept apart.
+    '''
+    merged: list[Rect] = []
+
+    for rect in rects:
+        merging = True
+
+        while merging:
+            merging = False
+
+            for index in rect.collidelistall(merged):
+                other = merged[index]
+                union = rect.union(other)
+
+                if union.w * union.h <= (rect.w * rect.h + other.w * other.h) * MERGE_SLACK:
+                    del merged[index]
+                    rect = union
+                    merging = True
+                    break
+
+        merged.append(rect)
+
+    return merged
+
+
+class Compositor:
+    '''
+    Compositor keeps track of what changed on a surface from one frame to the
+    next, so a frame only repaints and presents those regions instead of
+    filling and uploading the whole window.
+
+    Content that stays the same over many frames, like the lines of a staff or
+    the keyboard, is drawn with draw_static into a cached static layer. It is
+    only drawn again when it is new, its surface or position changed, or it
+    reports a changed region. Static content lies beneath everything else.
+    Everything else is drawn straight onto the surface every frame and reported
+    with damage. At the start of the next frame the static layer is copied back
+    over those regions, which erases them.
+
+    Static content that is not drawn in a frame is removed, by rebuilding the
+    whole frame on the next one. needs_frame tells when that is pending.
+    '''
+
+    def __init__(self, surface: pygame.surface.Surface, background=(255, 255, 255)):
+        self.surface = surface
+        self.background = background
+        self._layer: pygame.surface.Surface | None = None
+        self._static: dict[Hashable, tuple[pygame.surface.Surface, Rect]] = {}
+        self._declared: set[Hashable] = set()
+        self._drawn: list[Rect] = [] # regions drawn over the static layer this frame
+        self._previous_drawn: list[Rect] = []
+        self._dirty: list[Rect] = []
+        self._rebuild = True
+        self._full = False # the whole surface was repainted this frame
+
+    @property
+    def needs_frame(self) -> bool:
+        return self._rebuild
+
+    def invalidate(self) -> None:
+        '''
+        invalidate makes the next frame repaint and present the whole surface,
+        for when the window contents were lost or the surface was drawn on
+        without reporting it.
+        '''
+        self._rebuild = True
+
+    def begin_frame(self) -> None:
+        '''
+        begin_frame erases what was drawn over the static layer in the
+        previous frame. Call it where a frame would fill the window.
+        '''
+        if self._layer is None or self._layer.get_size() != self.surface.get_size():
+            self._rebuild = True
+
+        if self._rebuild:
+            self._layer = pygame.surface.Surface(self.surface.get_size(), 0, self.surface)
+            self._layer.fill(self.background)
+            self._static.clear()
+            self.surface.fill(self.background)
+            self._rebuild = False
+            self._full = True
+        else:
+            for rect in self._previous_drawn:
+                self.surface.blit(self._layer, rect, rect)
+
+            self._dirty.extend(self._previous_drawn)
+
+        self._declared = set()
+        self._drawn = []
+
+    def damage(self, rect: Rect) -> None:
+        '''
+        damage reports a region of the surface that was drawn on this frame.
+        '''
+        rect = Rect(rect).clip(self.surface.get_rect())
+
+        if rect:
+            self._drawn.append(rect)
+            self._dirty.append(rect)
+
+    def draw_static(self, key: Hashable, surface: pygame.surface.Surface, position: tuple[float, float], changed: Rect | None = None) -> None:
+        '''
+        draw_static draws surface at position as static content identified by
+        key. Drawing the same surface at the same position again does nothing,
+        unless changed reports a region of surface that was painted since.
+        '''
+        assert self._layer is not None, "draw_static called outside a frame"
+        self._declared.add(key)
+        rect = surface.get_rect(topleft=position)
+        entry = self._static.get(key)
+
+        if entry is None or entry[0] is not surface or entry[1] != rect:
+            if entry is not None:
+                # what the old one covered is uncovered by rebuilding the next frame
+                self._rebuild = True
+
+            self._static[key] = (surface, rect)
+            self._layer.blit(surface, rect)
+            self.surface.blit(surface, rect)
+            self._dirty.append(rect.clip(self.surface.get_rect()))
+        elif changed is not None:
+            self._repaint(Rect(changed).move(rect.topleft).clip(rect))
+
+    def _repaint(self, rect: Rect) -> None:
+        self._layer.fill(self.background, rect)
+
+        for surface, item_rect in self._static.values():
+            clipped = item_rect.clip(rect)
+
+            if clipped:
+                self._layer.blit(surface, clipped, clipped.move(-item_rect.x, -item_rect.y))
+
+        self.surface.blit(self._layer, rect, rect)
+        self._dirty.append(rect)
+
+    def present(self) -> list[Rect] | None:
+        '''
+        present updates the display with the regions that changed this frame
+        and returns them, or None if the whole display was updated.
+        '''
+        if self._static.keys() - self._declared:
+            self._rebuild = True
+
+        rects = merge_rects([rect for rect in self._dirty if rect])
+        self._dirty = []
+
+        # restored next frame as merged regions, fewer and larger blits are cheaper
+        self._previous_drawn = merge_rects(self._drawn)
+
+        if self._full:
+            self._full = False
+            pygame.display.update()
+            return None
+
+        if len(rects) > MAX_UPDATE_RECTS:
+            rects = [rects[0].unionall(rects[1:])]
+
+        if rects:
+            pygame.display.update(rects)
+
+        return rects
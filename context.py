@@ -1,11 +1,16 @@
 import asyncio
-from dataclasses import dataclass
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from functools import cache
 from math import ceil
 import pygame
-from typing import Type, TypeVar, Callable, Iterable
-from events import Event
-from notes import chromatic_to_diatonic
+from typing import Generic, Type, TypeVar, Callable, Iterable
+from compositor import Compositor
+from events import Event, KeyEvent
+from notes import chromatic_to_diatonic, chromatic_to_diatonic_batch
+from note_pool import NotePool
 
 
 
@@ -28,14 +33,69 @@ def _queue_to_list(q: asyncio.Queue[T]) -> list[T]:
         return result
 
 
-pygame.font.init()
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
 
 
 @cache
 def get_font(fontname: str, size: int, bold: bool, italic: bool):
+    if not pygame.font.get_init():
+        pygame.font.init()
+
     return pygame.font.SysFont(fontname, size, bold, italic)
 
 
+@cache
+def load_image(filename: str) -> pygame.surface.Surface:
+    return pygame.image.load(os.path.join(IMAGES_DIR, filename))
+
+
+TEXT_CACHE_SIZE = 256
+
+
+class TextCache:
+    '''
+    TextCache keeps the most recently rendered text surfaces, keyed on font,
+    size, style, text, color and antialiasing, up to capacity of them. The
+    least recently used surface is dropped when it is full. hits and misses
+    count lookups since the cache was created.
+    '''
+
+    def __init__(self, capacity: int = TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._surfaces: OrderedDict[tuple, pygame.surface.Surface] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, fontname: str, size: int, text: str, color, bold: bool = False, italic: bool = False, antialias: bool = True) -> pygame.surface.Surface:
+        # normalized so that (0, 0, 0), "black" and Color(0, 0, 0) share an entry
+        key = (fontname, size, bold, italic, text, tuple(pygame.Color(color)), antialias)
+        surface = self._surfaces.get(key)
+
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = get_font(fontname, size, bold, italic).render(text, antialias, color)
+        self._surfaces[key] = surface
+
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+
+        return surface
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+
+
+# shared by every brush, rendered text does not depend on the surface it is drawn on
+text_cache = TextCache()
+
+
 @dataclass
 class VisualNote:
     note: int
@@ -43,104 +103,308 @@ class VisualNote:
     offset: float | None = None
 
 
-@dataclass
+@dataclass(eq=False)
 class Clef:
     g_position: int
     lines: int
-    symbol: pygame.surface.Surface
+    symbol_file: str
     poke_out_point: int
     dip_point: int
 
+    @property
+    def symbol(self) -> pygame.surface.Surface:
+        return load_image(self.symbol_file)
+
 
 TREBLE_CLEFF = Clef(
     g_position=2,
     lines=5,
-    symbol=pygame.image.load('images/treble_cleff.png'),
+    symbol_file='treble_cleff.png',
     poke_out_point=110,
     dip_point=432
 )
 
 
-sharp_img = pygame.image.load("images/sharp.png")
+SHARP_FILE = "sharp.png"
+
+
+EXTRA_LINE_JUT_OUT = 0.2
 
 
 def _interpolate(val: float, from_low: float, from_high: float, to_low: float, to_high: float):
     return (val - from_low) / (from_high - from_low) * (to_high - to_low) + to_low
 
 
+def _display_format(surface: pygame.surface.Surface) -> pygame.surface.Surface:
+    # convert_alpha needs a display mode, which headless tools may not have set
+    if pygame.display.get_surface() is None:
+        return surface
+
+    return surface.convert_alpha()
+
+
+def _draw_horizontal_lines(surface: pygame.surface.Surface, y_start: int, line_offset: int, n_lines: int, x_start: int, x_end: int, thickness: int) -> list[pygame.rect.Rect]:
+    rects = []
+
+    for i in range(n_lines):
+        y = y_start + line_offset * i
+        rects.append(pygame.draw.line(surface, (0, 0, 0), (x_start, y), (x_end, y), thickness))
+
+    return rects
+
+
+@dataclass
+class _StaffLayout:
+    '''
+    Everything about a staff that only depends on the clef, line offset and rect.
+    static_surface holds the pre-rendered staff lines, the clef and sharp glyphs are
+    pre-scaled in display format.
+    '''
+    y_start: int
+    y_end: int
+    line_thickness: int
+    note_width: float
+    remaining_x_start: float
+    remaining_width: float
+    static_surface: pygame.surface.Surface
+    static_position: tuple[int, int]
+    clef_symbol: pygame.surface.Surface
+    clef_position: tuple[int, float]
+    sharp_symbol: pygame.surface.Surface
+
+
+def _layout_staff(clef: Clef, line_offset: int, rect: pygame.rect.Rect) -> _StaffLayout:
+    x, y, width, height = rect
+    line_thickness = ceil(line_offset * 0.05)
+
+    y_start = int(y + 0.5 * (height - (clef.lines - 1) * line_offset)) # (n - 1) spaces for n lines
+    y_end = y_start + line_offset * (clef.lines - 1)
+
+    clef_width, clef_height = clef.symbol.get_size()
+
+    clef_start = _interpolate(0, clef.poke_out_point, clef.dip_point, y_start, y_end)
+    clef_end = _interpolate(clef_height, clef.poke_out_point, clef.dip_point, y_start, y_end)
+
+    new_height = clef_end - clef_start
+    new_width = new_height * (clef_width / clef_height)
+
+    scaled_clef = pygame.transform.scale(clef.symbol, (new_width, new_height))
+
+    note_width = line_offset * 1.25
+
+    remaining_x_start = x + new_width
+    remaining_width = x + width - remaining_x_start - note_width * (1 + EXTRA_LINE_JUT_OUT) - note_width * EXTRA_LINE_JUT_OUT
+
+    sharp_symbol = pygame.transform.scale(load_image(SHARP_FILE), (int(line_offset * 0.75), line_offset * 1.5))
+
+    # the staff lines may stick out of rect, so the static layer covers all of them
+    top = min(y, y_start - line_thickness)
+    bottom = max(y + height, y_end + line_thickness + 1)
+
+    static_surface = pygame.surface.Surface((width + 1, bottom - top), pygame.SRCALPHA)
+    _draw_horizontal_lines(static_surface, y_start - top, line_offset, clef.lines, 0, width, line_thickness)
+
+    return _StaffLayout(
+        y_start=y_start,
+        y_end=y_end,
+        line_thickness=line_thickness,
+        note_width=note_width,
+        remaining_x_start=remaining_x_start,
+        remaining_width=remaining_width,
+        static_surface=_display_format(static_surface),
+        static_position=(x, top),
+        clef_symbol=_display_format(scaled_clef),
+        clef_position=(x, clef_start),
+        sharp_symbol=_display_format(sharp_symbol),
+    )
+
+
 @dataclass
 class Brush:
+    '''
+    Brush draws onto a surface. With a compositor, the staff lines are drawn
+    as static content and everything else reports the region it drew on.
+    '''
     surface: pygame.surface.Surface
+    compositor: Compositor | None = None
+    _staff_cache: dict[tuple, _StaffLayout] = field(default_factory=dict, init=False, repr=False)
+    _staff_cache_size: tuple[int, int] | None = field(default=None, init=False, repr=False)
 
     def draw_text(self, fontname: str, size: int, text: str, position: tuple[int, int], color, bold: bool = False, italic: bool = False, antialias: bool = True):
-        rendered_text = get_font(fontname, size, bold, italic).render(text, antialias, color)
-        self.surface.blit(rendered_text, position)
+        rendered_text = text_cache.render(fontname, size, text, color, bold, italic, antialias)
+        self.damage(self.surface.blit(rendered_text, position))
 
-    def _draw_horizontal_lines(self, y_start: int, line_offset: int, n_lines: int, x_start: int, x_end: int, thickness: int):
-        for i in range(n_lines):
-            y = y_start + line_offset * i
-            pygame.draw.line(self.surface, (0, 0, 0), (x_start, y), (x_end, y), thickness)
+    def damage(self, rect: pygame.rect.Rect) -> None:
+        '''
+        damage reports a region drawn on without the brush to the compositor,
+        so it is presented and erased again on the next frame.
+        '''
+        if self.compositor is not None:
+            self.compositor.damage(rect)
+
+    def prewarm_text(self, fontname: str, size: int, texts: Iterable[str], color, bold: bool = False, italic: bool = False, antialias: bool = True) -> None:
+        '''
+        prewarm_text renders texts into the text cache without drawing them, so a
+        game can render the labels or glyphs it will draw while it starts up.
+        '''
+        for text in texts:
+            text_cache.render(fontname, size, text, color, bold, italic, antialias)
 
-    def draw_staff(self, clef: Clef, line_offset: int, rect: pygame.rect.Rect, notes: Iterable[VisualNote]):
-        x, y, width, height = rect
-        line_thickness = ceil(line_offset * 0.05)
+    def _get_staff_layout(self, clef: Clef, line_offset: int, rect: pygame.rect.Rect) -> _StaffLayout:
+        surface_size = self.surface.get_size()
 
-        y_start = int(y + 0.5 * (height - (clef.lines - 1) * line_offset)) # (n - 1) spaces for n lines
+        if surface_size != self._staff_cache_size:
+            # staff rects are derived from the window size, so a resize makes every entry stale
+            self._staff_cache.clear()
+            self._staff_cache_size = surface_size
 
-        self._draw_horizontal_lines(y_start, line_offset, clef.lines, x, x + width, line_thickness)
+        key = (clef, line_offset, tuple(rect))
+        layout = self._staff_cache.get(key)
 
-        y_end = y_start + line_offset * (clef.lines - 1)
+        if layout is None:
+            layout = _layout_staff(clef, line_offset, rect)
+            self._staff_cache[key] = layout
+
+        return layout
+
+    def draw_staff(self, clef: Clef, line_offset: int, rect: pygame.rect.Rect, notes: Iterable[VisualNote] | NotePool):
+        '''
+        draw_staff draws a staff with the clef and the given notes. notes is either
+        VisualNotes or a NotePool, whose positions are computed for all notes at once.
+        '''
+        rect = pygame.rect.Rect(rect)
+        layout = self._get_staff_layout(clef, line_offset, rect)
 
-        clef_width, clef_height = clef.symbol.get_size()
+        if self.compositor is not None:
+            self.compositor.draw_static(("staff", clef, line_offset, tuple(rect)), layout.static_surface, layout.static_position)
+        else:
+            self.surface.blit(layout.static_surface, layout.static_position)
 
-        clef_start = _interpolate(0, clef.poke_out_point, clef.dip_point, y_start, y_end)
-        clef_end = _interpolate(clef_height, clef.poke_out_point, clef.dip_point, y_start, y_end)
+        if isinstance(notes, NotePool):
+            slots = notes.active()
+            diatonic, sharp = chromatic_to_diatonic_batch(notes.pitch[slots])
+            note_x = EXTRA_LINE_JUT_OUT * layout.note_width + layout.remaining_x_start + (notes.offset[slots] * layout.remaining_width).astype(int)
 
-        new_height = clef_end - clef_start
-        new_width = new_height * (clef_width / clef_height)
+            for where_note, x, is_sharp in zip((clef.g_position + diatonic - 32).tolist(), note_x.tolist(), sharp.tolist()):
+                self._draw_note(layout, clef, line_offset, where_note, x, is_sharp, notes.color)
+        else:
+            for n in notes:
+                if n.offset is not None:
+                    diatonic, is_sharp = chromatic_to_diatonic(n.note)
+                    note_x = EXTRA_LINE_JUT_OUT * layout.note_width + layout.remaining_x_start + int(n.offset * layout.remaining_width)
 
-        scaled_clef = pygame.transform.scale(clef.symbol, (new_width, new_height))
+                    self._draw_note(layout, clef, line_offset, clef.g_position + (diatonic - 32), note_x, is_sharp, n.color)
 
-        note_width = line_offset * 1.25
+        # the clef covers notes passing under it, so it is drawn over them every time
+        self.damage(self.surface.blit(layout.clef_symbol, layout.clef_position))
 
-        extra_line_jut_out = 0.2
+    def _draw_note(self, layout: _StaffLayout, clef: Clef, line_offset: int, where_note: int, note_x: float, sharp: bool, color) -> None:
+        note_width = layout.note_width
+        note_y = layout.y_end - (line_offset / 2) * (where_note + 1)
 
-        remaining_x_start = x + new_width
-        remaining_width = x + width - remaining_x_start - note_width * (1 + extra_line_jut_out) - note_width * extra_line_jut_out
+        note_rect = pygame.rect.Rect(note_x, note_y, note_width, line_offset)
 
-        sharp_symbol = pygame.transform.scale(sharp_img, (int(line_offset * 0.75), line_offset * 1.5))
+        line_start_x = int(note_x - note_width * EXTRA_LINE_JUT_OUT)
+        line_end_x = int(note_x + note_width * (1 + EXTRA_LINE_JUT_OUT))
 
-        for n in notes:
-            if n.offset is not None:
-                diatonic, sharp = chromatic_to_diatonic(n.note)
-                where_32 = clef.g_position
-                where_note = where_32 + (diatonic - 32)
+        if where_note <= -2:
+            # draw extra lines under staff
+            n_extra_lines = -where_note // 2
+            first_line = layout.y_end + line_offset
+            extra_lines = _draw_horizontal_lines(self.surface, first_line, line_offset, n_extra_lines, line_start_x, line_end_x, layout.line_thickness)
+        elif where_note >= clef.lines * 2:
+            # draw extra lines over staff
+            n_extra_lines = (where_note - (clef.lines - 1) * 2) // 2
+            first_line = layout.y_start - line_offset
+            extra_lines = _draw_horizontal_lines(self.surface, first_line, -line_offset, n_extra_lines, line_start_x, line_end_x, layout.line_thickness)
+        else:
+            extra_lines = []
 
-                note_x = extra_line_jut_out * note_width + remaining_x_start + int(n.offset * remaining_width)
-                note_y = y_end - (line_offset / 2) * (where_note + 1)
+        if sharp == True:
+            self.damage(self.surface.blit(layout.sharp_symbol, (note_x + note_width, note_y - line_offset * 0.25)))
 
-                note_rect = pygame.rect.Rect(note_x, note_y, note_width, line_offset)
+        # reported as one region, the note covers most of its extra lines
+        self.damage(pygame.draw.ellipse(self.surface, color, note_rect).unionall(extra_lines))
 
-                line_start_x = int(note_x - note_width * extra_line_jut_out)
-                line_end_x = int(note_x + note_width * (1 + extra_line_jut_out))
 
-                if where_note <= -2:
-                    # draw extra lines under staff
-                    n_extra_lines = -where_note // 2
-                    first_line = y_end + line_offset
-                    self._draw_horizontal_lines(first_line, line_offset, n_extra_lines, line_start_x, line_end_x, line_thickness)
-                elif where_note >= clef.lines * 2:
-                    # draw extra lines over staff
-                    n_extra_lines = (where_note - (clef.lines - 1) * 2) // 2
-                    first_line = y_start - line_offset
-                    self._draw_horizontal_lines(first_line, -line_offset, n_extra_lines, line_start_x, line_end_x, line_thickness)
+# put into a subscription's queue when it is closed, to end iterations waiting on it
+_CLOSED = object()
+
+
+class SubscriptionClosed(Exception):
+    '''
+    Raised by Subscription.get when the subscription is closed, including while
+    waiting for an event.
+    '''
+
+
+class Subscription(Generic[T]):
+    '''
+    Subscription is a long-lived stream of the events of one type fired on a
+    context, created with Context.subscribe. Events are queued until they are
+    taken with get, iterated over with async for, or taken all at once with drain.
+
+    keys and pressing are declarative filters on KeyEvents that the dispatcher
+    checks itself, without calling a Python function per event. event_filter is
+    called for events passing them. With max_size above 0 events arriving while
+    the queue is full are dropped.
+
+    A subscription stays registered until it is closed, which also ends any
+    iteration over it and makes get raise SubscriptionClosed. It can be used as
+    a context manager to close it on exit.
+    '''
 
-                if sharp == True:
-                    self.surface.blit(sharp_symbol, (note_x + note_width, note_y - line_offset * 0.25))
+    def __init__(self, ctx: "Context", subscription_id: int, eventType: Type[T], event_filter: Callable[[T], bool] | None, keys: range | None, pressing: bool | None, max_size: int):
+        self.ctx = ctx
+        self.id = subscription_id
+        self.eventType = eventType
+        self.event_filter = event_filter
+        self.keys = keys
+        self.pressing = pressing
+        self.max_size = max_size
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
 
-                pygame.draw.ellipse(self.surface, n.color, note_rect)
+    async def get(self) -> T:
+        event = await self.queue.get()
 
-        self.surface.blit(scaled_clef, (x, clef_start))
+        if event is _CLOSED:
+            self.queue.put_nowait(_CLOSED) # for the next waiter
+            raise SubscriptionClosed
+
+        return event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> T:
+        try:
+            return await self.get()
+        except SubscriptionClosed:
+            raise StopAsyncIteration from None
+
+    def drain(self) -> list[T]:
+        '''
+        drain returns the queued events and empties the queue.
+        '''
+        return [event for event in _queue_to_list(self.queue) if event is not _CLOSED]
+
+    def close(self) -> None:
+        self.ctx.unsubscribe(self.id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_Dispatch = tuple[tuple, tuple, tuple]
+
+
+@cache
+def _event_mro(event_type: type) -> frozenset[type]:
+    return frozenset(event_type.__mro__)
 
 
 class Context:
@@ -152,31 +416,116 @@ class Context:
     The difference between an event handler and a callback is that callbacks are
     only invoked once when a given event occurs, while event_handlers can be invoked
     many times.
+
+    The engine only renders a frame when the context is dirty. Events mark it dirty,
+    other changes to what a game draws must be announced by calling invalidate.
+
+    Registrations are stored by id. For every concrete event class that is fired,
+    the matching registrations are resolved once into a dispatch table entry which
+    is reused until a registration affecting that class is added or removed.
     '''
 
-    def __init__(self, surface: pygame.surface.Surface):
-        self.callbacks = []
-        self.event_handlers = []
-        self.await_queues = []
-        self.gather_queues = []
-        self.brush = Brush(surface)
+    def __init__(self, surface: pygame.surface.Surface, compositor: Compositor | None = None):
+        self.callbacks: dict[int, tuple[type, Callable]] = {}
+        self.event_handlers: dict[int, tuple[type, Callable]] = {}
+        self.subscriptions: dict[int, Subscription] = {}
+        self.brush = Brush(surface, compositor)
+        self.dirty = True
+        self.recorder: Callable[[Event], None] | None = None # sees every fired event first, see recording.py
+        self.device_clock: Callable[[], int] | None = None # milliseconds, the clock of the timestamps of input events
+        self.results: Callable[[int, bool, int | None, float | None], None] | None = None # see results.py
+        self.fire_timer: Callable[[float], None] | None = None # told the seconds every fire_events took, see instrumentation.py
+        self._dispatch_table: dict[type, _Dispatch] = {}
+
+    def _invalidate(self, eventType: type) -> None:
+        stale = [cls for cls in self._dispatch_table if eventType in _event_mro(cls)]
+
+        for cls in stale:
+            del self._dispatch_table[cls]
+
+    def _resolve(self, event_cls: type) -> _Dispatch:
+        mro = _event_mro(event_cls)
+
+        dispatch = (
+            tuple((i, coro) for i, (t, coro) in self.callbacks.items() if t in mro),
+            tuple(coro for t, coro in self.event_handlers.values() if t in mro),
+            tuple((s.pressing, s.keys, s.event_filter, s.max_size, s.queue) for s in self.subscriptions.values() if s.eventType in mro),
+        )
+        self._dispatch_table[event_cls] = dispatch
+
+        return dispatch
+
+    def clear(self) -> None:
+        '''
+        clear removes every callback, event handler and subscription registered on the context.
+        '''
+        self.callbacks.clear()
+        self.event_handlers.clear()
+
+        for subscription_id in list(self.subscriptions):
+            self.unsubscribe(subscription_id)
+
+        self._dispatch_table.clear()
+
+    def queue_depths(self) -> dict[str, int]:
+        '''
+        queue_depths returns how many events are waiting in subscriptions.
+        '''
+        return {"subscriptions": sum(s.queue.qsize() for s in self.subscriptions.values())}
+
+    def invalidate(self) -> None:
+        '''
+        invalidate requests that the next frame is rendered. Games that animate
+        call it from on_update to keep rendering every frame.
+        '''
+        self.dirty = True
+
+    def record_result(self, note: int, correct: bool, interval: int | None = None, response_ms: float | None = None) -> None:
+        '''
+        record_result saves whether the player got a note they were asked for
+        right, and optionally its interval in semitones from the previous note
+        asked for and how long they took to answer. Nothing is saved unless a
+        results store is attached.
+        '''
+        if self.results is not None:
+            self.results(note, correct, interval, response_ms)
+
+    def event_time(self, event: Event) -> float:
+        '''
+        event_time returns when an event happened on the event loop's clock. For
+        events with a device timestamp this is computed from the timestamp, so it
+        does not depend on how late the event was handled. Otherwise it is now.
+        '''
+        now = asyncio.get_running_loop().time()
+        timestamp = getattr(event, "timestamp", None)
+
+        if timestamp is None or self.device_clock is None:
+            return now
+
+        return now - max(0, self.device_clock() - timestamp) / 1000
 
     def cancel(self, handler_id: int) -> None:
         '''
         cancel removes an event handler with the given id from the event handler list,
         effectively preventing future invokations of the event handler.
         '''
-        self.event_handlers = list(filter(lambda h: h[0] != handler_id, self.event_handlers))
+        entry = self.event_handlers.pop(handler_id, None)
 
-    def register_event_handler(self, eventType: Type[Event], coro) -> None:
+        if entry is not None:
+            self._invalidate(entry[0])
+
+    def register_event_handler(self, eventType: Type[Event], coro) -> int:
         '''
         register_event_handler registers an event handler coroutine function into the
         event handler list. This coroutine will be invoked when the given event or
-        a subclass thereof occurs.
+        a subclass thereof occurs. The returned id can be passed to cancel.
         '''
         handler_id = generate_id()
         
-        self.event_handlers.append((handler_id, eventType, coro))
+        self.event_handlers[handler_id] = (eventType, coro)
+        self._invalidate(eventType)
+
+        return handler_id
 
     def register_callback(self, eventType: Type[Event], coro) -> None:
         '''
@@ -184,7 +533,8 @@ class Context:
         callback list. This coroutine will be invoked once when the given event or
         a subclass thereof occurs.
         '''
-        self.callbacks.append((eventType, coro))
+        self.callbacks[generate_id()] = (eventType, coro)
+        self._invalidate(eventType)
 
     def fire_events(self, event: Event) -> None:
         '''
@@ -195,71 +545,97 @@ class Context:
 
         Note that this function is meant to be called from the engine only.
         '''
-        remaining_callbacks = []
-        for eventType, coro in self.callbacks:
-            if isinstance(event, eventType):
-                asyncio.create_task(coro(event))
-            else:
-                remaining_callbacks.append((eventType, coro))
-
-        self.callbacks = remaining_callbacks
-
-        for _, eventType, coro in self.event_handlers:
-            if isinstance(event, eventType):
-                asyncio.create_task(coro(event))
-
-        for eventType, event_filter, queue in self.await_queues:
-            if isinstance(event, eventType) and event_filter(event):
-                try:
-                    queue.put_nowait(event)
-                except asyncio.QueueFull:
-                    pass
-
-        for _, eventType, event_filter, queue in self.gather_queues:
-            if isinstance(event, eventType) and event_filter(event):
-                try:
-                    queue.put_nowait(event)
-                except asyncio.QueueFull:
-                    pass
-                
-    Y = TypeVar("Y")
-    def begin_gather(self, eventType: Type[Y], max_amount: int = 0, event_filter: Callable[[Y], bool] = lambda _: True) -> int:
-        queue = asyncio.Queue(max_amount)
-        queue_id = generate_id()
-        self.gather_queues.append((queue_id, eventType, event_filter, queue))
-        
-        return queue_id
+        fire_timer = self.fire_timer
+        start = time.perf_counter() if fire_timer is not None else 0.0
+        self.dirty = True
 
-    def end_gather(self, queue_id: int) -> list[Event]: # type: ignore
-        result_tup = None
-        result = None
+        if self.recorder is not None:
+            self.recorder(event)
 
-        for tup in self.gather_queues:
-            current_id, _, _, queue = tup
-            if current_id == queue_id:
-                result = _queue_to_list(queue)
-                result_tup = tup
+        event_cls = type(event)
+        dispatch = self._dispatch_table.get(event_cls)
 
-        if result_tup is None or result is None:
-            raise ValueError
-        
-        self.gather_queues.remove(result_tup)
+        if dispatch is None:
+            dispatch = self._resolve(event_cls)
 
-        return result
+        callbacks, handlers, subscriptions = dispatch
 
+        for callback_id, coro in callbacks:
+            asyncio.create_task(coro(event))
+            eventType, _ = self.callbacks.pop(callback_id)
+            self._invalidate(eventType)
 
-    T = TypeVar("T")
-    async def await_events(self, eventType: Type[T], amount: int, event_filter: Callable[[T], bool] = lambda _: True) -> list[T]:
-        queue = asyncio.Queue(amount)
+        for coro in handlers:
+            asyncio.create_task(coro(event))
 
-        self.await_queues.append((eventType, event_filter, queue))
+        for pressing, keys, event_filter, max_size, queue in subscriptions:
+            if pressing is not None and event.pressing != pressing:
+                continue
 
-        results = []
+            if keys is not None and event.key not in keys:
+                continue
 
-        for _ in range(amount):
-            results.append(await queue.get())
+            if event_filter is not None and not event_filter(event):
+                continue
 
-        self.await_queues.remove((eventType, event_filter, queue))
-        
-        return results
+            if max_size and queue.qsize() >= max_size:
+                continue
+
+            queue.put_nowait(event)
+
+        if fire_timer is not None:
+            fire_timer(time.perf_counter() - start)
+
+    S = TypeVar("S")
+    def subscribe(self, eventType: Type[S], event_filter: Callable[[S], bool] | None = None, *, keys: range | None = None, pressing: bool | None = None, max_size: int = 0) -> Subscription[S]:
+        '''
+        subscribe returns a Subscription receiving every event of the given type
+        or a subclass thereof that passes the filters, until it is closed.
+        keys and pressing only apply to KeyEvents.
+        '''
+        if (keys is not None or pressing is not None) and not issubclass(eventType, KeyEvent):
+            raise ValueError("keys and pressing can only filter KeyEvents")
+
+        subscription = Subscription(self, generate_id(), eventType, event_filter, keys, pressing, max_size)
+        self.subscriptions[subscription.id] = subscription
+        self._invalidate(eventType)
+
+        return subscription
 
+    def unsubscribe(self, subscription_id: int) -> None:
+        '''
+        unsubscribe removes the subscription with the given id and ends iterations waiting on it.
+        '''
+        subscription = self.subscriptions.pop(subscription_id, None)
+
+        if subscription is None or subscription.closed:
+            return
+
+        subscription.closed = True
+        subscription.queue.put_nowait(_CLOSED)
+        self._invalidate(subscription.eventType)
+
+    Y = TypeVar("Y")
+    def begin_gather(self, eventType: Type[Y], max_amount: int = 0, event_filter: Callable[[Y], bool] | None = None) -> int:
+        return self.subscribe(eventType, event_filter, max_size=max_amount).id
+
+    def end_gather(self, queue_id: int) -> list[Event]: # type: ignore
+        subscription = self.subscriptions.get(queue_id)
+
+        if subscription is None:
+            raise ValueError(f"no gather with id {queue_id}")
+
+        subscription.close()
+
+        return subscription.drain()
+
+
+    T = TypeVar("T")
+    async def await_events(self, eventType: Type[T], amount: int, event_filter: Callable[[T], bool] | None = None) -> list[T]:
+        '''
+        await_events waits for the next amount events of the given type. Games
+        waiting for events over and over should keep a subscription instead.
+        Raises SubscriptionClosed if the context is cleared meanwhile.
+        '''
+        with self.subscribe(eventType, event_filter, max_size=amount) as subscription:
+            return [await subscription.get() for _ in range(amount)]
@@ -1,12 +1,38 @@
 import pygame
+from dataclasses import dataclass
 from math import ceil, floor
 from pygame import Rect
+from compositor import Compositor
+from events import KeyEvent
+
+N_WHITE_KEYS = 52
+WHITE_KEY_OFFSETS = (0, 2, 4, 5, 7, 9, 11)
+
+
+@dataclass
+class _KeyboardLayout:
+    '''
+    Geometry and pre-rendered surface of the keyboard for one window size.
+    Rects are relative to surface, which is blitted at origin.
+    '''
+    rect: Rect
+    origin: tuple[int, int]
+    surface: pygame.surface.Surface
+    hit_x: int
+    hit_table: list[tuple[int, int] | None]
+    key_rects: dict[int, Rect]
+
 
 class KeyboardEmulator:
-    def __init__(self, surf):
+    def __init__(self, surf, compositor: Compositor | None = None):
         self.surface = surf
-        self.keys_pressed = set([0, 2, 4, 5, 6, 9, 10])
+        self.compositor = compositor
+        self.keys_pressed: set[int] = set()
         self.width_factor = 0.75
+        self.mouse_down = False
+        self._layout: _KeyboardLayout | None = None
+        self._layout_size: tuple[int, int] | None = None
+        self._drawn_pressed: set[int] = set()
 
     def get_rect(self):
         surf_width, surf_height = self.surface.get_size()
@@ -18,106 +44,202 @@ class KeyboardEmulator:
 
         return Rect(keyboard_x, keyboard_y, keyboard_width, keyboard_height)
 
-    def draw_outline(self, keyboard_rect: Rect):
+    def _get_layout(self) -> _KeyboardLayout:
+        size = self.surface.get_size()
+
+        if self._layout is None or size != self._layout_size:
+            self._layout = self._build_layout()
+            self._layout_size = size
+            self._drawn_pressed = set()
+
+        return self._layout
+
+    def _build_layout(self) -> _KeyboardLayout:
+        keyboard_rect = self.get_rect()
         keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
-        pygame.draw.line(self.surface, (0, 0, 0), (keyboard_x, keyboard_y), (keyboard_x + keyboard_width, keyboard_y))
-        pygame.draw.line(self.surface, (0, 0, 0), (keyboard_x + keyboard_width, keyboard_y), (keyboard_x + keyboard_width, keyboard_y + keyboard_height))
-        pygame.draw.line(self.surface, (0, 0, 0), (keyboard_x + keyboard_width, keyboard_y + keyboard_height), (keyboard_x, keyboard_y + keyboard_height))
-        pygame.draw.line(self.surface, (0, 0, 0), (keyboard_x, keyboard_y + keyboard_height), (keyboard_x, keyboard_y))
-    
-    def white_to_midi(self, white_n: int) -> int:
-        octave = white_n // 7
-        midi = 12 * octave
+        origin_x, origin_y = floor(keyboard_x), floor(keyboard_y)
+
+        # keep the fractional part of the position so that the cached keyboard is
+        # rasterized exactly like one drawn straight onto the window
+        local_rect = Rect(keyboard_x - origin_x, keyboard_y - origin_y, keyboard_width, keyboard_height)
+        surface = pygame.surface.Surface((ceil(keyboard_x + keyboard_width) - origin_x + 1, ceil(keyboard_y + keyboard_height) - origin_y + 1))
+
+        self._paint(surface, local_rect, set())
+
+        key_width = keyboard_width / N_WHITE_KEYS
+        key_rects = {}
+
+        for i in range(N_WHITE_KEYS):
+            key_pos = local_rect.x + key_width * i
+            key_rects[self.white_to_midi(i)] = Rect(floor(key_pos) - 1, 0, ceil(key_width) + 3, surface.get_height())
+
+            if i % 7 not in [0, 3]:
+                black_key_pos = key_pos - key_width * 0.75 / 2
+                key_rects[self.white_to_midi(i) - 1] = Rect(floor(black_key_pos) - 1, 0, ceil(key_width * 0.75) + 3, ceil(keyboard_height / 2) + 2)
+
+        hit_x = floor(keyboard_x)
+        hit_table = [self._key_at_relative_x(x - keyboard_x, key_width) for x in range(hit_x, ceil(keyboard_x + keyboard_width) + 1)]
+
+        return _KeyboardLayout(
+            rect=keyboard_rect,
+            origin=(origin_x, origin_y),
+            surface=surface,
+            hit_x=hit_x,
+            hit_table=hit_table,
+            key_rects=key_rects,
+        )
+
+    def _key_at_relative_x(self, relative_x: float, key_width: float) -> tuple[int, int] | None:
+        '''
+        Returns the key covering the lower and upper half of the keyboard at relative_x.
+        '''
+        key_num = floor(relative_x / key_width)
+
+        if key_num >= N_WHITE_KEYS or key_num < 0:
+            return None
 
-        rest = white_n % 7
+        white = self.white_to_midi(key_num)
+        upper = white
 
-        midi += ({
-            0: 0,
-            1: 2,
-            2: 4,
-            3: 5,
-            4: 7,
-            5: 9,
-            6: 11,
-        })[rest]
+        if key_num % 7 not in [2, 6] and relative_x / key_width % 1 >= 0.625:
+            upper = white + 1
+        if key_num % 7 not in [0, 3] and relative_x / key_width % 1 <= 0.375:
+            upper = white - 1
 
+        return white, upper
 
-        return midi
+    def draw_outline(self, surface: pygame.surface.Surface, keyboard_rect: Rect):
+        keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
+        pygame.draw.line(surface, (0, 0, 0), (keyboard_x, keyboard_y), (keyboard_x + keyboard_width, keyboard_y))
+        pygame.draw.line(surface, (0, 0, 0), (keyboard_x + keyboard_width, keyboard_y), (keyboard_x + keyboard_width, keyboard_y + keyboard_height))
+        pygame.draw.line(surface, (0, 0, 0), (keyboard_x + keyboard_width, keyboard_y + keyboard_height), (keyboard_x, keyboard_y + keyboard_height))
+        pygame.draw.line(surface, (0, 0, 0), (keyboard_x, keyboard_y + keyboard_height), (keyboard_x, keyboard_y))
+
+    def white_to_midi(self, white_n: int) -> int:
+        return 12 * (white_n // 7) + WHITE_KEY_OFFSETS[white_n % 7]
 
-    def draw_keys(self, keyboard_rect: Rect):
+    def draw_keys(self, surface: pygame.surface.Surface, keyboard_rect: Rect, keys_pressed: set[int]):
         keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
 
-        n_keys = 52
-        key_width = keyboard_width / n_keys
+        key_width = keyboard_width / N_WHITE_KEYS
 
-        for i in range(n_keys):
+        for i in range(N_WHITE_KEYS):
             key_pos = keyboard_x + key_width * i
 
-            if self.white_to_midi(i) in self.keys_pressed:
+            if self.white_to_midi(i) in keys_pressed:
                 next_key_pos = keyboard_x + key_width * (i + 1)
                 current_key_width = ceil(next_key_pos - key_pos)
-                
-                pygame.draw.rect(self.surface, (180, 180, 180), Rect(key_pos, keyboard_y, current_key_width, keyboard_height))
+
+                pygame.draw.rect(surface, (180, 180, 180), Rect(key_pos, keyboard_y, current_key_width, keyboard_height))
 
             if i % 7 not in [0, 3]:
                 color = (0, 0, 0)
 
-                if self.white_to_midi(i) - 1 in self.keys_pressed:
+                if self.white_to_midi(i) - 1 in keys_pressed:
                     color = (70, 70, 70)
 
                 black_key_pos = key_pos - key_width * 0.75 / 2
-                pygame.draw.rect(self.surface, color, Rect(black_key_pos, keyboard_y, key_width * 0.75, keyboard_height / 2))
-    
-    def draw_key_outlines(self, keyboard_rect: Rect):
-        keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
+                pygame.draw.rect(surface, color, Rect(black_key_pos, keyboard_y, key_width * 0.75, keyboard_height / 2))
 
-        n_keys = 52
+    def draw_key_outlines(self, surface: pygame.surface.Surface, keyboard_rect: Rect):
+        keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
 
-        key_width = keyboard_width / n_keys
+        key_width = keyboard_width / N_WHITE_KEYS
 
-        for i in range(n_keys + 1):
+        for i in range(N_WHITE_KEYS + 1):
             outline_x = keyboard_x + key_width * i
             outline_y = keyboard_y
 
             if i % 7  not in [0, 3]:
                 outline_y += keyboard_height / 2
 
-            pygame.draw.line(self.surface, (0, 0, 0), (outline_x, outline_y), (outline_x, keyboard_y + keyboard_height))
+            pygame.draw.line(surface, (0, 0, 0), (outline_x, outline_y), (outline_x, keyboard_y + keyboard_height))
 
+    def _paint(self, surface: pygame.surface.Surface, keyboard_rect: Rect, keys_pressed: set[int]):
+        surface.fill((240, 240, 240), keyboard_rect)
+        self.draw_keys(surface, keyboard_rect, keys_pressed)
+        self.draw_outline(surface, keyboard_rect)
+        self.draw_key_outlines(surface, keyboard_rect)
 
     def draw(self):
-        keyboard_rect = self.get_rect()
+        '''
+        draw blits the cached keyboard onto the surface, first repainting the keys
+        whose pressed state changed since the previous draw. With a compositor the
+        keyboard is static content and only the repainted keys are drawn again.
+        '''
+        layout = self._get_layout()
+        changed = self.keys_pressed ^ self._drawn_pressed
+        dirty_rect = None
+
+        if changed:
+            dirty = [layout.key_rects[k] for k in changed if k in layout.key_rects]
+
+            if dirty:
+                dirty_rect = dirty[0].unionall(dirty[1:])
+                keyboard_x, keyboard_y, keyboard_width, keyboard_height = layout.rect
+                origin_x, origin_y = layout.origin
+                local_rect = Rect(keyboard_x - origin_x, keyboard_y - origin_y, keyboard_width, keyboard_height)
+
+                # repaint everything clipped to the changed keys, overlapping black keys
+                # and outlines included, so the result matches a full redraw
+                layout.surface.set_clip(dirty_rect)
+                self._paint(layout.surface, local_rect, self.keys_pressed)
+                layout.surface.set_clip(None)
+
+            self._drawn_pressed = set(self.keys_pressed)
+
+        if self.compositor is not None:
+            self.compositor.draw_static("keyboard", layout.surface, layout.origin, dirty_rect)
+        else:
+            self.surface.blit(layout.surface, layout.origin)
 
-        pygame.draw.rect(self.surface, (240, 240, 240), keyboard_rect)
-        self.draw_keys(keyboard_rect)
-        self.draw_outline(keyboard_rect)
-        self.draw_key_outlines(keyboard_rect)
-    
     def key_at_pos(self, pos) -> int | None:
-        keyboard_rect = self.get_rect()
-        keyboard_x, keyboard_y, keyboard_width, keyboard_height = keyboard_rect
-
-        n_keys = 52
+        layout = self._get_layout()
+        keyboard_y, keyboard_height = layout.rect.y, layout.rect.height
 
         pos_x, pos_y = pos
-        relative_x = pos_x - keyboard_x
         relative_y = pos_y - keyboard_y
 
-        key_width = keyboard_width / n_keys
+        if relative_y > keyboard_height or relative_y < 0:
+            return None
 
-        key_num = floor(relative_x / key_width)
+        index = floor(pos_x) - layout.hit_x
 
-        if key_num > 52 or key_num < 0 or relative_y > keyboard_height or relative_y < 0:
+        if index < 0 or index >= len(layout.hit_table) or layout.hit_table[index] is None:
             return None
-        
-        if key_num % 7 not in [2, 6]:
-            if relative_x / key_width % 1 >= 0.625 and relative_y <= keyboard_height / 2:
-                return self.white_to_midi(key_num) + 1
-        if key_num % 7 not in [0, 3]:
-            if relative_x / key_width % 1 <= 0.375 and relative_y <= keyboard_height / 2:
-                return self.white_to_midi(key_num) - 1
 
-        return self.white_to_midi(key_num)
+        white, upper = layout.hit_table[index]
+
+        return upper if relative_y <= keyboard_height / 2 else white
+
+    def handle_event(self, event: pygame.event.Event) -> list[KeyEvent]:
+        '''
+        handle_event updates the pressed keys from mouse button and motion events and
+        returns the key events that resulted from it. Keys pressed while dragging stay
+        pressed until the mouse button is released.
+        '''
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.mouse_down = True
+            return self._press(event.pos)
+
+        elif event.type == pygame.MOUSEMOTION and self.mouse_down:
+            return self._press(event.pos)
+
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.mouse_down = False
+            released = [KeyEvent(k, 0, False) for k in self.keys_pressed]
+            self.keys_pressed = set()
+
+            return released
+
+        return []
+
+    def _press(self, pos) -> list[KeyEvent]:
+        key = self.key_at_pos(pos)
 
+        if key is None or key in self.keys_pressed:
+            return []
 
+        self.keys_pressed.add(key)
 
+        return [KeyEvent(key, 127, True)]
@@ -1,20 +1,53 @@
 from dataclasses import dataclass
+import numpy as np
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     pass
 
-@dataclass
+@dataclass(slots=True)
 class MidiEvent(Event):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class KeyEvent(MidiEvent):
     key: int
     velocity: int
     pressing: bool
+    timestamp: int | None = None # milliseconds on the device clock, if the event came from one
+    channel: int = 0
 
-@dataclass
+@dataclass(slots=True)
+class ControlChangeEvent(MidiEvent):
+    controller: int # 64 is the sustain pedal
+    value: int
+    timestamp: int | None = None
+    channel: int = 0
+
+@dataclass(slots=True)
+class PitchBendEvent(MidiEvent):
+    value: int # -8192 to 8191, 0 is no bend
+    timestamp: int | None = None
+    channel: int = 0
+
+@dataclass(slots=True)
 class KeystrokeEvent(Event):
     key: int
     pressed_down: bool
+
+
+# a raw MIDI message as read from a device, packed
+MIDI_MESSAGE = np.dtype([("status", np.uint8), ("data1", np.uint8), ("data2", np.uint8), ("timestamp", np.int64)])
+
+@dataclass(slots=True, eq=False)
+class MidiBatchEvent(Event):
+    '''
+    MidiBatchEvent holds every message of one read from a MIDI device as an
+    array of MIDI_MESSAGE, for handlers that process input in bulk. It is fired
+    before the events decoded from the same messages. It is not a MidiEvent, so
+    handlers of MidiEvent do not see the messages twice.
+    '''
+    messages: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.messages)
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from math import ceil
+from collections import deque
+from dataclasses import dataclass, field
+import pygame
+
+
+@dataclass
+class FrameStats:
+    '''
+    FrameStats keeps the render times and frame-to-frame intervals of the most
+    recently presented frames.
+    '''
+    history: int = 600
+    frames: int = 0
+    idle_waits: int = 0
+    startup: float | None = None # seconds from launch to the first presented frame
+    render_times: deque[float] = field(init=False)
+    intervals: deque[float] = field(init=False)
+    _last_frame: float | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.render_times = deque(maxlen=self.history)
+        self.intervals = deque(maxlen=self.history)
+
+    def record(self, start: float, end: float) -> None:
+        self.frames += 1
+        self.render_times.append(end - start)
+
+        if self._last_frame is not None:
+            self.intervals.append(start - self._last_frame)
+
+        self._last_frame = start
+
+    def summary(self) -> dict[str, float]:
+        '''
+        summary returns the frame count, the average fps and render time percentiles
+        in milliseconds over the recorded history.
+        '''
+        render_times = sorted(self.render_times)
+        result: dict[str, float] = {"frames": self.frames, "idle_waits": self.idle_waits}
+
+        if self.startup is not None:
+            result["startup_ms"] = self.startup * 1000
+
+        if self.intervals:
+            result["fps"] = len(self.intervals) / sum(self.intervals)
+
+        if render_times:
+            result["render_ms_mean"] = sum(render_times) / len(render_times) * 1000
+            result["render_ms_p50"] = render_times[len(render_times) // 2] * 1000
+            result["render_ms_p95"] = render_times[int(len(render_times) * 0.95)] * 1000
+            result["render_ms_max"] = render_times[-1] * 1000
+
+        return result
+
+
+def _next_timer_delay(loop: asyncio.AbstractEventLoop) -> float | None:
+    '''
+    Returns the delay until the event loop has work to do, or None if nothing is scheduled.
+    Relies on the internals of asyncio's BaseEventLoop and reports 0 when those are absent.
+    '''
+    ready = getattr(loop, "_ready", None)
+    scheduled = getattr(loop, "_scheduled", None)
+
+    if ready is None or scheduled is None:
+        return 0
+    if ready:
+        return 0
+    if not scheduled:
+        return None
+
+    # _scheduled is a heap, its head is the earliest timer. The loop drops a cancelled
+    # head on its next iteration, so that is when the next timer is known.
+    head = scheduled[0]
+
+    if head.cancelled():
+        return 0
+
+    return max(0, head.when() - loop.time())
+
+
+class FrameScheduler:
+    '''
+    FrameScheduler paces the main loop at a target frame rate. When there is
+    nothing to render it blocks on pygame input instead, waking up in time for
+    the next pending asyncio timer so game coroutines are not delayed.
+
+    While it blocks, the whole asyncio loop does, so callbacks scheduled from
+    other threads with call_soon_threadsafe only run once something wakes it.
+    Every thread that hands work to the loop must also post a pygame event, as
+    MidiReader and PitchInput do through their wake callback.
+
+    An fps of 0 disables the frame cap.
+    '''
+
+    def __init__(self, fps: float, max_idle: float | None = None):
+        self.interval = 1 / fps if fps > 0 else 0
+        self.max_idle = max_idle
+        self.stats = FrameStats()
+        self._next_frame = time.perf_counter()
+
+    def frame_started(self) -> float:
+        now = time.perf_counter()
+        self._next_frame = max(self._next_frame + self.interval, now)
+
+        return now
+
+    def frame_finished(self, start: float) -> None:
+        self.stats.record(start, time.perf_counter())
+
+    async def _sleep_until(self, deadline: float) -> None:
+        # an overshoot of up to a millisecond does not add up, frames are due at fixed intervals
+        await asyncio.sleep(max(0, deadline - time.perf_counter()))
+
+    async def next_frame(self, idle: bool) -> list[pygame.event.Event]:
+        '''
+        next_frame waits until the next frame is due and returns the pygame events
+        that arrived meanwhile. If idle is true, it instead blocks until an input
+        event arrives or an asyncio timer is due, whichever comes first.
+        '''
+        if not idle:
+            await self._sleep_until(self._next_frame)
+            return pygame.event.get()
+
+        delay = _next_timer_delay(asyncio.get_running_loop())
+
+        if self.max_idle is not None:
+            delay = self.max_idle if delay is None else min(delay, self.max_idle)
+
+        # pygame.event.wait treats a timeout of 0 as "wait forever", so round up to whole milliseconds
+        if delay is None or delay > 0:
+            self.stats.idle_waits += 1
+            event = pygame.event.wait() if delay is None else pygame.event.wait(ceil(delay * 1000))
+
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events.extend(pygame.event.get())
+        else:
+            events = pygame.event.get()
+
+        await asyncio.sleep(0) # run whatever woke us up
+
+        return events
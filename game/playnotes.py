@@ -1,16 +1,25 @@
+'''
+Listen to a short melody and play it back.
+'''
 import asyncio
+from typing import Iterator
 import pygame
 from context import VisualNote, Context
 
 from events import KeyEvent
 from notes import note_from_str, generate_notes
 from context import TREBLE_CLEFF
+from midi_file import MidiFile
 
 import audio
 
 
 BASE_NOTE = note_from_str("C")
 SEQUENCE_LENGTH = 4
+NOTE_LENGTH = 1
+
+# a Standard MIDI File to take the phrases from, in the order they appear, instead of random notes, set by --midi-file
+MIDI_FILE: str | None = None
 
 to_draw: list[VisualNote] = []
 
@@ -20,28 +29,63 @@ def on_update(ctx: Context) -> None:
 
     ctx.brush.draw_staff(TREBLE_CLEFF, 30, staff_rect, to_draw)
 
+def random_phrases() -> Iterator[list[audio.PhraseNote]]:
+    while True:
+        note_gen = generate_notes(variability=12, base=BASE_NOTE)
+        yield audio.melody([next(note_gen) for _ in range(SEQUENCE_LENGTH)], NOTE_LENGTH)
+
+def file_phrases(path: str) -> Iterator[list[audio.PhraseNote]]:
+    '''
+    file_phrases yields the phrases of the melody of a MIDI file, starting
+    over at the end. The file is only read as far as the phrases taken.
+    '''
+    with MidiFile(path) as midi:
+        while True:
+            n_phrases = 0
+
+            for phrase in midi.phrases(SEQUENCE_LENGTH):
+                n_phrases += 1
+                yield phrase
+
+            if n_phrases == 0:
+                raise ValueError(f"{path} has no phrase of {SEQUENCE_LENGTH} notes")
+
 async def on_start(ctx: Context) -> None:
     global to_draw
 
-    while True:
-        to_draw = []
+    presses = ctx.subscribe(KeyEvent, pressing=True)
+    phrases = file_phrases(MIDI_FILE) if MIDI_FILE is not None else random_phrases()
 
-        note_gen = generate_notes(variability=12, base=BASE_NOTE)
-        notes = [next(note_gen) for _ in range(SEQUENCE_LENGTH)]
+    try:
+        while True:
+            to_draw = []
+            ctx.invalidate()
+
+            phrase = next(phrases)
+            notes = [n.note for n in phrase]
+
+            await audio.play_phrase(phrase)
+            presses.drain() # keys pressed while listening do not count
+
+            asked = asyncio.get_running_loop().time()
+
+            for i, note in enumerate(notes):
+                key_event = await presses.get()
+                offset = i * (1 / (len(notes) - 1))
 
-        for note in notes:
-            audio.note_on(note, 127)
-            await asyncio.sleep(1)
-            audio.note_off(note)
+                answered = ctx.event_time(key_event)
+                ctx.record_result(note, key_event.key == note, note - notes[i - 1] if i > 0 else None, (answered - asked) * 1000)
+                asked = answered
 
-        for i, note in enumerate(notes):
-            [key_event] = await ctx.await_events(KeyEvent, 1, lambda e: e.pressing)
-            offset = i * (1 / (len(notes) - 1))
+                if key_event.key == note:
+                    to_draw.append(VisualNote(note, pygame.color.Color(0, 255, 0), offset))
+                else:
+                    to_draw.append(VisualNote(note, pygame.color.Color(255, 0, 0), offset))
 
-            if key_event.key == note:
-                to_draw.append(VisualNote(note, pygame.color.Color(0, 255, 0), offset))
-            else:
-                to_draw.append(VisualNote(note, pygame.color.Color(255, 0, 0), offset))
+                ctx.invalidate()
 
-        await asyncio.sleep(3)
+            await asyncio.sleep(3)
+    finally:
+        # releases the mapping of the MIDI file when the game is stopped
+        phrases.close()
 
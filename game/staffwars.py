@@ -1,50 +1,86 @@
+'''
+Play the notes scrolling across the staff before they reach the clef.
+'''
 import asyncio
 import random
 import pygame
-from context import VisualNote, Context, TREBLE_CLEFF
+from context import Context, Subscription, TREBLE_CLEFF
 from events import KeyEvent
+from note_pool import NotePool
 
 NOTE_TRAVEL_TIME = 8
 NOTE_SPAWN_RATE = 4
 
-to_draw: list[tuple[int, float]] = []
-clock = pygame.time.Clock()
+# seconds a note stays after reaching the clef, for keys pressed before that
+# whose events are dispatched late, like after a slow frame or MIDI read
+INPUT_GRACE = 0.25
 
-async def on_key_press(evt: KeyEvent):
-    if not evt.pressing: return
-    if len(to_draw) == 0: return
+# points for hitting a note as soon as it appears, less the closer it got to the clef
+MAX_POINTS = 100
+SCORE_COLOR = (0, 0, 0)
 
-    if to_draw[0][0] == evt.key:
-        to_draw.pop(0)
+pool = NotePool()
+presses: Subscription[KeyEvent] | None = None
+last_update: float | None = None
+score = 0
+hits = 0
+misses = 0
 
+def on_key_press(ctx: Context, evt: KeyEvent) -> None:
+    global score, hits
 
+    # judged against where the notes were when the key went down, however late this runs
+    pressed = ctx.event_time(evt)
+    front = pool.oldest_at(pressed, NOTE_TRAVEL_TIME)
+
+    if front is None or pool.pitch[front] != evt.key:
+        return
+
+    offset = 1 - (pressed - pool.spawn_time[front]) / NOTE_TRAVEL_TIME
+
+    score += round(MAX_POINTS * offset)
+    hits += 1
+    ctx.record_result(evt.key, True, response_ms=(1 - offset) * NOTE_TRAVEL_TIME * 1000)
+    pool.remove(front)
 
 def on_update(ctx: Context) -> None:
-    global to_draw
+    global last_update, misses
 
     surf_width, surf_height = ctx.brush.surface.get_size()
     staff_rect = pygame.rect.Rect(surf_width * 0.1, surf_height / 2 - surf_width * 0.05, surf_width * 0.8, surf_width * 0.1)
 
-    dt = clock.tick()
+    # the loop's clock rather than the wall clock, so simulations on a virtual clock work
+    now = asyncio.get_running_loop().time()
+    dt = 0 if last_update is None else now - last_update
+    last_update = now
 
-    visual_notes = []
+    # presses are judged before notes expire, so a slow frame does not turn hits into misses
+    if presses is not None:
+        for evt in presses.drain():
+            on_key_press(ctx, evt)
 
-    new_to_draw = []
-    for note, offset in to_draw:
-        if offset < 0:
-            continue
-        
-        new_to_draw.append((note, offset - dt / 1000 / NOTE_TRAVEL_TIME))
-        visual_notes.append(VisualNote(note, pygame.color.Color(0, 0, 0), offset=offset))
+    expired = pool.advance(dt / NOTE_TRAVEL_TIME, -INPUT_GRACE / NOTE_TRAVEL_TIME)
+    misses += len(expired)
 
-    to_draw = new_to_draw
+    for pitch in pool.pitch[expired].tolist():
+        ctx.record_result(pitch, False)
 
-    ctx.brush.draw_staff(TREBLE_CLEFF, 30, staff_rect, visual_notes)
+    ctx.brush.draw_staff(TREBLE_CLEFF, 30, staff_rect, pool)
+    ctx.brush.draw_text("monospace", 24, f"score {score}   hits {hits}   missed {misses}", (staff_rect.x, surf_height * 0.8), SCORE_COLOR)
+    ctx.invalidate() # notes scroll continuously
 
 async def on_start(ctx: Context) -> None:
-    ctx.register_event_handler(KeyEvent, on_key_press)
+    global presses
+
+    presses = ctx.subscribe(KeyEvent, pressing=True)
 
     while True:
-        to_draw.append((random.randint(48, 69), 1))
+        now = asyncio.get_running_loop().time()
+
+        # the next update advances every note by the time since the previous one,
+        # which the new note makes up for so it is not moved before it appeared
+        offset = 1 + (now - last_update) / NOTE_TRAVEL_TIME if last_update is not None else 1
+
+        pool.spawn(random.randint(48, 69), now, offset)
         await asyncio.sleep(NOTE_SPAWN_RATE)
 
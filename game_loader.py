@@ -1,30 +1,215 @@
+import ast
 import importlib
+import importlib.util
 import os
+import pkgutil
 import asyncio
+import traceback
+from dataclasses import dataclass
+from types import ModuleType
 
 from context import Context
 
-cached_games = None
+GAMES_PACKAGE = "game"
+GAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), GAMES_PACKAGE)
+
+
+@dataclass(frozen=True)
+class GameInfo:
+    name: str
+    path: str
+    mtime: float
+    description: str
+    has_update: bool
+
+
+def _read_info(name: str, path: str, mtime: float) -> GameInfo:
+    # parsed instead of imported, so listing games does not run their module code
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+
+    functions = {node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+
+    if "on_start" not in functions:
+        raise ValueError(f"game '{name}' has no on_start function")
+
+    description = (ast.get_docstring(tree) or "").strip().split("\n")[0]
+
+    return GameInfo(name, path, mtime, description, "on_update" in functions)
+
+
+class GameRegistry:
+    '''
+    GameRegistry discovers the game modules in the game directory. Their metadata
+    is kept in an index that is only re-read for files whose modification time
+    changed. Modules are imported on first use and can be reloaded in place.
+    '''
+
+    def __init__(self, package: str = GAMES_PACKAGE, path: str = GAMES_DIR):
+        self.package = package
+        self.path = path
+        self.index: dict[str, GameInfo] = {}
+        self.errors: dict[str, str] = {}
+        self.modules: dict[str, tuple[ModuleType, str, float]] = {} # module, path and mtime when imported
+
+    def refresh(self) -> dict[str, GameInfo]:
+        index = {}
+        errors = {}
+
+        for module in pkgutil.iter_modules([self.path]):
+            if module.ispkg:
+                continue
+
+            path = os.path.join(self.path, module.name + ".py")
+
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+
+            cached = self.index.get(module.name)
+
+            if cached is not None and cached.mtime == mtime:
+                index[module.name] = cached
+                continue
+
+            try:
+                index[module.name] = _read_info(module.name, path, mtime)
+            except (SyntaxError, ValueError) as exc:
+                errors[module.name] = str(exc)
+
+        self.index = index
+        self.errors = errors
+
+        return index
+
+    def games(self) -> list[str]:
+        return sorted(self.refresh())
+
+    def info(self, name: str) -> GameInfo:
+        if name not in self.index:
+            self.refresh()
+
+        if name not in self.index:
+            raise ValueError(self.errors.get(name, f"unknown game '{name}', available games: {', '.join(sorted(self.index))}"))
+
+        return self.index[name]
+
+    def load(self, name: str) -> ModuleType:
+        '''
+        load returns the module of a game, importing it the first time.
+        '''
+        if name not in self.modules:
+            info = self.info(name)
+            self.modules[name] = (importlib.import_module("." + name, self.package), info.path, info.mtime)
+
+        return self.modules[name][0]
+
+    def instantiate(self, name: str) -> ModuleType:
+        '''
+        instantiate executes a game's file as a new module object that is not
+        shared with anyone, so sessions running the same game side by side each
+        get their own module globals.
+        '''
+        info = self.info(name)
+        spec = importlib.util.spec_from_file_location(f"{self.package}.{name}", info.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        return module
+
+    def changed(self, name: str) -> bool:
+        '''
+        changed tells whether the file of a loaded game was modified since it was imported.
+        '''
+        if name not in self.modules:
+            return False
+
+        try:
+            # the path is kept with the module, a game whose file is broken is not in the index
+            _, path, mtime = self.modules[name]
+            return os.stat(path).st_mtime != mtime
+        except OSError:
+            return False
+
+    def reload(self, name: str) -> ModuleType:
+        module, path, _ = self.modules[name]
+        mtime = os.stat(path).st_mtime
+
+        # remembered before importing so that a broken file is not retried until it changes again
+        self.modules[name] = (module, path, mtime)
+        self.refresh()
+        self.info(name) # raises if the file is no longer a valid game
+
+        return importlib.reload(module)
+
+
+registry = GameRegistry()
+
 
 def reload_games() -> None:
-    global cached_games
-    cached_games = list(map(lambda g: g.removesuffix(".py"), filter(lambda g: g != '__pycache__', os.listdir('game/'))))
+    registry.refresh()
 
 def get_games() -> list[str]:
-    if cached_games is None:
-        reload_games()
-
-    return cached_games # type: ignore
+    return registry.games()
 
 class Game:
-    def __init__(self, name: str):
-        self.game_module = importlib.import_module("." + name, "game")
+    '''
+    Game runs one game module on a context. An isolated game gets a private
+    instance of the module instead of the shared imported one.
+
+    settings replace module level constants of the game, like the MIDI file
+    playnotes takes its phrases from, and are applied again whenever the game
+    is reloaded.
+    '''
+
+    def __init__(self, name: str, games: GameRegistry = registry, isolated: bool = False, settings: dict[str, object] | None = None):
+        self.name = name
+        self.registry = games
+        self.isolated = isolated
+        self.settings = settings or {}
+        self.game_module = self._configure(games.instantiate(name) if isolated else games.load(name))
         self.task = None
 
+    def _configure(self, module: ModuleType) -> ModuleType:
+        for setting, value in self.settings.items():
+            if not hasattr(module, setting):
+                raise ValueError(f"game {self.name} has no setting {setting}")
+
+            setattr(module, setting, value)
+
+        return module
+
     def begin(self, ctx: Context) -> None:
         self.task = asyncio.create_task(self.game_module.on_start(ctx))
 
     def update(self, ctx: Context) -> None:
         if hasattr(self.game_module, 'on_update'):
             self.game_module.on_update(ctx)
-    
+
+    def stop(self, ctx: Context) -> None:
+        '''
+        stop cancels the game's task and removes everything it registered on ctx.
+        '''
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        ctx.clear()
+
+    def reload(self, old_ctx: Context, new_ctx: Context) -> bool:
+        '''
+        reload re-imports the game module and restarts the game on new_ctx. If the
+        module fails to import, the game keeps running on old_ctx and False is returned.
+        '''
+        try:
+            module = self._configure(self.registry.instantiate(self.name) if self.isolated else self.registry.reload(self.name))
+        except Exception:
+            traceback.print_exc()
+            return False
+
+        self.stop(old_ctx)
+        self.game_module = module
+        self.begin(new_ctx)
+
+        return True
@@ -0,0 +1,279 @@
+import asyncio
+import cProfile
+import json
+import time
+from collections import deque
+from typing import Callable
+import numpy as np
+from context import Context, Brush, text_cache
+from events import Event, KeyEvent
+
+
+OVERLAY_FRAMES = 60
+OVERLAY_FONT = "monospace"
+OVERLAY_FONT_SIZE = 14
+
+# latencies are counted in 1 ms buckets up to this, longer ones in a single overflow bucket
+LATENCY_MAX_MS = 500
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+class Instrumentation:
+    '''
+    Instrumentation records how long each phase of the main loop takes, how many
+    tasks are created and how many events are fired per frame, the hits and
+    misses of the text cache, and the depth of the context's event queues, into
+    a ring buffer of the most recent frames.
+
+    While disabled, lap and add return right away and nothing is hooked into the
+    context or the event loop. Enabling it sets the fire_timer hook of one
+    context, which enabling again with another context moves over, and installs
+    a task factory that counts created tasks.
+    '''
+
+    def __init__(self, capacity: int = 600):
+        self.enabled = False
+        self.frames: deque[dict] = deque(maxlen=capacity)
+        self.profiler: cProfile.Profile | None = None
+        self._frame = 0
+        self._lap_start = 0.0
+        self._added = 0.0 # seconds of the running lap already attributed with add
+        self._phases: dict[str, float] = {}
+        self._tasks_created = 0
+        self._events_fired = 0
+        self._fire_time = 0.0
+        self._previous_task_factory = None
+        self._text_counts = (0, 0)
+        self._ctx: Context | None = None
+
+    def _fired(self, seconds: float) -> None:
+        self._fire_time += seconds
+        self._events_fired += 1
+
+    def _unhook(self) -> None:
+        if self._ctx is not None and self._ctx.fire_timer == self._fired:
+            self._ctx.fire_timer = None
+
+        self._ctx = None
+
+    def enable(self, ctx: Context) -> None:
+        self._unhook()
+        ctx.fire_timer = self._fired
+        self._ctx = ctx
+
+        if self.enabled:
+            return
+
+        self.enabled = True
+        loop = asyncio.get_running_loop()
+        task_factory = loop.get_task_factory()
+
+        def counting_task_factory(loop, coro, **kwargs):
+            self._tasks_created += 1
+
+            if task_factory is not None:
+                return task_factory(loop, coro, **kwargs)
+
+            return asyncio.Task(coro, loop=loop, **kwargs)
+
+        loop.set_task_factory(counting_task_factory)
+        self._previous_task_factory = task_factory
+        self.start_frame()
+
+    def disable(self) -> None:
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        self._unhook()
+        asyncio.get_running_loop().set_task_factory(self._previous_task_factory)
+
+    def start_frame(self) -> None:
+        if not self.enabled:
+            return
+
+        self._phases = {}
+        self._tasks_created = 0
+        self._events_fired = 0
+        self._fire_time = 0.0
+        self._text_counts = (text_cache.hits, text_cache.misses)
+        self._added = 0.0
+        self._lap_start = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        '''
+        lap attributes the time since the previous lap (or the start of the frame)
+        to phase, except for what was attributed to other phases with add meanwhile.
+        '''
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self._phases[phase] = self._phases.get(phase, 0) + now - self._lap_start - self._added
+        self._lap_start = now
+        self._added = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        '''
+        add attributes seconds spent during the running lap to phase instead, for
+        work like input dispatch that runs while the main loop awaits.
+        '''
+        if not self.enabled:
+            return
+
+        self._phases[phase] = self._phases.get(phase, 0) + seconds
+        self._added += seconds
+
+    def end_frame(self, ctx: Context) -> None:
+        if not self.enabled:
+            return
+
+        self._frame += 1
+        self.frames.append({
+            "frame": self._frame,
+            "time": time.time(),
+            "phases_ms": {phase: seconds * 1000 for phase, seconds in self._phases.items()},
+            "fire_events_ms": self._fire_time * 1000,
+            "events_fired": self._events_fired,
+            "tasks_created": self._tasks_created,
+            "text_hits": text_cache.hits - self._text_counts[0],
+            "text_misses": text_cache.misses - self._text_counts[1],
+            "pending_tasks": len(asyncio.all_tasks()),
+            "queue_depths": ctx.queue_depths(),
+        })
+        self.start_frame()
+
+    def summary(self, n_frames: int = OVERLAY_FRAMES) -> dict[str, float]:
+        '''
+        summary returns the mean of every phase and counter over the last n_frames frames.
+        '''
+        frames = list(self.frames)[-n_frames:]
+
+        if not frames:
+            return {}
+
+        totals: dict[str, float] = {}
+
+        for frame in frames:
+            for phase, ms in frame["phases_ms"].items():
+                totals[f"{phase} ms"] = totals.get(f"{phase} ms", 0) + ms
+
+            for key in ["fire_events_ms", "events_fired", "tasks_created", "pending_tasks", "text_hits", "text_misses"]:
+                totals[key] = totals.get(key, 0) + frame[key]
+
+            totals["queued events"] = totals.get("queued events", 0) + sum(frame["queue_depths"].values())
+
+        return {key: total / len(frames) for key, total in totals.items()}
+
+    def draw_overlay(self, brush: Brush) -> None:
+        y = 5
+
+        for key, value in self.summary().items():
+            brush.draw_text(OVERLAY_FONT, OVERLAY_FONT_SIZE, f"{key:>16}: {value:8.3f}", (5, y), (200, 0, 0))
+            y += OVERLAY_FONT_SIZE + 2
+
+    def dump_jsonl(self, path: str) -> None:
+        with open(path, "w") as f:
+            for frame in self.frames:
+                f.write(json.dumps(frame) + "\n")
+
+    def toggle_profile(self, path: str) -> bool:
+        '''
+        toggle_profile starts a cProfile capture, or stops the running one and saves
+        it to path. Returns whether a capture is running afterwards.
+        '''
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            return True
+
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        self.profiler = None
+
+        return False
+
+
+class Histogram:
+    '''
+    Histogram counts millisecond values in 1 ms buckets from 0 to max_ms, with
+    everything above in the last bucket, so percentiles can be read at any time
+    without keeping the values.
+    '''
+
+    def __init__(self, max_ms: int = LATENCY_MAX_MS):
+        self.counts = np.zeros(max_ms + 2, np.int64)
+        self.total = 0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[min(max(int(ms), 0), len(self.counts) - 1)] += 1
+        self.total += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> float:
+        '''
+        percentile returns the upper bound of the bucket holding the p-th percentile,
+        or the maximum if that is lower or the percentile is in the overflow bucket.
+        '''
+        if self.total == 0:
+            return 0.0
+
+        bucket = int(np.searchsorted(np.cumsum(self.counts), self.total * p / 100))
+
+        if bucket == len(self.counts) - 1:
+            return float(self.max)
+
+        return float(min(bucket + 1, self.max))
+
+    def summary(self) -> dict[str, float]:
+        return {"count": self.total, **{f"p{p}": self.percentile(p) for p in LATENCY_PERCENTILES}, "max": self.max}
+
+
+class LatencyTracker:
+    '''
+    LatencyTracker measures how long key events from a device take from their
+    device timestamp to being dispatched on the context, to the start of event
+    handlers and to the next presented frame, in milliseconds on the device's clock.
+    Events without a timestamp are not counted.
+
+    The engine calls dispatched for every event it fires and presented after
+    every display update. Handler latency is measured by a handler of its own,
+    which attach registers, started in the same batch as the games' handlers.
+    '''
+
+    STAGES = ("dispatch", "handler", "present")
+
+    def __init__(self, clock: Callable[[], int]):
+        self.clock = clock
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+        self._unpresented: list[int] = []
+
+    def attach(self, ctx: Context) -> int:
+        return ctx.register_event_handler(KeyEvent, self._handled)
+
+    async def _handled(self, event: KeyEvent) -> None:
+        if event.timestamp is not None:
+            self.histograms["handler"].add(self.clock() - event.timestamp)
+
+    def dispatched(self, event: Event) -> None:
+        timestamp = getattr(event, "timestamp", None)
+
+        if timestamp is not None:
+            self.histograms["dispatch"].add(self.clock() - timestamp)
+            self._unpresented.append(timestamp)
+
+    def presented(self) -> None:
+        if not self._unpresented:
+            return
+
+        now = self.clock()
+        histogram = self.histograms["present"]
+
+        for timestamp in self._unpresented:
+            histogram.add(now - timestamp)
+
+        self._unpresented.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
@@ -1,25 +1,45 @@
+import time
+
+LAUNCH_TIME = time.perf_counter()
+
+import getpass
+import json
 import sys
 import argparse
 import audio
+from compositor import Compositor
 from context import Context
 import asyncio
 import pygame
 import pygame.midi
-from events import KeyEvent, KeystrokeEvent
+from events import KeyEvent, KeystrokeEvent, MidiBatchEvent
 from emulator import KeyboardEmulator
 from game_loader import Game
+from frames import FrameScheduler
+from midi_input import MidiReader, decode_packed
+from pitch_input import MicrophoneSource, PitchInput, WavSource
+from instrumentation import Instrumentation, LatencyTracker
+from recording import Recorder, Replay
+from results import ResultStore
+import simulation
+import sessions
 
 
-pygame.init()
-pygame.display.init()
-pygame.midi.init()
+BACKGROUND_COLOR = (255, 255, 255)
+DEFAULT_FPS = 60
 
+# events after which the window contents have to be drawn again
+REDRAW_EVENTS = (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED)
 
-BACKGROUND_COLOR = (255, 255, 255)
+# posted by the MIDI reader and pitch input threads to interrupt an idle wait for pygame input
+MIDI_READY = pygame.event.custom_type()
 
+OVERLAY_KEY = pygame.K_F3
+DUMP_FRAMES_KEY = pygame.K_F4
+PROFILE_KEY = pygame.K_F5
 
-def is_mouse_pressed() -> bool:
-    return pygame.mouse.get_pressed()[0]
+# seconds between checks for changes to the game file with --hot-reload
+RELOAD_INTERVAL = 0.5
 
 
 def parse_args() -> argparse.Namespace:
@@ -29,74 +49,285 @@ def parse_args() -> argparse.Namespace:
                     )
     
     parser.add_argument("game_name")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="target frame rate, 0 for uncapped")
+    parser.add_argument("--frame-stats", action="store_true", help="print frame time statistics on exit")
+    parser.add_argument("--instrument", action="store_true", help="record per-frame timings from the start (F3 toggles the overlay)")
+    parser.add_argument("--synth", action="store_true", help="play notes with the built-in synth instead of the MIDI output device")
+    parser.add_argument("--latency", action="store_true", help="print MIDI input latency percentiles on exit")
+    parser.add_argument("--hot-reload", action="store_true", help="restart the game whenever its file changes")
+    parser.add_argument("--quit-after", type=int, metavar="FRAMES", help="exit after rendering this many frames")
+    parser.add_argument("--record", metavar="FILE", help="record every key event of the session to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play back key events recorded with --record")
+    parser.add_argument("--results", metavar="FILE", help="save how well every note was played to the SQLite database FILE")
+    parser.add_argument("--student", default=getpass.getuser(), help="name the results are saved under, the login name by default")
+    parser.add_argument("--pitch-input", nargs="?", const="", metavar="WAV", help="detect the notes sung or played into the microphone, or in a WAV file, instead of reading MIDI input")
+    parser.add_argument("--replay-speed", type=float, default=1, help="speed factor of --replay, 0 for as fast as possible")
+    parser.add_argument("--midi-file", metavar="FILE", help="take the phrases of playnotes from the melody of a Standard MIDI File instead of random notes")
+
+    simulate = parser.add_argument_group("simulation", "run the game headless against scripted input on a virtual clock")
+    simulate.add_argument("--simulate", metavar="SCRIPT", help="file of 'time key velocity pressing' lines to play")
+    simulate.add_argument("--sessions", type=int, default=1, help="number of sessions to simulate")
+    simulate.add_argument("--duration", type=float, default=60, help="virtual seconds per session")
+    simulate.add_argument("--render-every", type=int, default=0, metavar="N", help="render every Nth frame off-screen, 0 to never render")
+    simulate.add_argument("--seed", type=int, default=0, help="random seed of the first session")
+
+    host = parser.add_argument_group("hosting", "run many independent sessions rendering off-screen, for --duration seconds, rendering every --render-every frames")
+    host.add_argument("--host", type=int, metavar="SESSIONS", help="number of sessions to host")
+    host.add_argument("--processes", type=int, default=1, help="worker processes to spread the sessions over, 0 for one per core")
+    host.add_argument("--midi-ports", type=lambda ports: [int(port) for port in ports.split(",")], default=[], metavar="IDS", help="comma separated MIDI input ports, one per session")
     return parser.parse_args()
 
-async def main() -> None:
-    args = parse_args()
+async def main(args: argparse.Namespace) -> None:
+    game = Game(args.game_name, settings={"MIDI_FILE": args.midi_file} if args.midi_file is not None else None)
 
-    game = Game(args.game_name)
+    if args.synth:
+        import synth # only imported when used, like audio does for its fallback
+        audio.use_output(synth.SynthOutput())
 
+    pygame.display.init()
     window = pygame.display.set_mode((800, 600), pygame.RESIZABLE)
 
-    ctx = Context(window)
+    compositor = Compositor(window, BACKGROUND_COLOR)
+    ctx = Context(window, compositor)
+    results = ResultStore(args.results) if args.results is not None else None
+
+    if results is not None:
+        results.attach(ctx, args.student, game.name)
+
     game.begin(ctx)
 
+    instrumentation = Instrumentation()
+    show_overlay = False
+
+    if args.instrument:
+        instrumentation.enable(ctx)
+
+    pygame.midi.init()
     midi_input_id = pygame.midi.get_default_input_id()
-    midi_input = None    
+    midi_reader = None
+    pitch_input = None
     keyboard_emulator = None
 
-    if midi_input_id == -1:
-        keyboard_emulator = KeyboardEmulator(window)
+    # timestamps of MIDI input are on PortMidi's clock, those of pitch input on its own
+    latency = LatencyTracker(PitchInput.time if args.pitch_input is not None else pygame.midi.time) if args.latency else None
+
+    if latency is not None:
+        latency.attach(ctx)
+
+    if args.pitch_input is not None:
+        ctx.device_clock = PitchInput.time
+
+        def dispatch_pitch(key_events: list[KeyEvent]) -> None:
+            start = time.perf_counter()
+
+            for key_event in key_events:
+                ctx.fire_events(key_event)
+
+                if latency is not None:
+                    latency.dispatched(key_event)
+
+            instrumentation.add("pitch", time.perf_counter() - start)
+
+        pitch_input = PitchInput(
+            WavSource(args.pitch_input, realtime=True) if args.pitch_input else MicrophoneSource(),
+            asyncio.get_running_loop(),
+            dispatch_pitch,
+            wake=lambda: pygame.event.post(pygame.event.Event(MIDI_READY)),
+        )
+        pitch_input.start()
+    elif midi_input_id == -1:
+        keyboard_emulator = KeyboardEmulator(window, compositor)
     else: 
-        midi_input = pygame.midi.Input(midi_input_id)
+        ctx.device_clock = pygame.midi.time
+
+        def dispatch(batch: MidiBatchEvent) -> None:
+            start = time.perf_counter()
+            ctx.fire_events(batch)
+
+            for midi_event in decode_packed(batch.messages):
+                ctx.fire_events(midi_event)
+
+                if latency is not None:
+                    latency.dispatched(midi_event)
+
+            instrumentation.add("midi", time.perf_counter() - start)
+
+        midi_reader = MidiReader(
+            pygame.midi.Input(midi_input_id),
+            asyncio.get_running_loop(),
+            dispatch,
+            wake=lambda: pygame.event.post(pygame.event.Event(MIDI_READY)),
+        )
+        midi_reader.start()
+
+    # created once the device clock is known, the timestamps of recorded events are on it
+    recorder = Recorder(args.record, device_clock=ctx.device_clock) if args.record is not None else None
+
+    if recorder is not None:
+        recorder.attach(ctx)
+
+    def restart_game() -> None:
+        nonlocal ctx
+        new_ctx = Context(window, compositor)
+
+        if not game.reload(ctx, new_ctx):
+            return
+
+        if instrumentation.enabled:
+            instrumentation.enable(new_ctx)
+
+        new_ctx.recorder = ctx.recorder
+        new_ctx.device_clock = ctx.device_clock
+        new_ctx.results = ctx.results
+
+        if latency is not None:
+            latency.attach(new_ctx)
+
+        ctx = new_ctx
+        print(f"reloaded {game.name}")
+
+    async def watch_game() -> None:
+        while True:
+            await asyncio.sleep(RELOAD_INTERVAL)
+
+            if game.registry.changed(game.name):
+                restart_game()
+
+    watcher = asyncio.create_task(watch_game()) if args.hot_reload else None
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
+    replay = Replay(args.replay) if args.replay is not None else None
+    replayer = None
 
-            elif event.type == pygame.KEYDOWN:
-                ctx.fire_events(KeystrokeEvent(event.key, True))
+    if replay is not None:
+        # looked up on every event, the context is replaced when the game is reloaded
+        replayer = asyncio.create_task(replay.play(lambda event: ctx.fire_events(event), args.replay_speed, ctx.device_clock))
 
-                if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
+    scheduler = FrameScheduler(args.fps)
+    events = pygame.event.get()
+
+    try:
+        while True:
+            for event in events:
+                if event.type == pygame.QUIT:
                     sys.exit()
 
-            elif event.type == pygame.KEYUP:
-                ctx.fire_events(KeystrokeEvent(event.key, False))
+                elif event.type == pygame.KEYDOWN:
+                    ctx.fire_events(KeystrokeEvent(event.key, True))
 
-        window.fill(BACKGROUND_COLOR)
-        game.update(ctx)
-    
-        if midi_input is not None:
-            while midi_input.poll():
-                events = midi_input.read(10)
-
-                for evt in events:
-                    [[pressing, note_num, velocity, _], _] = evt # type: ignore
-                    
-                    ctx.fire_events(KeyEvent(note_num, velocity, pressing==144))
-        elif keyboard_emulator is not None:
-            if is_mouse_pressed():
-                hovering_over = keyboard_emulator.key_at_pos(pygame.mouse.get_pos())
-
-                if hovering_over is not None and hovering_over not in keyboard_emulator.keys_pressed:
-                    ctx.fire_events(KeyEvent(hovering_over, 127, True))
-                    audio.note_on(hovering_over, 127)
-
-                    keyboard_emulator.keys_pressed.add(hovering_over)
-            else:
-                for k in keyboard_emulator.keys_pressed:
-                    ctx.fire_events(KeyEvent(k, 0, False))
-                    audio.note_off(k)
-                
-                keyboard_emulator.keys_pressed = set()
-            keyboard_emulator.draw()
-
-        pygame.display.update()
-        await asyncio.sleep(0) # allow game coroutines to run
+                    if event.key == pygame.K_ESCAPE:
+                        pygame.quit()
+                        sys.exit()
+
+                    elif event.key == OVERLAY_KEY:
+                        show_overlay = not show_overlay
+
+                        if show_overlay:
+                            instrumentation.enable(ctx)
+                        elif not args.instrument:
+                            instrumentation.disable()
+
+                    elif event.key == DUMP_FRAMES_KEY:
+                        path = time.strftime("frames-%Y%m%d-%H%M%S.jsonl")
+                        instrumentation.dump_jsonl(path)
+                        print(f"wrote {len(instrumentation.frames)} frames to {path}")
+
+                    elif event.key == PROFILE_KEY:
+                        path = time.strftime("profile-%Y%m%d-%H%M%S.prof")
+
+                        if not instrumentation.toggle_profile(path):
+                            print(f"wrote profile to {path}")
+
+                elif event.type == pygame.KEYUP:
+                    ctx.fire_events(KeystrokeEvent(event.key, False))
+
+                elif event.type in REDRAW_EVENTS:
+                    compositor.invalidate()
+                    ctx.invalidate()
+
+                elif keyboard_emulator is not None:
+                    for key_event in keyboard_emulator.handle_event(event):
+                        ctx.fire_events(key_event)
+
+                        if key_event.pressing:
+                            audio.note_on(key_event.key, key_event.velocity)
+                        else:
+                            audio.note_off(key_event.key)
+
+            instrumentation.lap("events")
+
+            if show_overlay:
+                ctx.invalidate()
+
+            if ctx.dirty:
+                ctx.dirty = False
+                frame_start = scheduler.frame_started()
+
+                compositor.begin_frame()
+                game.update(ctx)
+                instrumentation.lap("update")
+
+                if keyboard_emulator is not None:
+                    keyboard_emulator.draw()
+                    instrumentation.lap("keyboard")
+
+                if show_overlay:
+                    instrumentation.draw_overlay(ctx.brush)
+
+                compositor.present()
+                instrumentation.lap("present")
+
+                if compositor.needs_frame:
+                    ctx.invalidate()
+
+                if latency is not None:
+                    latency.presented()
+                scheduler.frame_finished(frame_start)
+
+                if scheduler.stats.startup is None:
+                    scheduler.stats.startup = time.perf_counter() - LAUNCH_TIME
+
+                if args.quit_after is not None and scheduler.stats.frames >= args.quit_after:
+                    sys.exit()
+
+            events = await scheduler.next_frame(idle=not ctx.dirty) # allow game coroutines to run
+            instrumentation.lap("wait")
+            instrumentation.end_frame(ctx)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+        if replayer is not None:
+            replayer.cancel()
+
+        if replay is not None:
+            replay.close()
+
+        if midi_reader is not None:
+            midi_reader.stop()
+
+        if pitch_input is not None:
+            pitch_input.stop()
+
+        if recorder is not None:
+            recorder.close()
+            print(f"recorded {recorder.count} events to {recorder.path}")
+
+        if results is not None:
+            results.close()
+
+        if args.frame_stats:
+            print(json.dumps(scheduler.stats.summary()))
+
+        if latency is not None:
+            print(json.dumps({"latency_ms": latency.summary()}))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
 
+    if args.host is not None:
+        sessions.run(args.game_name, args.host, processes=args.processes, ports=args.midi_ports, duration=args.duration, fps=args.fps, render_every=args.render_every)
+    elif args.simulate is not None:
+        simulation.run(args.game_name, args.simulate, sessions=args.sessions, duration=args.duration, render_every=args.render_every, fps=args.fps or simulation.DEFAULT_FPS, seed=args.seed)
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,340 @@
+import mmap
+import struct
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator
+from audio import PhraseNote
+
+
+HEADER = struct.Struct(">4sIHHH") # b"MThd", length, format, number of tracks, division
+CHUNK = struct.Struct(">4sI")
+
+DEFAULT_DIVISION = 480 # ticks per quarter note of files written by write_midi_file
+DEFAULT_TEMPO = 500_000 # microseconds per quarter note until the first tempo change, 120 bpm
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+SYSEX = 0xF0
+SYSEX_ESCAPE = 0xF7
+META = 0xFF
+META_TEMPO = 0x51
+META_END_OF_TRACK = 0x2F
+
+# General MIDI plays drums on channel 10, 9 counting from 0, they are no melody
+DRUM_CHANNEL = 9
+
+# data bytes that follow the status byte of each kind of channel message
+CHANNEL_DATA_LENGTH = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+# yielded by _decode in place of a channel for a tempo change, with the tempo in place of the note
+TEMPO_CHANGE = -1
+
+
+def _read_varlen(data, pos: int, end: int) -> tuple[int, int]:
+    # a quantity cut off by end returns a position past it
+    value = 0
+
+    while pos < end:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+
+        if byte < 0x80:
+            return value, pos
+
+    return value, end + 1
+
+
+def _write_varlen(value: int) -> bytes:
+    out = [value & 0x7F]
+    value >>= 7
+
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+
+    return bytes(reversed(out))
+
+
+def write_midi_file(path: str, tracks: list[list[tuple[int, bytes]]], division: int = DEFAULT_DIVISION) -> None:
+    '''
+    write_midi_file saves a format 1 Standard MIDI File. Every track is a list
+    of messages as (tick, raw bytes) ordered by tick, meta events included.
+    '''
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(b"MThd", 6, 1, len(tracks), division))
+
+        for track in tracks:
+            body = bytearray()
+            tick = 0
+
+            for event_tick, message in track:
+                body += _write_varlen(event_tick - tick)
+                body += message
+                tick = event_tick
+
+            body += b"\x00\xff\x2f\x00"
+            f.write(CHUNK.pack(b"MTrk", len(body)))
+            f.write(body)
+
+
+class _Clock:
+    '''
+    Converts ticks to seconds for ticks that only ever increase, following a
+    tempo map that can be given up front or grow while a track is decoded.
+    '''
+
+    def __init__(self, division: int, tempos: Iterable[tuple[int, int]] = ()):
+        self._tempos = deque(tempos)
+        self._tick = 0
+        self._seconds = 0.0
+        self._tempo = DEFAULT_TEMPO
+
+        if division & 0x8000:
+            # SMPTE division, negative frames per second in the high byte and ticks per frame in the low byte
+            frames = 256 - (division >> 8)
+            self._seconds_per_tick = 1 / (frames * (division & 0xFF))
+            self._division = None
+        else:
+            self._division = division
+            self._seconds_per_tick = self._tempo / 1_000_000 / division
+
+    def set_tempo(self, tick: int, tempo: int) -> None:
+        if self._division is None:
+            return
+
+        self.seconds(tick)
+        self._tempo = tempo
+        self._seconds_per_tick = tempo / 1_000_000 / self._division
+
+    def seconds(self, tick: int) -> float:
+        while self._tempos and self._tempos[0][0] <= tick:
+            self.set_tempo(*self._tempos.popleft())
+
+        self._seconds += (tick - self._tick) * self._seconds_per_tick
+        self._tick = tick
+
+        return self._seconds
+
+
+class MidiFile:
+    '''
+    MidiFile reads a Standard MIDI File. The file is memory-mapped and opening
+    it only reads the header and where each track starts. Tracks are decoded
+    as they are iterated, so taking the first phrase of a large file does not
+    parse the rest of it.
+
+    Notes are PhraseNotes with start and duration in seconds, following the
+    tempo changes of the file. In a format 1 file they are in the first track,
+    which is read in full the first time another track is iterated.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a MIDI file")
+
+        magic, length, self.format, n_tracks, self.division = HEADER.unpack_from(self._map)
+
+        if magic != b"MThd":
+            self.close()
+            raise ValueError(f"{path} is not a MIDI file")
+
+        self.tracks: list[tuple[int, int]] = [] # start and end of every track's events
+        pos = 8 + length
+
+        while pos + CHUNK.size <= len(self._map) and len(self.tracks) < n_tracks:
+            kind, length = CHUNK.unpack_from(self._map, pos)
+            pos += CHUNK.size
+
+            # unknown chunks are skipped, a truncated last track is read up to its last complete message
+            if kind == b"MTrk":
+                self.tracks.append((pos, min(pos + length, len(self._map))))
+
+            pos += length
+
+        self._tempo_map: list[tuple[int, int]] | None = None
+
+    def __enter__(self) -> "MidiFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _decode(self, track: int) -> Iterator[tuple[int, int, int, int]]:
+        '''
+        _decode yields the notes and tempo changes of a track as tick, channel,
+        note and velocity, which is 0 for note offs. Tempo changes have the
+        channel TEMPO_CHANGE and the tempo in place of the note. A message cut
+        off by the end of the track ends it.
+        '''
+        data = self._map
+        pos, end = self.tracks[track]
+        tick = 0
+        running = 0
+
+        while pos < end:
+            delta = data[pos]
+
+            # most delta times fit in one byte
+            if delta < 0x80:
+                pos += 1
+            else:
+                delta, pos = _read_varlen(data, pos, end)
+
+            if pos >= end:
+                return
+
+            tick += delta
+            status = data[pos]
+
+            if status >= 0x80:
+                pos += 1
+
+                if status < SYSEX:
+                    running = status
+            elif running:
+                status = running
+            else:
+                raise ValueError(f"{self.path}: data byte without a status at offset {pos}")
+
+            kind = status & 0xF0
+
+            if kind in CHANNEL_DATA_LENGTH and pos + CHANNEL_DATA_LENGTH[kind] > end:
+                return
+
+            if kind == NOTE_ON:
+                yield tick, status & 0x0F, data[pos], data[pos + 1]
+                pos += 2
+            elif kind == NOTE_OFF:
+                yield tick, status & 0x0F, data[pos], 0
+                pos += 2
+            elif status == META:
+                if pos >= end:
+                    return
+
+                meta = data[pos]
+                length, pos = _read_varlen(data, pos + 1, end)
+
+                if pos + length > end:
+                    return
+
+                if meta == META_TEMPO:
+                    yield tick, TEMPO_CHANGE, int.from_bytes(data[pos:pos + 3], "big"), 0
+                elif meta == META_END_OF_TRACK:
+                    return
+
+                pos += length
+            elif status == SYSEX or status == SYSEX_ESCAPE:
+                length, pos = _read_varlen(data, pos, end)
+                pos += length
+            elif kind in CHANNEL_DATA_LENGTH:
+                pos += CHANNEL_DATA_LENGTH[kind]
+            else: # system common and real-time messages do not belong in files
+                raise ValueError(f"{self.path}: unexpected status {status:#x} at offset {pos - 1}")
+
+    def messages(self, track: int) -> Iterator[tuple[int, int, int, int]]:
+        '''
+        messages yields the notes of a track as tick, channel, note and velocity,
+        which is 0 for note offs.
+        '''
+        return (message for message in self._decode(track) if message[1] != TEMPO_CHANGE)
+
+    def _clock(self, track: int) -> _Clock:
+        if self.format != 1 or track == 0:
+            return _Clock(self.division)
+
+        if self._tempo_map is None:
+            self._tempo_map = [(tick, tempo) for tick, channel, tempo, _ in self._decode(0) if channel == TEMPO_CHANGE] if self.tracks else []
+
+        return _Clock(self.division, self._tempo_map)
+
+    def notes(self, track: int, drums: bool = True) -> Iterator[PhraseNote]:
+        '''
+        notes yields the notes of a track ordered by when they start, each once
+        it has ended. Notes still sounding at the end of the track end there.
+        Notes on DRUM_CHANNEL are left out unless drums is set.
+        '''
+        clock = self._clock(track)
+        sounding: dict[tuple[int, int], deque[PhraseNote]] = {}
+        pending: deque[PhraseNote] = deque() # by start, with durations of -1 until they end
+        seconds = 0.0
+
+        for tick, channel, note, velocity in self._decode(track):
+            if channel == TEMPO_CHANGE:
+                clock.set_tempo(tick, note)
+                continue
+
+            seconds = clock.seconds(tick)
+
+            if channel == DRUM_CHANNEL and not drums:
+                continue
+
+            if velocity > 0:
+                started = PhraseNote(note, seconds, -1.0, velocity)
+                pending.append(started)
+                sounding.setdefault((channel, note), deque()).append(started)
+            elif started_notes := sounding.get((channel, note)):
+                started = started_notes.popleft()
+                started.duration = seconds - started.start
+
+                while pending and pending[0].duration >= 0:
+                    yield pending.popleft()
+
+        for started in pending:
+            if started.duration < 0:
+                started.duration = seconds - started.start
+
+            yield started
+
+    def first_note_track(self, drums: bool = True) -> int:
+        '''
+        first_note_track returns the first track that has notes, reading only
+        as far as its first note. Drums are not counted unless drums is set.
+        '''
+        for track in range(len(self.tracks)):
+            if any(velocity > 0 and (drums or channel != DRUM_CHANNEL) for _, channel, _, velocity in self.messages(track)):
+                return track
+
+        raise ValueError(f"{self.path} has no notes")
+
+    def melody(self, track: int | None = None) -> Iterator[PhraseNote]:
+        '''
+        melody yields the notes of a track one at a time, the highest of the
+        notes starting together, leaving out drums. track defaults to the first
+        track with notes other than drums.
+        '''
+        if track is None:
+            track = self.first_note_track(drums=False)
+
+        highest: PhraseNote | None = None
+
+        for n in self.notes(track, drums=False):
+            if highest is not None and n.start > highest.start:
+                yield highest
+                highest = None
+
+            if highest is None or n.note > highest.note:
+                highest = n
+
+        if highest is not None:
+            yield highest
+
+    def phrases(self, length: int, track: int | None = None) -> Iterator[list[PhraseNote]]:
+        '''
+        phrases yields consecutive phrases of length notes of the melody of a
+        track, each starting at 0 seconds, until the track has no more full phrase.
+        '''
+        melody = self.melody(track)
+
+        while len(phrase := list(islice(melody, length))) == length:
+            start = phrase[0].start
+            yield [PhraseNote(n.note, n.start - start, n.duration, n.velocity) for n in phrase]
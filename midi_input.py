@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Protocol
+import numpy as np
+from events import ControlChangeEvent, KeyEvent, MidiBatchEvent, MidiEvent, PitchBendEvent, MIDI_MESSAGE
+
+
+# pygame.midi.Input buffers 4096 messages by default, read as many as possible per wakeup
+READ_BATCH = 1024
+POLL_INTERVAL = 0.0005
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+PITCH_BEND = 0xE0
+
+# the pitch bend value of a wheel at rest
+PITCH_BEND_CENTER = 8192
+
+
+class MidiDevice(Protocol):
+    def poll(self) -> bool: ...
+    def read(self, num_events: int) -> list: ...
+
+
+def pack(messages: list) -> np.ndarray:
+    '''
+    pack turns messages read from a MIDI device, [[status, data1, data2, data3], timestamp]
+    lists, into an array of MIDI_MESSAGE.
+    '''
+    return np.array([(status, data1, data2, timestamp) for [status, data1, data2, _], timestamp in messages], MIDI_MESSAGE)
+
+
+def decode_packed(messages: np.ndarray) -> list[MidiEvent]:
+    '''
+    decode_packed turns an array of MIDI_MESSAGE into events, keeping the device
+    timestamp and the channel. A note on with a velocity of 0 is a release.
+    Messages other than notes, control changes and pitch bends are skipped.
+    '''
+    kinds = messages["status"] & 0xF0
+    known = messages[(kinds == NOTE_ON) | (kinds == NOTE_OFF) | (kinds == CONTROL_CHANGE) | (kinds == PITCH_BEND)]
+
+    columns = (
+        (known["status"] & 0xF0).tolist(),
+        (known["status"] & 0x0F).tolist(),
+        known["data1"].tolist(),
+        known["data2"].tolist(),
+        known["timestamp"].tolist(),
+    )
+    result = []
+
+    for kind, channel, data1, data2, timestamp in zip(*columns):
+        if kind == NOTE_ON:
+            result.append(KeyEvent(data1, data2, data2 > 0, timestamp, channel))
+        elif kind == NOTE_OFF:
+            result.append(KeyEvent(data1, data2, False, timestamp, channel))
+        elif kind == CONTROL_CHANGE:
+            result.append(ControlChangeEvent(data1, data2, timestamp, channel))
+        else:
+            result.append(PitchBendEvent((data2 << 7 | data1) - PITCH_BEND_CENTER, timestamp, channel))
+
+    return result
+
+
+def decode(messages: list) -> list[MidiEvent]:
+    '''
+    decode is decode_packed for messages as read from a MIDI device.
+    '''
+    return decode_packed(pack(messages))
+
+
+class MidiReader:
+    '''
+    MidiReader drains a MIDI input device on a background thread and hands the
+    messages to an asyncio loop, so input latency does not depend on how long
+    a frame takes.
+
+    dispatch is called on the loop with a MidiBatchEvent of every read. wake, if given, is
+    called from the reader thread after each batch, which the engine uses to
+    interrupt a blocking wait for pygame input.
+
+    More devices, each with their own dispatch, can be added with add so that a
+    single thread serves all of them.
+    '''
+
+    def __init__(self, device: MidiDevice | None, loop: asyncio.AbstractEventLoop, dispatch: Callable[[MidiBatchEvent], None] | None = None, wake: Callable[[], None] | None = None):
+        self.devices: list[tuple[MidiDevice, Callable[[MidiBatchEvent], None]]] = []
+        self.loop = loop
+        self.wake = wake
+
+        if device is not None:
+            self.add(device, dispatch)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="midi-reader", daemon=True)
+
+    def add(self, device: MidiDevice, dispatch: Callable[[MidiBatchEvent], None]) -> None:
+        # replaced rather than appended to, the reader thread may be iterating over it
+        self.devices = self.devices + [(device, dispatch)]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            any_read = False
+
+            for device, dispatch in self.devices:
+                if not device.poll():
+                    continue
+
+                messages = device.read(READ_BATCH)
+
+                if not messages:
+                    continue
+
+                try:
+                    self.loop.call_soon_threadsafe(dispatch, MidiBatchEvent(pack(messages)))
+                except RuntimeError: # the loop has been closed
+                    return
+
+                any_read = True
+
+            if not any_read:
+                time.sleep(POLL_INTERVAL)
+            elif self.wake is not None:
+                self.wake()
+
+
+class FakeMidiInput:
+    '''
+    FakeMidiInput behaves like pygame.midi.Input, reading messages that were
+    passed to feed. It can be fed from any thread. Timestamps are milliseconds
+    on the time.perf_counter clock, like pygame.midi.time is for real devices.
+    '''
+
+    def __init__(self):
+        self._messages: deque = deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def time() -> int:
+        return int(time.perf_counter() * 1000)
+
+    def feed(self, messages: list[list[int]], timestamp: int | None = None) -> None:
+        if timestamp is None:
+            timestamp = self.time()
+
+        with self._lock:
+            self._messages.extend([message, timestamp] for message in messages)
+
+    def poll(self) -> bool:
+        return bool(self._messages)
+
+    def read(self, num_events: int) -> list:
+        with self._lock:
+            return [self._messages.popleft() for _ in range(min(num_events, len(self._messages)))]
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,111 @@
+import numpy as np
+import pygame
+
+
+FREE = 0
+ACTIVE = 1
+
+
+class NotePool:
+    '''
+    NotePool holds the notes scrolling across a staff as preallocated arrays of
+    pitch, offset, spawn time and state, indexed by slot. Offsets advance and
+    notes expire for the whole pool in one vectorized step, and removing a note
+    only frees its slot. The arrays double in size when every slot is taken.
+
+    An offset of 1 is the right end of the staff and 0 the clef. Brush.draw_staff
+    draws a pool directly, in the pool's color.
+    '''
+
+    def __init__(self, capacity: int = 64, color: pygame.Color | tuple[int, int, int] = (0, 0, 0)):
+        self.pitch = np.zeros(capacity, np.int16)
+        self.offset = np.zeros(capacity, np.float64)
+        self.spawn_time = np.zeros(capacity, np.float64)
+        self.state = np.zeros(capacity, np.uint8)
+        self.color = color
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self.state) - len(self._free)
+
+    def _grow(self) -> None:
+        capacity = len(self.state)
+
+        for name in ["pitch", "offset", "spawn_time", "state"]:
+            old = getattr(self, name)
+            new = np.zeros(capacity * 2, old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+        self._free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def spawn(self, pitch: int, time: float, offset: float = 1.0) -> int:
+        '''
+        spawn adds a note and returns its slot.
+        '''
+        if not self._free:
+            self._grow()
+
+        slot = self._free.pop()
+        self.pitch[slot] = pitch
+        self.offset[slot] = offset
+        self.spawn_time[slot] = time
+        self.state[slot] = ACTIVE
+
+        return slot
+
+    def remove(self, slot: int) -> None:
+        if self.state[slot] == ACTIVE:
+            self.state[slot] = FREE
+            self._free.append(slot)
+
+    def clear(self) -> None:
+        self.state[:] = FREE
+        self._free = list(range(len(self.state) - 1, -1, -1))
+
+    def advance(self, distance: float, end: float = 0.0) -> np.ndarray:
+        '''
+        advance moves every note distance closer to the clef and removes the
+        notes that went past end, the clef unless it is below 0. Returns the
+        slots of the expired notes, their pitch can be read until the slots are
+        reused by spawn.
+        '''
+        self.offset -= distance
+        expired = np.flatnonzero((self.state == ACTIVE) & (self.offset < end))
+
+        self.state[expired] = FREE
+        self._free.extend(expired.tolist())
+
+        return expired
+
+    def active(self) -> np.ndarray:
+        '''
+        active returns the slots of the notes in the pool.
+        '''
+        return np.flatnonzero(self.state == ACTIVE)
+
+    def oldest(self) -> int | None:
+        '''
+        oldest returns the slot of the note spawned first, the one closest to the clef, or None if the pool is empty.
+        '''
+        slots = self.active()
+
+        if len(slots) == 0:
+            return None
+
+        return int(slots[np.argmin(self.spawn_time[slots])])
+
+    def oldest_at(self, time: float, travel_time: float) -> int | None:
+        '''
+        oldest_at returns the slot of the note that was closest to the clef at
+        time, of the notes that were on the staff then, for notes that take
+        travel_time from spawning to reaching the clef. None if there was none.
+        '''
+        slots = self.active()
+        spawn_time = self.spawn_time[slots]
+        slots = slots[(spawn_time <= time) & (time <= spawn_time + travel_time)]
+
+        if len(slots) == 0:
+            return None
+
+        return int(slots[np.argmin(self.spawn_time[slots])])
@@ -1,5 +1,7 @@
-from typing import Any, Generator
-from random import randint
+from typing import Generator
+from random import getrandbits
+import numpy as np
+import numpy.typing as npt
 
 NOTE_OFFSET = {
     "C": 0,
@@ -21,28 +23,82 @@ DIATONIC_NOTE_OFFSET = {
     "B": 6
 }
 
-def _get_key_from_value(d: dict[Any, Any], val: Any) -> Any:
-    return [k for k, v in d.items() if v == val][0]
+WHITE_NOTE_BY_OFFSET = {v: k for k, v in NOTE_OFFSET.items()}
 
-def generate_notes(*, variability: int, base: int) -> Generator[int, None, None]:
+N_MIDI_NOTES = 128
+
+_DIATONIC_TO_OFFSET = np.array(sorted(NOTE_OFFSET.values()), dtype=np.int16)
+
+# generate_notes draws this many steps at a time from generate_sequences
+GENERATE_CHUNK = 64
+
+def generate_sequences(n_sequences: int, length: int, *, variability: int, base: int, low: int = 0, high: int = 127, white_keys_only: bool = False, rng: np.random.Generator | int | None = None) -> np.ndarray:
+    '''
+    generate_sequences returns an (n_sequences, length) array of random walks that
+    start at base and move at most variability steps at a time, clamped between
+    low and high. Steps are semitones, or white keys if white_keys_only is set.
+
+    rng can be a numpy Generator or a seed, so exercise banks can be reproduced.
+    '''
+    rng = np.random.default_rng(rng)
+
+    if not low <= base <= high:
+        raise ValueError(f"base {base} is outside of {low}-{high}")
+
+    if length < 0 or n_sequences < 0:
+        raise ValueError(f"cannot generate {n_sequences} sequences of length {length}")
+
+    if length == 0:
+        return np.empty((n_sequences, 0), dtype=np.int16)
+
+    if white_keys_only:
+        if is_black(base):
+            raise ValueError(f"base {base} is not a white key")
+
+        # walk over diatonic positions and map them back to MIDI notes at the end
+        low = chromatic_to_diatonic(low + is_black(low))[0]
+        high = chromatic_to_diatonic(high)[0]
+        base = chromatic_to_diatonic(base)[0]
+
+    steps = rng.integers(-variability, variability, size=(n_sequences, length - 1), endpoint=True, dtype=np.int16)
+
+    sequences = np.empty((n_sequences, length), dtype=np.int16)
+    sequences[:, 0] = base
+
+    # clamping makes every step depend on the previous one, so iterate over the
+    # (short) length while handling all sequences at once
+    for i in range(1, length):
+        np.clip(sequences[:, i - 1] + steps[:, i - 1], low, high, out=sequences[:, i])
+
+    if white_keys_only:
+        sequences = sequences // 7 * 12 + _DIATONIC_TO_OFFSET[sequences % 7]
+
+    return sequences
+
+def generate_notes(*, variability: int, base: int, rng: np.random.Generator | int | None = None) -> Generator[int, None, None]:
+    if rng is None:
+        rng = getrandbits(64) # seeded from the random module so random.seed still applies
+
+    rng = np.random.default_rng(rng)
     current_base = base
 
     while True:
-        yield current_base
+        [sequence] = generate_sequences(1, GENERATE_CHUNK + 1, variability=variability, base=current_base, rng=rng)
 
-        increment_by = randint(-variability, variability)
-        current_base = max(0, min(127, current_base + increment_by)) # make sure value is between 0-127
+        yield from sequence[:-1].tolist()
 
-def chromatic_to_diatonic(note: int) -> tuple[int, bool]:
+        current_base = int(sequence[-1])
+
+def _compute_chromatic_to_diatonic(note: int) -> tuple[int, bool]:
     sharp = False
 
-    if is_black(note):
+    if _compute_is_black(note):
         sharp = True
         note -= 1
 
     octaves = note // 12
 
-    [key] = _get_key_from_value(NOTE_OFFSET, note % 12)
+    key = WHITE_NOTE_BY_OFFSET[note % 12]
 
     result = octaves * 7 + DIATONIC_NOTE_OFFSET[key]
     
@@ -50,11 +106,43 @@ def chromatic_to_diatonic(note: int) -> tuple[int, bool]:
     return result, sharp
 
 
+def _compute_is_black(note: int) -> bool:
+    return note % 12 not in WHITE_NOTE_BY_OFFSET
+
+def _compute_format_note_as_str(note: int, ascii: bool) -> str:
+    octave = note // 12
+    accidental = ""
+    if _compute_is_black(note):
+        accidental = "#" if ascii else "♯"
+        note -= 1
+
+    white_note = WHITE_NOTE_BY_OFFSET[note % 12]
+
+    return f"{white_note}{accidental}-{octave}"
+
+
+# lookup tables for every MIDI note, the functions below fall back to computing outside of that range
+_DIATONIC_TABLE = tuple(_compute_chromatic_to_diatonic(n) for n in range(N_MIDI_NOTES))
+_BLACK_TABLE = tuple(_compute_is_black(n) for n in range(N_MIDI_NOTES))
+_NAME_TABLE = tuple(_compute_format_note_as_str(n, False) for n in range(N_MIDI_NOTES))
+_ASCII_NAME_TABLE = tuple(_compute_format_note_as_str(n, True) for n in range(N_MIDI_NOTES))
+
+
+def chromatic_to_diatonic(note: int) -> tuple[int, bool]:
+    if 0 <= note < N_MIDI_NOTES:
+        return _DIATONIC_TABLE[note]
+
+    return _compute_chromatic_to_diatonic(note)
+
+
 def is_white(note: int) -> bool:
-    return note % 12 in NOTE_OFFSET.values()
+    return not is_black(note)
 
 def is_black(note: int) -> bool:
-    return note % 12 not in NOTE_OFFSET.values()
+    if 0 <= note < N_MIDI_NOTES:
+        return _BLACK_TABLE[note]
+
+    return _compute_is_black(note)
 
 def note_from_str(s: str) -> int:
     filtered = filter(lambda ch: not ch.isspace(), s)
@@ -87,13 +175,42 @@ def note_from_str(s: str) -> int:
     return octave * 12 + white_note_offset + accidental_offset
 
 def format_note_as_str(note: int, ascii=False) -> str:
-    octave = note // 12
-    accidental = ""
-    if is_black(note):
-        accidental = "#" if ascii else "♯"
-        note -= 1
+    if 0 <= note < N_MIDI_NOTES:
+        return _ASCII_NAME_TABLE[note] if ascii else _NAME_TABLE[note]
 
-    white_note = _get_key_from_value(NOTE_OFFSET, note % 12)
+    return _compute_format_note_as_str(note, ascii)
 
-    return f"{white_note}{accidental}-{octave}"
 
+# per pitch class tables for the batch functions, which work on whole arrays of notes at once
+_PITCH_CLASS_BLACK = np.array([_compute_is_black(pc) for pc in range(12)])
+_PITCH_CLASS_DIATONIC = np.array([_compute_chromatic_to_diatonic(pc - _compute_is_black(pc))[0] for pc in range(12)])
+_NAME_ARRAY = np.array(_NAME_TABLE)
+_ASCII_NAME_ARRAY = np.array(_ASCII_NAME_TABLE)
+
+
+def is_black_batch(notes: npt.ArrayLike) -> np.ndarray:
+    return _PITCH_CLASS_BLACK[np.asarray(notes) % 12]
+
+def is_white_batch(notes: npt.ArrayLike) -> np.ndarray:
+    return ~is_black_batch(notes)
+
+def chromatic_to_diatonic_batch(notes: npt.ArrayLike) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    chromatic_to_diatonic_batch is chromatic_to_diatonic for an array of notes,
+    returning an array of diatonic positions and an array of sharp flags.
+    '''
+    notes = np.asarray(notes)
+    pitch_class = notes % 12
+
+    return (notes - pitch_class) // 12 * 7 + _PITCH_CLASS_DIATONIC[pitch_class], _PITCH_CLASS_BLACK[pitch_class]
+
+def format_notes_as_str(notes: npt.ArrayLike, ascii=False) -> np.ndarray:
+    '''
+    format_notes_as_str is format_note_as_str for an array of MIDI notes (0-127).
+    '''
+    notes = np.asarray(notes)
+
+    if notes.size and (notes.min() < 0 or notes.max() >= N_MIDI_NOTES):
+        raise ValueError("notes must be between 0 and 127")
+
+    return (_ASCII_NAME_ARRAY if ascii else _NAME_ARRAY)[notes]
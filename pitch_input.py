@@ -0,0 +1,377 @@
+import asyncio
+import math
+import threading
+import time
+import wave
+from collections import deque
+from typing import Callable, Protocol
+import numpy as np
+import pygame
+from events import KeyEvent
+
+
+SAMPLE_RATE = 22050
+BLOCK_SIZE = 256 # samples read and analysed at a time, about 12 ms at 22050 Hz
+WINDOW_SIZE = 1024 # samples the pitch is detected over
+
+MIN_FREQUENCY = 80 # low E of a bass voice
+MAX_FREQUENCY = 1100
+YIN_THRESHOLD = 0.15
+
+SILENCE_RMS = 0.02 # blocks quieter than this are not a note
+FULL_SCALE_RMS = 0.3 # played at velocity 127
+ONSET_RATIO = 2.5 # a jump in loudness this big re-articulates the same note
+
+# a pitch has to be detected this many blocks in a row before a note starts or ends
+STABLE_BLOCKS = 2
+
+# seconds a capture device is waited on before the reader thread checks whether it was stopped
+READ_TIMEOUT = 0.1
+# seconds stop waits for the reader thread, which only hangs on a source that ignores READ_TIMEOUT
+STOP_TIMEOUT = 1.0
+
+
+class AudioSource(Protocol):
+    '''
+    read returns the next block of samples, an empty block if none arrived
+    within READ_TIMEOUT, or None once the source has ended.
+    '''
+    sample_rate: int
+
+    def read(self) -> np.ndarray | None: ...
+
+    def close(self) -> None: ...
+
+
+class RingBuffer:
+    '''
+    RingBuffer keeps the last capacity samples written to it.
+    '''
+
+    def __init__(self, capacity: int):
+        self.samples = np.zeros(capacity, np.float32)
+        self.written = 0
+
+    def write(self, block: np.ndarray) -> None:
+        capacity = len(self.samples)
+        block = block[-capacity:]
+        start = self.written % capacity
+        first = min(len(block), capacity - start)
+
+        self.samples[start:start + first] = block[:first]
+        self.samples[:len(block) - first] = block[first:]
+        self.written += len(block)
+
+    def latest(self, n: int) -> np.ndarray:
+        '''
+        latest returns the last n samples in order, n must not exceed the capacity.
+        '''
+        end = self.written % len(self.samples)
+
+        if n <= end:
+            return self.samples[end - n:end]
+
+        return np.concatenate((self.samples[end - n:], self.samples[:end]))
+
+
+def detect_pitch(frame: np.ndarray, sample_rate: int, min_frequency: float = MIN_FREQUENCY, max_frequency: float = MAX_FREQUENCY, threshold: float = YIN_THRESHOLD) -> float | None:
+    '''
+    detect_pitch returns the fundamental frequency of frame in Hz found with the
+    YIN algorithm, or None if it is not periodic enough. The difference function
+    is computed for all lags at once from an FFT cross-correlation and running
+    sums of squares.
+    '''
+    tau_min = int(sample_rate / max_frequency)
+    tau_max = int(sample_rate / min_frequency)
+    n = len(frame) - tau_max
+
+    if n <= 0:
+        raise ValueError(f"frame of {len(frame)} samples is too short for {min_frequency} Hz")
+
+    x = frame.astype(np.float64)
+    size = 1 << math.ceil(math.log2(len(x) + n))
+    cross = np.fft.irfft(np.fft.rfft(x, size) * np.conj(np.fft.rfft(x[:n], size)), size)[:tau_max + 1]
+
+    # energy[tau] is the sum of x[tau:tau + n] squared
+    squares = np.concatenate(([0.0], np.cumsum(x * x)))
+    lags = np.arange(tau_max + 1)
+    energy = squares[lags + n] - squares[lags]
+
+    difference = np.maximum(energy[0] + energy - 2 * cross, 0)
+    normalized = np.ones(tau_max + 1)
+    normalized[1:] = difference[1:] * lags[1:] / np.maximum(np.cumsum(difference[1:]), 1e-12)
+
+    candidates = np.flatnonzero(normalized[tau_min:tau_max] < threshold)
+
+    if len(candidates) == 0:
+        return None
+
+    tau = int(candidates[0]) + tau_min
+
+    while tau + 1 < tau_max and normalized[tau + 1] < normalized[tau]:
+        tau += 1
+
+    # the minimum lies between samples, fitted with a parabola through its neighbours
+    before, at, after = normalized[tau - 1:tau + 2]
+    curvature = before - 2 * at + after
+    shift = (before - after) / (2 * curvature) if curvature > 0 else 0.0
+
+    return sample_rate / (tau + shift)
+
+
+def frequency_to_note(frequency: float) -> int:
+    return round(69 + 12 * math.log2(frequency / 440))
+
+
+class PitchTracker:
+    '''
+    PitchTracker turns a stream of audio blocks into key events. Every block is
+    written to a ring buffer and the pitch of the latest window is detected.
+    A note starts once the same note is detected STABLE_BLOCKS blocks in a row
+    and ends when another note takes over, the sound goes quiet or the same
+    note is sung or played again with a sudden jump in loudness.
+
+    Event timestamps are milliseconds since the start of the stream plus
+    time_offset, at the block where the note was first detected.
+    '''
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, time_offset: int = 0):
+        self.sample_rate = sample_rate
+        self.time_offset = time_offset
+        self.buffer = RingBuffer(WINDOW_SIZE)
+        self.note: int | None = None
+        self._candidate: int | None = None
+        self._candidate_count = 0
+        self._candidate_since = 0
+        # an onset can be split over two blocks, so loudness is compared with two blocks back
+        self._recent_rms: deque[float] = deque([0.0, 0.0], maxlen=2)
+
+    def _timestamp(self, position: int) -> int:
+        return self.time_offset + position * 1000 // self.sample_rate
+
+    def process(self, block: np.ndarray) -> list[KeyEvent]:
+        position = self.buffer.written
+        self.buffer.write(block)
+
+        if self.buffer.written < WINDOW_SIZE:
+            return []
+
+        rms = float(np.sqrt(np.mean(np.square(block, dtype=np.float64))))
+        detected = None
+
+        if rms >= SILENCE_RMS:
+            frequency = detect_pitch(self.buffer.latest(WINDOW_SIZE), self.sample_rate)
+            detected = None if frequency is None else frequency_to_note(frequency)
+
+        events = []
+
+        if self.note is not None and rms > self._recent_rms[0] * ONSET_RATIO:
+            # a new onset without a change of pitch, the note starts again once it is stable
+            events.append(KeyEvent(self.note, 0, False, self._timestamp(position)))
+            self.note = None
+            self._candidate_count = 0
+            self._candidate_since = position
+
+        self._recent_rms.append(rms)
+
+        if detected != self._candidate:
+            self._candidate = detected
+            self._candidate_count = 0
+            self._candidate_since = position
+
+        self._candidate_count += 1
+
+        if self._candidate_count == STABLE_BLOCKS and self._candidate != self.note:
+            timestamp = self._timestamp(self._candidate_since)
+
+            if self.note is not None:
+                events.append(KeyEvent(self.note, 0, False, timestamp))
+
+            if self._candidate is not None:
+                events.append(KeyEvent(self._candidate, self._velocity(rms), True, timestamp))
+
+            self.note = self._candidate
+
+        return events
+
+    def finish(self) -> list[KeyEvent]:
+        '''
+        finish ends the note sounding when the stream ends.
+        '''
+        if self.note is None:
+            return []
+
+        event = KeyEvent(self.note, 0, False, self._timestamp(self.buffer.written))
+        self.note = None
+
+        return [event]
+
+    @staticmethod
+    def _velocity(rms: float) -> int:
+        return max(1, min(127, int(rms / FULL_SCALE_RMS * 127)))
+
+
+class WavSource:
+    '''
+    WavSource reads a PCM WAV file in blocks as float samples, mixed down to
+    mono. It stands in for a microphone in tests and benchmarks. With realtime
+    it takes as long to read as the file takes to play.
+    '''
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE, realtime: bool = False):
+        self._file = wave.open(path, "rb")
+        self.sample_rate = self._file.getframerate()
+        self.block_size = block_size
+        self.realtime = realtime
+        self._channels = self._file.getnchannels()
+        self._width = self._file.getsampwidth()
+        self._start: float | None = None
+        self._read = 0
+
+        if self._width not in (1, 2, 4):
+            raise ValueError(f"{path}: unsupported sample width of {self._width} bytes")
+
+    def read(self) -> np.ndarray | None:
+        data = self._file.readframes(self.block_size)
+
+        if not data:
+            return None
+
+        if self._width == 1: # 8 bit WAV is unsigned
+            samples = (np.frombuffer(data, np.uint8).astype(np.float32) - 128) / 128
+        else:
+            dtype = np.int16 if self._width == 2 else np.int32
+            samples = np.frombuffer(data, dtype).astype(np.float32) / np.iinfo(dtype).max
+
+        samples = samples.reshape(-1, self._channels).mean(axis=1)
+
+        if self.realtime:
+            if self._start is None:
+                self._start = time.perf_counter()
+
+            self._read += len(samples)
+            delay = self._start + self._read / self.sample_rate - time.perf_counter()
+
+            if delay > 0:
+                time.sleep(delay)
+
+        return samples
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> None:
+    '''
+    write_wav saves float samples between -1 and 1 as a mono 16 bit WAV file.
+    '''
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+class MicrophoneSource:
+    '''
+    MicrophoneSource records from the default audio capture device through SDL.
+    '''
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, block_size: int = BLOCK_SIZE):
+        # SDL's audio capture is only exposed by pygame's private _sdl2 module
+        from pygame._sdl2.audio import AudioDevice, AUDIO_F32, get_audio_device_names
+
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+        names = get_audio_device_names(True)
+
+        if not names:
+            raise ValueError("no audio capture device")
+
+        self.sample_rate = sample_rate
+        self._blocks: deque[np.ndarray] = deque()
+        self._ready = threading.Event()
+        self._device = AudioDevice(
+            devicename=names[0],
+            iscapture=True,
+            frequency=sample_rate,
+            audioformat=AUDIO_F32,
+            numchannels=1,
+            chunksize=block_size,
+            allowed_changes=0,
+            callback=self._captured,
+        )
+        self._device.pause(0)
+
+    def _captured(self, device, memory) -> None:
+        self._blocks.append(np.frombuffer(bytes(memory), np.float32))
+        self._ready.set()
+
+    def read(self) -> np.ndarray | None:
+        if not self._blocks:
+            # a paused or unplugged device delivers nothing, the reader must still be able to stop
+            self._ready.wait(READ_TIMEOUT)
+            self._ready.clear()
+
+            if not self._blocks:
+                return np.zeros(0, np.float32)
+
+        return self._blocks.popleft()
+
+    def close(self) -> None:
+        self._device.close()
+
+
+class PitchInput:
+    '''
+    PitchInput reads an audio source on a background thread and hands the key
+    events of detected notes to an asyncio loop, like MidiReader does for MIDI.
+    Event timestamps are milliseconds on the clock of time(). stop closes the
+    source.
+    '''
+
+    def __init__(self, source: AudioSource, loop: asyncio.AbstractEventLoop, dispatch: Callable[[list[KeyEvent]], None], wake: Callable[[], None] | None = None):
+        self.source = source
+        self.loop = loop
+        self.dispatch = dispatch
+        self.wake = wake
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pitch-input", daemon=True)
+
+    @staticmethod
+    def time() -> int:
+        return int(time.perf_counter() * 1000)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+        if self._thread.is_alive():
+            self._thread.join(STOP_TIMEOUT)
+
+        self.source.close()
+
+    def _run(self) -> None:
+        tracker = PitchTracker(self.source.sample_rate, self.time())
+
+        while not self._stop.is_set():
+            block = self.source.read()
+
+            if block is not None and len(block) == 0:
+                continue
+            events = tracker.process(block) if block is not None else tracker.finish()
+
+            if events:
+                try:
+                    self.loop.call_soon_threadsafe(self.dispatch, events)
+                except RuntimeError: # the loop has been closed
+                    return
+
+                if self.wake is not None:
+                    self.wake()
+
+            if block is None:
+                return
@@ -0,0 +1,168 @@
+import asyncio
+import mmap
+import struct
+import time
+from typing import Callable, Iterator
+from context import Context
+from events import Event, KeyEvent, KeystrokeEvent
+
+
+MAGIC = b"ETREC\x00\x02\x00" # the last two bytes are the format version
+
+# the magic and the device clock in milliseconds when the recording started, or -1
+HEADER = struct.Struct("<8sq")
+
+# microseconds since the start of the recording, device timestamp in milliseconds
+# or -1, key, kind, velocity, whether the key went down and the MIDI channel
+RECORD = struct.Struct("<qqIBBBB")
+
+KIND_KEY = 0
+KIND_KEYSTROKE = 1
+
+# records decoded at a time while replaying
+REPLAY_CHUNK = 4096
+
+
+class Recorder:
+    '''
+    Recorder appends every KeyEvent and KeystrokeEvent fired on a context to a
+    file as fixed-size binary records, together with the time since the
+    recording started. Other events are not recorded.
+
+    Install it with attach, which sets it as the context's recorder, and close
+    it when done so buffered records are written out.
+
+    clock measures the time since the start in seconds. device_clock is the clock
+    of the timestamps of key events, if they have any, read once at the start so
+    a replay can tell how long after it happened every event was fired.
+    '''
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.perf_counter, device_clock: Callable[[], int] | None = None):
+        self.path = path
+        self.count = 0
+        self.clock = clock
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, -1 if device_clock is None else device_clock()))
+        self._start = clock()
+
+    def attach(self, ctx: Context) -> None:
+        ctx.recorder = self.record
+
+    def record(self, event: Event) -> None:
+        elapsed = round((self.clock() - self._start) * 1_000_000)
+
+        if isinstance(event, KeyEvent):
+            timestamp = -1 if event.timestamp is None else event.timestamp
+            self._file.write(RECORD.pack(elapsed, timestamp, event.key, KIND_KEY, event.velocity, event.pressing, event.channel))
+        elif isinstance(event, KeystrokeEvent):
+            self._file.write(RECORD.pack(elapsed, -1, event.key, KIND_KEYSTROKE, 0, event.pressed_down, 0))
+        else:
+            return
+
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _to_event(timestamp: int, key: int, kind: int, velocity: int, down: int, channel: int) -> Event:
+    if kind == KIND_KEYSTROKE:
+        return KeystrokeEvent(key, bool(down))
+
+    return KeyEvent(key, velocity, bool(down), None if timestamp == -1 else timestamp, channel)
+
+
+class Replay:
+    '''
+    Replay reads a file written by Recorder. The file is memory-mapped and
+    records are only decoded into events as they are iterated, a chunk at a time.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+
+            if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+                raise ValueError(f"{path} is not an input recording")
+
+            device_start = HEADER.unpack(header)[1]
+            self.device_start = None if device_start == -1 else device_start
+
+            size = f.seek(0, 2)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > HEADER.size else None
+
+        # a record cut short by a crash while recording is ignored
+        self._count = (size - HEADER.size) // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def duration(self) -> float:
+        '''
+        duration returns the time of the last record in seconds.
+        '''
+        if self._count == 0:
+            return 0.0
+
+        offset = HEADER.size + (self._count - 1) * RECORD.size
+
+        return RECORD.unpack_from(self._map, offset)[0] / 1_000_000
+
+    def events(self) -> Iterator[tuple[float, Event]]:
+        '''
+        events yields every recorded event with its time in seconds since the start of the recording.
+        '''
+        if self._count == 0:
+            return
+
+        end = HEADER.size + self._count * RECORD.size
+        chunk_size = REPLAY_CHUNK * RECORD.size
+
+        for chunk_start in range(HEADER.size, end, chunk_size):
+            chunk = self._map[chunk_start:min(chunk_start + chunk_size, end)]
+
+            for elapsed, *fields in RECORD.iter_unpack(chunk):
+                yield elapsed / 1_000_000, _to_event(*fields)
+
+    async def play(self, fire: Callable[[Event], None], speed: float = 1.0, device_clock: Callable[[], int] | None = None) -> int:
+        '''
+        play passes the recorded events to fire, usually Context.fire_events, with
+        the recorded spacing divided by speed. A speed of 0 replays as fast as possible,
+        only yielding to the event loop between chunks. Returns the number of events replayed.
+
+        Recorded device timestamps mean nothing on the live device clock, so they
+        are moved onto device_clock, as long before the event is fired as they
+        were before it was recorded. Without a device clock on either side they are dropped.
+        '''
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        replayed = 0
+
+        for elapsed, event in self.events():
+            if speed > 0:
+                delay = start + elapsed / speed - loop.time()
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif replayed % REPLAY_CHUNK == 0:
+                await asyncio.sleep(0)
+
+            if isinstance(event, KeyEvent) and event.timestamp is not None:
+                if device_clock is None or self.device_start is None:
+                    event.timestamp = None
+                else:
+                    # how late the event was fired when recorded, scaled like the spacing
+                    lag = self.device_start + elapsed * 1000 - event.timestamp
+                    event.timestamp = device_clock() - round(lag / speed if speed > 0 else 0)
+
+            fire(event)
+            replayed += 1
+
+        return replayed
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from context import Context
+
+
+# seconds between writes of the queued results, unless BATCH_SIZE of them are waiting
+FLUSH_INTERVAL = 2.0
+BATCH_SIZE = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    game TEXT NOT NULL,
+    session INTEGER NOT NULL,
+    time REAL NOT NULL, -- seconds since the epoch
+    note INTEGER NOT NULL,
+    interval INTEGER, -- semitones from the previous note asked for, if there was one
+    correct INTEGER NOT NULL,
+    response_ms REAL
+);
+-- covers the aggregate queries, which then never read the table itself
+CREATE INDEX IF NOT EXISTS results_by_student ON results (student, time, note, interval, correct);
+'''
+
+INSERT = "INSERT INTO results (student, game, session, time, note, interval, correct, response_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+@dataclass
+class Accuracy:
+    attempts: int
+    correct: int
+
+    @property
+    def rate(self) -> float:
+        return self.correct / self.attempts if self.attempts else 0.0
+
+
+class ResultStore:
+    '''
+    ResultStore keeps the result of every note a student was asked for in an
+    SQLite file, for history across sessions. Recording a result only appends
+    it to an in-memory queue, a background thread writes the queue out in one
+    transaction every FLUSH_INTERVAL seconds or once BATCH_SIZE results are
+    waiting, so the render loop never waits for the disk.
+
+    Games record results through Context.record_result once the store is
+    attached to their context. Queries first wait for the queued results to be
+    written, so they always include them.
+    '''
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: deque[tuple] = deque()
+        self._queued = 0
+        self._written = 0
+        self._written_changed = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._db = sqlite3.connect(path)
+        # readers are not blocked by the writer thread and commits do not wait for fsync
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+        self._thread = threading.Thread(target=self._run, name="results", daemon=True)
+        self._thread.start()
+
+    def attach(self, ctx: Context, student: str, game: str) -> None:
+        '''
+        attach sets the store as the context's results store. Everything the
+        game records is saved as one session of student playing game.
+        '''
+        session = time.time_ns() // 1_000_000
+
+        def record(note: int, correct: bool, interval: int | None, response_ms: float | None) -> None:
+            self.record(student, game, session, note, correct, interval, response_ms)
+
+        ctx.results = record
+
+    def record(self, student: str, game: str, session: int, note: int, correct: bool, interval: int | None = None, response_ms: float | None = None) -> None:
+        self._queue.append((student, game, session, time.time(), note, interval, correct, response_ms))
+        self._queued += 1
+
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def _write(self, db: sqlite3.Connection) -> None:
+        # appends by other threads go on while popping, only what was queued before counts
+        rows = [self._queue.popleft() for _ in range(len(self._queue))]
+
+        if rows:
+            with db:
+                db.executemany(INSERT, rows)
+
+        with self._written_changed:
+            self._written += len(rows)
+            self._written_changed.notify_all()
+
+    def _run(self) -> None:
+        # SQLite connections belong to the thread that opened them
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")
+
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self._write(db)
+
+            self._write(db)
+        finally:
+            db.close()
+
+    def flush(self) -> None:
+        '''
+        flush waits until every result recorded so far is written to the file.
+        '''
+        target = self._queued
+
+        if not self._thread.is_alive():
+            if self._written < target:
+                raise RuntimeError("the results store is closed")
+            return
+
+        self._wake.set()
+
+        with self._written_changed:
+            self._written_changed.wait_for(lambda: self._written >= target or not self._thread.is_alive())
+
+    def _aggregate(self, column: str, student: str, since: float | None, until: float | None) -> dict[int, Accuracy]:
+        self.flush()
+
+        rows = self._db.execute(
+            f"SELECT {column}, COUNT(*), SUM(correct) FROM results"
+            f" WHERE student = ? AND time >= ? AND time < ? AND {column} IS NOT NULL GROUP BY {column}",
+            (student, since if since is not None else float("-inf"), until if until is not None else float("inf")),
+        )
+
+        return {key: Accuracy(attempts, correct) for key, attempts, correct in rows}
+
+    def accuracy_by_note(self, student: str, since: float | None = None, until: float | None = None) -> dict[int, Accuracy]:
+        '''
+        accuracy_by_note returns how often student got each note right between
+        the times since and until, seconds since the epoch, either open-ended if None.
+        '''
+        return self._aggregate("note", student, since, until)
+
+    def accuracy_by_interval(self, student: str, since: float | None = None, until: float | None = None) -> dict[int, Accuracy]:
+        '''
+        accuracy_by_interval returns how often student got a note right by its
+        interval in semitones from the previous note, like accuracy_by_note.
+        '''
+        return self._aggregate("interval", student, since, until)
+
+    def sessions(self, student: str, since: float | None = None, until: float | None = None) -> list[tuple[int, str, Accuracy]]:
+        '''
+        sessions returns the id, game and accuracy of every session of student in the time window, oldest first.
+        '''
+        self.flush()
+
+        rows = self._db.execute(
+            "SELECT session, game, COUNT(*), SUM(correct) FROM results"
+            " WHERE student = ? AND time >= ? AND time < ? GROUP BY session, game ORDER BY session",
+            (student, since if since is not None else float("-inf"), until if until is not None else float("inf")),
+        )
+
+        return [(session, game, Accuracy(attempts, correct)) for session, game, attempts, correct in rows]
+
+    def close(self) -> None:
+        '''
+        close writes out the queued results and closes the file.
+        '''
+        if self._stop.is_set():
+            return
+
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._db.close()
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+import pygame
+import pygame.midi
+
+from context import Brush, Context
+from events import MidiBatchEvent
+from game_loader import Game
+from midi_input import MidiDevice, MidiReader, decode_packed
+from simulation import NullBrush
+
+
+DEFAULT_FPS = 30
+SURFACE_SIZE = (800, 600)
+BACKGROUND_COLOR = (255, 255, 255)
+
+
+@dataclass
+class Session:
+    '''
+    Session is one player: a private instance of a game, the context it runs
+    on and the off-screen surface it renders to, with the brush drawing on it
+    and one drawing nothing for the frames that are not rendered.
+    '''
+    id: int
+    game: Game
+    ctx: Context
+    surface: pygame.surface.Surface
+    brush: Brush
+    null_brush: Brush
+    device: MidiDevice | None = None
+    rendered_frames: int = 0
+    events_fired: int = 0
+
+
+@dataclass
+class HostStats:
+    sessions: int
+    frames: int
+    late_frames: int
+    rendered_frames: int
+    events_fired: int
+    tick_ms_mean: float
+    tick_ms_p95: float
+    wall_seconds: float
+
+
+class SessionHost:
+    '''
+    SessionHost runs many sessions side by side on one event loop. Every frame
+    it updates every session, and renders those that are dirty to their own
+    off-screen surface every render_every frames, or never if it is 0. An fps
+    of 0 runs frames back to back. The MIDI inputs of all sessions are read by a
+    single MidiReader thread and dispatched to their session's context.
+
+    Games run isolated, so sessions of the same game do not share module globals.
+    '''
+
+    def __init__(self, fps: float = DEFAULT_FPS, render_every: int = 1, surface_size: tuple[int, int] = SURFACE_SIZE):
+        self.fps = fps
+        self.render_every = render_every
+        self.surface_size = surface_size
+        self.sessions: dict[int, Session] = {}
+        self._next_id = 0
+        self._reader: MidiReader | None = None
+
+    def add(self, game_name: str, device: MidiDevice | None = None) -> Session:
+        '''
+        add starts a new session of a game, reading input from device if given.
+        It must be called with the loop running.
+        '''
+        surface = pygame.surface.Surface(self.surface_size)
+        ctx = Context(surface)
+        session = Session(self._next_id, Game(game_name, isolated=True), ctx, surface, ctx.brush, NullBrush(surface), device)
+        self._next_id += 1
+
+        self.sessions[session.id] = session
+        session.game.begin(session.ctx)
+
+        if device is not None:
+            # FakeMidiInput has its own clock, real devices are timestamped by PortMidi
+            session.ctx.device_clock = getattr(device, "time", pygame.midi.time)
+
+            if self._reader is None:
+                self._reader = MidiReader(None, asyncio.get_running_loop())
+                self._reader.start()
+
+            self._reader.add(device, lambda batch: self._dispatch(session, batch))
+
+        return session
+
+    def remove(self, session_id: int) -> None:
+        session = self.sessions.pop(session_id)
+        session.game.stop(session.ctx)
+
+    @staticmethod
+    def _dispatch(session: Session, batch: MidiBatchEvent) -> None:
+        session.ctx.fire_events(batch)
+
+        for midi_event in decode_packed(batch.messages):
+            session.ctx.fire_events(midi_event)
+            session.events_fired += 1
+
+    def _update(self, session: Session, render: bool) -> None:
+        # on_update runs every frame, games advance their state in it
+        session.ctx.brush = session.brush if render else session.null_brush
+
+        if render:
+            session.ctx.dirty = False
+            session.surface.fill(BACKGROUND_COLOR)
+
+        session.game.update(session.ctx)
+        session.rendered_frames += render
+
+    async def run(self, duration: float) -> HostStats:
+        '''
+        run drives every session for duration seconds on the loop's clock and
+        then stops them. A frame is late when rendering all sessions took longer
+        than a frame.
+        '''
+        loop = asyncio.get_running_loop()
+        frame_time = 1 / self.fps if self.fps > 0 else 0.0
+        start = next_frame = loop.time()
+        wall_start = time.perf_counter()
+        ticks = []
+        frames = late = 0
+
+        try:
+            while loop.time() - start < duration:
+                tick_start = time.perf_counter()
+
+                render_frame = self.render_every > 0 and frames % self.render_every == 0
+
+                for session in list(self.sessions.values()):
+                    self._update(session, render_frame and session.ctx.dirty)
+
+                ticks.append(time.perf_counter() - tick_start)
+                frames += 1
+                next_frame += frame_time
+
+                if frame_time > 0 and ticks[-1] > frame_time:
+                    late += 1
+
+                # a host that cannot keep up drops frames instead of piling them up
+                next_frame = max(next_frame, loop.time())
+                await asyncio.sleep(next_frame - loop.time())
+        finally:
+            self.close()
+
+        ticks.sort()
+
+        return HostStats(
+            sessions=len(self.sessions),
+            frames=frames,
+            late_frames=late,
+            rendered_frames=sum(s.rendered_frames for s in self.sessions.values()),
+            events_fired=sum(s.events_fired for s in self.sessions.values()),
+            tick_ms_mean=sum(ticks) / len(ticks) * 1000 if ticks else 0.0,
+            tick_ms_p95=ticks[int(len(ticks) * 0.95)] * 1000 if ticks else 0.0,
+            wall_seconds=time.perf_counter() - wall_start,
+        )
+
+    def close(self) -> None:
+        '''
+        close stops the MIDI reader and every session's game. The sessions stay
+        in sessions so their counters can still be read.
+        '''
+        if self._reader is not None:
+            self._reader.stop()
+            self._reader = None
+
+        for session in self.sessions.values():
+            session.game.stop(session.ctx)
+
+
+def _open_input(port: int) -> MidiDevice:
+    if not pygame.midi.get_init():
+        pygame.midi.init()
+
+    return pygame.midi.Input(port)
+
+
+def _host_worker(game_name: str, ports: list[int | None], duration: float, fps: float, render_every: int) -> dict:
+    async def host():
+        session_host = SessionHost(fps, render_every)
+
+        for port in ports:
+            session_host.add(game_name, None if port is None else _open_input(port))
+
+        return await session_host.run(duration)
+
+    return asdict(asyncio.run(host()))
+
+
+def run(game_name: str, n_sessions: int, *, processes: int = 1, ports: list[int] | None = None, duration: float, fps: float = DEFAULT_FPS, render_every: int = 1) -> list[dict]:
+    '''
+    run hosts n_sessions sessions of a game for duration seconds, spread over
+    processes worker processes, one per core if it is 0, or all on this process's
+    loop if it is 1. Session i reads from MIDI input port ports[i], sessions
+    beyond the given ports have no input. Prints and returns the statistics of
+    every process.
+    '''
+    ports = list(ports or [])
+    ports = ports[:n_sessions] + [None] * (n_sessions - len(ports))
+    processes = max(1, min(processes or os.cpu_count() or 1, n_sessions))
+
+    # sessions are dealt out round robin so every process gets a similar share
+    shares = [ports[i::processes] for i in range(processes)]
+
+    if processes == 1:
+        results = [_host_worker(game_name, shares[0], duration, fps, render_every)]
+    else:
+        # spawned rather than forked, pygame and PortMidi state must not be copied
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_host_worker, game_name, share, duration, fps, render_every) for share in shares]
+            results = [future.result() for future in futures]
+
+    for result in results:
+        print(json.dumps(result))
+
+    return results
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import random
+import selectors
+import time
+from dataclasses import dataclass, asdict
+import pygame
+
+import audio
+from context import Brush, Context
+from events import KeyEvent
+from game_loader import Game
+
+
+DEFAULT_FPS = 60
+SURFACE_SIZE = (800, 600)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    '''
+    A selector that never blocks. When asked to wait for a timeout it advances
+    the virtual clock instead, which makes the next timer due right away.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+
+        if not ready and timeout is not None and timeout > 0:
+            self.now += timeout
+
+        return ready
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    '''
+    VirtualClockLoop is an event loop whose time only moves forward when there is
+    nothing left to run, jumping straight to the next timer. Coroutines sleeping
+    on it behave as in real time, only as fast as the CPU allows.
+    '''
+
+    def __init__(self):
+        self._virtual_selector = _VirtualSelector()
+        super().__init__(self._virtual_selector)
+
+    def time(self) -> float:
+        return self._virtual_selector.now
+
+
+@dataclass
+class ScriptedKey:
+    time: float # seconds after the start of the session
+    event: KeyEvent
+
+
+def load_script(path: str) -> list[ScriptedKey]:
+    '''
+    load_script reads key events from a text file with one event per line:
+    the time in seconds, the key, the velocity and 1 for pressing or 0 for
+    releasing, separated by whitespace. Everything after a # is ignored.
+    '''
+    script = []
+
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split("#", 1)[0].split()
+
+            if not fields:
+                continue
+
+            try:
+                t, key, velocity, pressing = fields
+                script.append(ScriptedKey(float(t), KeyEvent(int(key), int(velocity), pressing == "1")))
+            except ValueError as exc:
+                raise ValueError(f"{path}:{line_number}: expected 'time key velocity pressing'") from exc
+
+    script.sort(key=lambda s: s.time)
+
+    return script
+
+
+class NullBrush(Brush):
+    '''
+    NullBrush draws nothing. It stands in for the real brush on frames that are not rendered.
+    '''
+
+    def draw_text(self, *args, **kwargs):
+        pass
+
+    def draw_staff(self, *args, **kwargs):
+        pass
+
+
+@dataclass
+class SimulationResult:
+    session: int
+    seed: int
+    frames: int
+    rendered_frames: int
+    events_fired: int
+    virtual_seconds: float
+    wall_seconds: float
+
+
+async def _simulate(game: Game, script: list[ScriptedKey], duration: float, render_every: int, fps: float) -> tuple[int, int, int]:
+    loop = asyncio.get_running_loop()
+    surface = pygame.surface.Surface(SURFACE_SIZE)
+    ctx = Context(surface)
+    brush, null_brush = ctx.brush, NullBrush(surface)
+
+    game.begin(ctx)
+
+    start = loop.time()
+    frames = rendered = fired = 0
+    next_key = 0
+
+    try:
+        while loop.time() - start < duration:
+            now = loop.time() - start
+
+            while next_key < len(script) and script[next_key].time <= now:
+                ctx.fire_events(script[next_key].event)
+                next_key += 1
+                fired += 1
+
+            render = render_every > 0 and frames % render_every == 0
+            ctx.brush = brush if render else null_brush
+
+            if render:
+                surface.fill((255, 255, 255))
+
+            game.update(ctx)
+            frames += 1
+            rendered += render
+
+            await asyncio.sleep(1 / fps)
+    finally:
+        game.stop(ctx)
+
+    return frames, rendered, fired
+
+
+async def _cancel_remaining_tasks() -> None:
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def simulate(game_name: str, script: list[ScriptedKey], *, duration: float, render_every: int = 0, fps: float = DEFAULT_FPS, session: int = 0, seed: int = 0) -> SimulationResult:
+    '''
+    simulate plays one session of a game against a script of key events on a
+    virtual clock advancing in frames of 1 / fps seconds. The game is rendered off-screen every render_every frames,
+    or never if it is 0; on_update is called every frame regardless so games
+    that advance their state while drawing still work.
+    '''
+    random.seed(seed)
+
+    # start from fresh module state, games keep theirs in globals
+    game = Game(game_name, isolated=True)
+
+    loop = VirtualClockLoop()
+    wall_start = time.perf_counter()
+
+    try:
+        frames, rendered, fired = loop.run_until_complete(_simulate(game, script, duration, render_every, fps))
+        virtual_seconds = loop.time()
+
+        loop.run_until_complete(_cancel_remaining_tasks())
+    finally:
+        loop.close()
+
+    return SimulationResult(session, seed, frames, rendered, fired, virtual_seconds, time.perf_counter() - wall_start)
+
+
+def run(game_name: str, script_path: str, *, sessions: int, duration: float, render_every: int, fps: float, seed: int) -> None:
+    '''
+    run simulates several sessions one after another, printing the result of
+    each as a JSON line followed by a summary.
+    '''
+    script = load_script(script_path)
+    audio.use_output(audio.NullOutput())
+
+    wall_start = time.perf_counter()
+
+    for session in range(sessions):
+        result = simulate(game_name, script, duration=duration, render_every=render_every, fps=fps, session=session, seed=seed + session)
+        print(json.dumps(asdict(result)))
+
+    wall_seconds = time.perf_counter() - wall_start
+
+    print(json.dumps({
+        "sessions": sessions,
+        "wall_seconds": wall_seconds,
+        "sessions_per_minute": sessions / wall_seconds * 60,
+        "speedup": sessions * duration / wall_seconds,
+    }))
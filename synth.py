@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+import pygame
+
+SAMPLE_RATE = 22050
+BLOCK_SIZE = 256 # samples mixed at a time, about 12 ms at 22050 Hz
+MIXER_BUFFER = 256
+MAX_VOICES = 16
+MASTER_GAIN = 0.5
+
+# every note of the bank lasts this long and fades out on its own
+BANK_SECONDS = 2.0
+RELEASE_SECONDS = 0.08
+ATTACK_SECONDS = 0.005
+
+# bump when the synthesis changes so cached banks are rendered again
+BANK_VERSION = 1
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser(os.path.join("~", ".cache"))), "ear-training")
+
+N_NOTES = 128
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+
+def _render_note(note: int, n_samples: int, sample_rate: int) -> np.ndarray:
+    t = np.arange(n_samples) / sample_rate
+    frequency = 440 * 2 ** ((note - 69) / 12)
+    tone = np.zeros(n_samples)
+
+    # a few decaying harmonics, higher ones fading faster, none above the Nyquist frequency
+    for harmonic in range(1, 5):
+        if frequency * harmonic >= sample_rate / 2:
+            break
+
+        tone += np.sin(2 * np.pi * frequency * harmonic * t) * np.exp(-t * (1.5 + harmonic)) / harmonic ** 1.5
+
+    attack = min(n_samples, int(ATTACK_SECONDS * sample_rate))
+    tone[:attack] *= np.linspace(0, 1, attack)
+    peak = np.abs(tone).max()
+
+    return (tone / peak * 0.8 * 32767).astype(np.int16) if peak > 0 else tone.astype(np.int16)
+
+
+def load_bank(sample_rate: int = SAMPLE_RATE, cache_dir: str = CACHE_DIR) -> np.ndarray:
+    '''
+    load_bank returns the samples of all 128 notes as a (128, samples) int16
+    array, memory-mapped from a file in cache_dir. The bank is synthesized and
+    saved there the first time.
+    '''
+    path = os.path.join(cache_dir, f"bank-v{BANK_VERSION}-{sample_rate}.npy")
+
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        n_samples = int(BANK_SECONDS * sample_rate)
+
+        # written under a temporary name so an interrupted run does not leave half a bank behind
+        temporary = f"{path}.{os.getpid()}.tmp"
+        bank = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.int16, shape=(N_NOTES, n_samples))
+
+        for note in range(N_NOTES):
+            bank[note] = _render_note(note, n_samples, sample_rate)
+
+        bank.flush()
+        del bank
+        os.replace(temporary, path)
+
+    return np.load(path, mmap_mode="r")
+
+
+class SynthOutput:
+    '''
+    SynthOutput plays notes with a built-in sampler through pygame.mixer, for
+    machines without a MIDI output device. It has the interface of a MIDI
+    output, timestamped messages passed to write are played at their time on
+    the clock of time().
+
+    A background thread mixes the active voices in blocks of BLOCK_SIZE samples
+    and queues each block on a mixer channel while the previous one plays. At
+    most max_voices notes sound at once, the oldest one is cut off for a new one.
+
+    stats reports how long mixing a block takes and how long a note waited
+    between note_on and its block being queued, which together with the blocks
+    buffered ahead is the latency of the synth.
+    '''
+
+    def __init__(self, max_voices: int = MAX_VOICES, cache_dir: str = CACHE_DIR):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=1, buffer=MIXER_BUFFER)
+
+        self.sample_rate, _, self.channels = pygame.mixer.get_init()
+        self.bank = load_bank(self.sample_rate, cache_dir)
+        self.max_voices = max_voices
+        self.block_ms = BLOCK_SIZE / self.sample_rate * 1000
+
+        self.voice_note = np.full(max_voices, -1)
+        self.voice_position = np.zeros(max_voices, np.int64) # negative while waiting to start within a block
+        self.voice_release = np.full(max_voices, -1, np.int64) # position where the release starts, -1 if held
+        self.voice_age = np.zeros(max_voices, np.int64)
+        self.voice_gain = np.zeros(max_voices, np.float32)
+
+        self.mix_times: deque[float] = deque(maxlen=1000)
+        self.note_latencies: deque[float] = deque(maxlen=1000)
+        self.underruns = 0
+
+        self._pending: list[tuple[int, list[int], float]] = []
+        self._lock = threading.Lock()
+        self._next_age = 0
+        self._release = np.linspace(1, 0, int(RELEASE_SECONDS * self.sample_rate), dtype=np.float32)
+        self._block_start = self.time()
+        self._channel = pygame.mixer.Channel(0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="synth", daemon=True)
+        self._thread.start()
+
+        # the mixing thread must be stopped before pygame.quit shuts down the mixer under it
+        pygame.register_quit(self.close)
+
+    @staticmethod
+    def time() -> int:
+        return int(time.perf_counter() * 1000)
+
+    def set_instrument(self, instrument_id: int, channel: int = 0) -> None:
+        pass
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        self.write([[[NOTE_ON | channel, note, velocity], self.time()]])
+
+    def note_off(self, note: int, velocity: int = 0, channel: int = 0) -> None:
+        self.write([[[NOTE_OFF | channel, note, velocity], self.time()]])
+
+    def write(self, data: list) -> None:
+        requested = time.perf_counter()
+
+        with self._lock:
+            self._pending.extend((timestamp, message, requested) for message, timestamp in data)
+            self._pending.sort(key=lambda pending: pending[0])
+
+    def _start_voice(self, note: int, velocity: int, offset: int) -> None:
+        free = np.flatnonzero(self.voice_note == -1)
+        voice = free[0] if len(free) else int(np.argmin(self.voice_age))
+
+        self.voice_note[voice] = note
+        self.voice_position[voice] = -offset
+        self.voice_release[voice] = -1
+        self.voice_age[voice] = self._next_age
+        self.voice_gain[voice] = velocity / 127
+        self._next_age += 1
+
+    def _release_voice(self, note: int, offset: int) -> None:
+        for voice in np.flatnonzero((self.voice_note == note) & (self.voice_release == -1)):
+            self.voice_release[voice] = self.voice_position[voice] + offset
+
+    def mix_block(self) -> np.ndarray:
+        '''
+        mix_block applies the messages due in the next block and returns the
+        block's samples as int16.
+        '''
+        start = time.perf_counter()
+        block_end = self._block_start + self.block_ms
+
+        with self._lock:
+            due = 0
+
+            while due < len(self._pending) and self._pending[due][0] < block_end:
+                due += 1
+
+            messages, self._pending = self._pending[:due], self._pending[due:]
+
+        started = []
+
+        for timestamp, [status, note, velocity], requested in messages:
+            offset = min(BLOCK_SIZE - 1, max(0, int((timestamp - self._block_start) * self.sample_rate / 1000)))
+
+            if status & 0xF0 == NOTE_ON and velocity > 0:
+                self._start_voice(note, velocity, offset)
+                started.append(requested)
+            elif status & 0xF0 in (NOTE_ON, NOTE_OFF):
+                self._release_voice(note, offset)
+
+        mixed = np.zeros(BLOCK_SIZE, np.float32)
+        bank_length = self.bank.shape[1]
+        release_length = len(self._release)
+
+        for voice in np.flatnonzero(self.voice_note != -1):
+            position = int(self.voice_position[voice])
+            first, last = max(0, position), min(bank_length, position + BLOCK_SIZE)
+            samples = np.zeros(BLOCK_SIZE, np.float32)
+
+            if last > first:
+                samples[first - position:last - position] = self.bank[self.voice_note[voice], first:last]
+
+            release = int(self.voice_release[voice])
+
+            if release != -1:
+                # index into the release ramp of every sample of the block, silent past its end
+                ramp = np.arange(position - release, position - release + BLOCK_SIZE)
+                envelope = np.ones(BLOCK_SIZE, np.float32)
+                envelope[ramp >= 0] = self._release[np.minimum(ramp[ramp >= 0], release_length - 1)]
+                envelope[ramp >= release_length] = 0
+                samples *= envelope
+
+            samples *= self.voice_gain[voice]
+
+            if position + BLOCK_SIZE >= bank_length or (release != -1 and position + BLOCK_SIZE - release >= release_length):
+                self.voice_note[voice] = -1
+
+            self.voice_position[voice] = position + BLOCK_SIZE
+            mixed += samples
+
+        self._block_start = block_end
+        now = time.perf_counter()
+        self.mix_times.append(now - start)
+        self.note_latencies.extend(now - requested for requested in started)
+
+        return np.clip(mixed * MASTER_GAIN, -32768, 32767).astype(np.int16)
+
+    def _sound(self, block: np.ndarray) -> pygame.mixer.Sound:
+        if self.channels > 1:
+            block = np.repeat(block, self.channels)
+
+        return pygame.mixer.Sound(buffer=block.tobytes())
+
+    def _run(self) -> None:
+        poll = self.block_ms / 4000
+
+        while not self._stop.is_set():
+            if self._channel.get_busy() and self._channel.get_queue() is not None:
+                time.sleep(poll)
+                continue
+
+            if not self._channel.get_busy():
+                # nothing is playing, start over from now rather than catching up
+                if self._block_start < self.time() - self.block_ms:
+                    self.underruns += 1
+                    self._block_start = self.time()
+
+                self._channel.play(self._sound(self.mix_block()))
+            else:
+                self._channel.queue(self._sound(self.mix_block()))
+
+    def stats(self) -> dict[str, float]:
+        '''
+        stats returns the mean and maximum milliseconds spent mixing a block, the
+        median and maximum milliseconds from a note on to its block being queued,
+        the milliseconds buffered ahead of the block being played and the number
+        of times playback ran dry.
+        '''
+        mix = sorted(self.mix_times) or [0.0]
+        latencies = sorted(self.note_latencies) or [0.0]
+
+        return {
+            "mix_ms_mean": sum(mix) / len(mix) * 1000,
+            "mix_ms_max": mix[-1] * 1000,
+            "note_to_block_ms_p50": latencies[len(latencies) // 2] * 1000,
+            "note_to_block_ms_max": latencies[-1] * 1000,
+            "buffered_ms": self.block_ms + MIXER_BUFFER / self.sample_rate * 1000,
+            "underruns": self.underruns,
+        }
+
+    def active_voices(self) -> int:
+        return int(np.count_nonzero(self.voice_note != -1))
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._channel.stop()
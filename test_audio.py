@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+import audio
+
+
+class TestPlayPhrase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.output = audio.RecordingOutput()
+        audio.use_output(self.output)
+
+    def tearDown(self):
+        audio.use_output(None)
+
+    def test_phrase_messages_order(self):
+        messages = audio.phrase_messages(audio.melody([60, 60], 0.5), 100)
+
+        self.assertEqual(messages, [
+            [[audio.NOTE_ON, 60, 127], 100],
+            [[audio.NOTE_OFF, 60, 0], 600],
+            [[audio.NOTE_ON, 60, 127], 600],
+            [[audio.NOTE_OFF, 60, 0], 1100],
+        ])
+
+    async def test_phrase_is_written_at_once_and_awaitable(self):
+        start = self.output.time()
+        await audio.play_phrase(audio.melody([60, 62, 64], 0.05))
+        end = self.output.time()
+
+        self.assertEqual(self.output.writes, 1)
+
+        onsets = [timestamp - start for timestamp, _ in self.output.note_ons()]
+        first = onsets[0]
+
+        self.assertEqual([o - first for o in onsets], [0, 50, 100])
+        self.assertGreaterEqual(end, start + first + 150)
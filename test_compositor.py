@@ -0,0 +1,81 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from compositor import Compositor, merge_rects
+from context import Context, TREBLE_CLEFF
+from emulator import KeyboardEmulator
+from note_pool import NotePool
+
+
+BACKGROUND_COLOR = (255, 255, 255)
+STAFF_RECT = pygame.Rect(80, 260, 640, 80)
+
+
+class TestCompositor(unittest.TestCase):
+    def setUp(self):
+        pygame.display.init()
+        self.window = pygame.display.set_mode((800, 600))
+        self.compositor = Compositor(self.window, BACKGROUND_COLOR)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_matches_full_redraw(self):
+        reference = pygame.Surface(self.window.get_size())
+        contexts = [Context(self.window, self.compositor), Context(reference)]
+        keyboards = [KeyboardEmulator(self.window, self.compositor), KeyboardEmulator(reference)]
+        pool = NotePool()
+        rng = random.Random(0)
+
+        for frame in range(60):
+            if frame % 5 == 0:
+                pool.spawn(rng.randint(40, 90), 0.0)
+
+            pool.advance(0.02)
+            pressed = {rng.randint(0, 87)} if frame % 3 else set()
+
+            self.compositor.begin_frame()
+            reference.fill(BACKGROUND_COLOR)
+
+            for ctx, keyboard in zip(contexts, keyboards):
+                ctx.brush.draw_staff(TREBLE_CLEFF, 30, STAFF_RECT, pool)
+
+                if frame < 40:
+                    ctx.brush.draw_text("monospace", 24, f"score {frame}", (80, 480), (0, 0, 0))
+
+                keyboard.keys_pressed = set(pressed)
+                keyboard.draw()
+
+            rects = self.compositor.present()
+
+            self.assertEqual(pygame.image.tobytes(self.window, "RGB"), pygame.image.tobytes(reference, "RGB"), f"frame {frame}")
+
+            if frame > 0:
+                self.assertLess(sum(rect.w * rect.h for rect in rects), 800 * 600 / 2)
+
+    def test_removed_static_content_rebuilds(self):
+        ctx = Context(self.window, self.compositor)
+
+        self.compositor.begin_frame()
+        ctx.brush.draw_staff(TREBLE_CLEFF, 30, STAFF_RECT, [])
+        self.assertIsNone(self.compositor.present())
+        self.assertFalse(self.compositor.needs_frame)
+
+        self.compositor.begin_frame()
+        self.assertIsNotNone(self.compositor.present())
+        self.assertTrue(self.compositor.needs_frame)
+
+        self.compositor.begin_frame()
+        self.assertIsNone(self.compositor.present())
+        self.assertEqual(self.window.get_at(STAFF_RECT.center), pygame.Color(BACKGROUND_COLOR))
+
+    def test_merge_rects(self):
+        moving = [pygame.Rect(0, 0, 10, 10), pygame.Rect(2, 1, 10, 10), pygame.Rect(50, 50, 5, 5)]
+        self.assertEqual(merge_rects(moving), [pygame.Rect(0, 0, 12, 11), pygame.Rect(50, 50, 5, 5)])
+
+        crossing = [pygame.Rect(0, 40, 100, 10), pygame.Rect(40, 0, 10, 100)]
+        self.assertEqual(merge_rects(crossing), crossing)
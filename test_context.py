@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+import pygame
+from context import Brush, Context, SubscriptionClosed, TextCache, VisualNote, TREBLE_CLEFF, text_cache
+from events import Event, MidiEvent, KeyEvent, KeystrokeEvent
+
+
+class TestContext(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ctx = Context(pygame.Surface((1, 1)))
+        self.received = []
+
+    async def record(self, event):
+        self.received.append(event)
+
+    async def test_handler_receives_subclasses(self):
+        self.ctx.register_event_handler(MidiEvent, self.record)
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.fire_events(KeystrokeEvent(1, True))
+        await asyncio.sleep(0)
+
+        self.assertEqual(self.received, [KeyEvent(60, 127, True)])
+
+    async def test_cancel(self):
+        handler_id = self.ctx.register_event_handler(KeyEvent, self.record)
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.cancel(handler_id)
+        self.ctx.fire_events(KeyEvent(61, 127, True))
+        await asyncio.sleep(0)
+
+        self.assertEqual(self.received, [KeyEvent(60, 127, True)])
+
+    async def test_callback_fires_once(self):
+        self.ctx.register_callback(Event, self.record)
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.fire_events(KeyEvent(61, 127, True))
+        await asyncio.sleep(0)
+
+        self.assertEqual(self.received, [KeyEvent(60, 127, True)])
+
+    async def test_gather(self):
+        queue_id = self.ctx.begin_gather(KeyEvent, event_filter=lambda e: e.pressing)
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.fire_events(KeyEvent(60, 0, False))
+        self.ctx.fire_events(KeyEvent(62, 127, True))
+
+        self.assertEqual([e.key for e in self.ctx.end_gather(queue_id)], [60, 62])
+        self.assertRaises(ValueError, lambda: self.ctx.end_gather(queue_id))
+
+    async def test_await_events(self):
+        task = asyncio.create_task(self.ctx.await_events(KeyEvent, 2))
+        await asyncio.sleep(0)
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.fire_events(KeyEvent(62, 127, True))
+
+        self.assertEqual([e.key for e in await task], [60, 62])
+        self.assertEqual(self.ctx.subscriptions, {})
+
+    async def test_subscription_filters(self):
+        subscription = self.ctx.subscribe(KeyEvent, keys=range(60, 72), pressing=True)
+        self.ctx.fire_events(KeyEvent(59, 127, True))
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        self.ctx.fire_events(KeyEvent(60, 0, False))
+        self.ctx.fire_events(KeyEvent(71, 127, True))
+
+        self.assertEqual([await subscription.get() for _ in range(2)], [KeyEvent(60, 127, True), KeyEvent(71, 127, True)])
+        self.assertRaises(ValueError, lambda: self.ctx.subscribe(KeystrokeEvent, pressing=True))
+
+    async def test_close_ends_iteration(self):
+        subscription = self.ctx.subscribe(KeyEvent)
+
+        async def collect():
+            return [event.key async for event in subscription]
+
+        task = asyncio.create_task(collect())
+        self.ctx.fire_events(KeyEvent(60, 127, True))
+        await asyncio.sleep(0)
+        subscription.close()
+
+        self.assertEqual(await task, [60])
+        self.assertEqual(self.ctx.subscriptions, {})
+
+    async def test_close_while_waiting(self):
+        subscription = self.ctx.subscribe(KeyEvent)
+        waiters = [asyncio.create_task(subscription.get()) for _ in range(2)]
+        awaiting = asyncio.create_task(self.ctx.await_events(KeyEvent, 2))
+        await asyncio.sleep(0)
+
+        subscription.close()
+        self.ctx.clear()
+
+        for waiter in waiters + [awaiting]:
+            with self.assertRaises(SubscriptionClosed):
+                await waiter
+
+        with self.assertRaises(SubscriptionClosed):
+            await subscription.get()
+
+    async def test_event_time_uses_device_timestamp(self):
+        self.ctx.device_clock = lambda: 1500
+        now = asyncio.get_running_loop().time()
+
+        self.assertAlmostEqual(self.ctx.event_time(KeyEvent(60, 127, True, 1000)), now - 0.5, places=2)
+        self.assertAlmostEqual(self.ctx.event_time(KeyEvent(60, 127, True)), now, places=2)
+
+
+class TestStaffCache(unittest.TestCase):
+    def test_cached_staff_matches_uncached(self):
+        rect = pygame.Rect(20, 60, 360, 80)
+        notes = [VisualNote(48, pygame.Color(0, 0, 0), 0.1), VisualNote(66, pygame.Color(255, 0, 0), 0.5), VisualNote(84, pygame.Color(0, 0, 255), 0.9)]
+        brush = Brush(pygame.Surface((400, 200)))
+
+        for _ in range(2):
+            brush.surface.fill((255, 255, 255))
+            brush.draw_staff(TREBLE_CLEFF, 20, rect, notes)
+
+        uncached = Brush(pygame.Surface((400, 200)))
+        uncached.surface.fill((255, 255, 255))
+        uncached.draw_staff(TREBLE_CLEFF, 20, rect, notes)
+
+        self.assertEqual(len(brush._staff_cache), 1)
+        self.assertEqual(pygame.image.tobytes(brush.surface, "RGB"), pygame.image.tobytes(uncached.surface, "RGB"))
+
+    def test_resize_rebuilds_cache(self):
+        brush = Brush(pygame.Surface((400, 200)))
+        brush.draw_staff(TREBLE_CLEFF, 20, pygame.Rect(20, 60, 360, 80), [])
+        brush.draw_staff(TREBLE_CLEFF, 10, pygame.Rect(20, 60, 360, 40), [])
+        layout = brush._get_staff_layout(TREBLE_CLEFF, 20, pygame.Rect(20, 60, 360, 80))
+
+        self.assertEqual(len(brush._staff_cache), 2)
+        self.assertIs(brush._get_staff_layout(TREBLE_CLEFF, 20, pygame.Rect(20, 60, 360, 80)), layout)
+
+        brush.surface = pygame.Surface((800, 400))
+        rebuilt = brush._get_staff_layout(TREBLE_CLEFF, 20, pygame.Rect(20, 60, 360, 80))
+
+        self.assertIsNot(rebuilt, layout)
+        self.assertEqual(len(brush._staff_cache), 1)
+        self.assertEqual(brush._staff_cache_size, (800, 400))
+
+
+class TestTextCache(unittest.TestCase):
+    def test_least_recently_used_is_dropped(self):
+        cache = TextCache(capacity=2)
+        first = cache.render("monospace", 12, "a", (0, 0, 0))
+
+        cache.render("monospace", 12, "b", (0, 0, 0))
+        self.assertIs(cache.render("monospace", 12, "a", pygame.Color(0, 0, 0)), first)
+        cache.render("monospace", 12, "c", (0, 0, 0))
+
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(len(cache), 2)
+        cache.render("monospace", 12, "b", (0, 0, 0))
+        self.assertEqual(cache.misses, 4)
+
+    def test_prewarm(self):
+        brush = Brush(pygame.Surface((100, 100)))
+        brush.prewarm_text("monospace", 12, "ABC", (0, 0, 0))
+        misses = text_cache.misses
+
+        brush.draw_text("monospace", 12, "B", (0, 0), (0, 0, 0))
+
+        self.assertEqual(text_cache.misses, misses)
@@ -0,0 +1,69 @@
+import unittest
+from math import floor
+import pygame
+from emulator import KeyboardEmulator, N_WHITE_KEYS
+
+
+BACKGROUND_COLOR = (255, 255, 255)
+
+
+class TestKeyboardEmulator(unittest.TestCase):
+    def setUp(self):
+        self.surface = pygame.Surface((800, 600))
+        self.emulator = KeyboardEmulator(self.surface)
+
+    def test_repaint_matches_full_paint(self):
+        reference = pygame.Surface(self.surface.get_size())
+
+        for pressed in [set(), {60}, {60, 61}, {61}, {0, 1, 87}, {30, 31, 32, 33}, set(), {5, 6, 70}]:
+            self.emulator.keys_pressed = set(pressed)
+            self.surface.fill(BACKGROUND_COLOR)
+            self.emulator.draw()
+
+            reference.fill(BACKGROUND_COLOR)
+            self.emulator._paint(reference, self.emulator.get_rect(), pressed)
+
+            self.assertEqual(pygame.image.tobytes(self.surface, "RGB"), pygame.image.tobytes(reference, "RGB"), f"pressed {pressed}")
+
+    def test_key_at_pos_follows_key_geometry(self):
+        keyboard_x, keyboard_y, keyboard_width, keyboard_height = self.emulator.get_rect()
+        key_width = keyboard_width / N_WHITE_KEYS
+        upper_y, lower_y = keyboard_y + keyboard_height / 4, keyboard_y + keyboard_height * 3 / 4
+
+        for x in range(floor(keyboard_x) - 2, floor(keyboard_x + keyboard_width) + 3):
+            relative_x = x - keyboard_x
+            white_n = floor(relative_x / key_width)
+
+            if white_n < 0 or white_n >= N_WHITE_KEYS:
+                self.assertIsNone(self.emulator.key_at_pos((x, lower_y)), f"x {x}")
+                self.assertIsNone(self.emulator.key_at_pos((x, upper_y)), f"x {x}")
+                continue
+
+            white = self.emulator.white_to_midi(white_n)
+            upper = white
+
+            # black keys are 0.75 white keys wide, centered on the line between two white keys
+            for n in (white_n, white_n + 1):
+                if n % 7 not in [0, 3] and abs(relative_x - key_width * n) <= key_width * 0.375:
+                    upper = self.emulator.white_to_midi(n) - 1
+
+            self.assertEqual(self.emulator.key_at_pos((x, lower_y)), white, f"x {x}")
+            self.assertEqual(self.emulator.key_at_pos((x, upper_y)), upper, f"x {x}")
+
+        self.assertIsNone(self.emulator.key_at_pos((keyboard_x + key_width / 2, keyboard_y - 1)))
+        self.assertIsNone(self.emulator.key_at_pos((keyboard_x + key_width / 2, keyboard_y + keyboard_height + 1)))
+
+    def test_mouse_presses_and_releases(self):
+        keyboard_x, keyboard_y, _, keyboard_height = self.emulator.get_rect()
+        key_width = self.emulator.get_rect().width / N_WHITE_KEYS
+        lower_y = keyboard_y + keyboard_height - 2
+
+        down = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(keyboard_x + key_width / 2, lower_y))
+        drag = pygame.event.Event(pygame.MOUSEMOTION, pos=(keyboard_x + key_width * 1.5, lower_y), buttons=(1, 0, 0))
+        up = pygame.event.Event(pygame.MOUSEBUTTONUP, button=1, pos=(keyboard_x + key_width * 1.5, lower_y))
+
+        self.assertEqual(self.emulator.keys_pressed, set())
+        self.assertEqual([e.key for e in self.emulator.handle_event(down)], [0])
+        self.assertEqual([e.key for e in self.emulator.handle_event(drag)], [2])
+        self.assertEqual(sorted(e.key for e in self.emulator.handle_event(up) if not e.pressing), [0, 2])
+        self.assertEqual(self.emulator.keys_pressed, set())
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from frames import FrameScheduler, _next_timer_delay
+
+
+WAKE = pygame.USEREVENT + 1
+
+
+class TestFrameScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        pygame.display.init()
+        pygame.event.clear()
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    async def test_paces_frames(self):
+        scheduler = FrameScheduler(50)
+        start = time.perf_counter()
+
+        for _ in range(10):
+            frame_start = scheduler.frame_started()
+            scheduler.frame_finished(frame_start)
+            await scheduler.next_frame(idle=False)
+
+        elapsed = time.perf_counter() - start
+        summary = scheduler.stats.summary()
+
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(summary["frames"], 10)
+        self.assertAlmostEqual(summary["fps"], 50, delta=10)
+
+    async def test_idle_wakes_for_timer(self):
+        scheduler = FrameScheduler(60, max_idle=2)
+        fired = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, fired.set)
+        start = time.perf_counter()
+
+        while not fired.is_set():
+            await scheduler.next_frame(idle=True)
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertGreaterEqual(scheduler.stats.idle_waits, 1)
+
+    async def test_idle_wakes_for_posted_event(self):
+        scheduler = FrameScheduler(60, max_idle=2)
+        loop = asyncio.get_running_loop()
+        delivered = []
+
+        def produce():
+            time.sleep(0.05)
+            loop.call_soon_threadsafe(delivered.append, "work")
+            pygame.event.post(pygame.event.Event(WAKE))
+
+        producer = threading.Thread(target=produce)
+        start = time.perf_counter()
+        producer.start()
+        events = await scheduler.next_frame(idle=True)
+        producer.join()
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(WAKE, [event.type for event in events])
+        self.assertEqual(delivered, ["work"])
+
+    async def test_next_timer_delay(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(0)
+
+        first = loop.call_later(10, lambda: None)
+        later = loop.call_later(20, lambda: None)
+        self.assertAlmostEqual(_next_timer_delay(loop), 10, delta=0.1)
+
+        # a cancelled head is only known to be gone once the loop dropped it
+        first.cancel()
+        self.assertEqual(_next_timer_delay(loop), 0)
+        await asyncio.sleep(0)
+        self.assertAlmostEqual(_next_timer_delay(loop), 20, delta=0.1)
+        later.cancel()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+import pygame
+from context import Context
+from game_loader import Game, GameRegistry
+
+
+GAME_SOURCE = '''"""{description}"""
+LEVEL = 1
+started = []
+
+async def on_start(ctx):
+    started.append(({version}, LEVEL))
+'''
+
+
+class TestGameRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.package = "testgames_" + str(id(self))
+        self.path = os.path.join(self.dir.name, self.package)
+        os.mkdir(self.path)
+        sys.path.insert(0, self.dir.name)
+        self.registry = GameRegistry(self.package, self.path)
+
+        self.write("first", "The first game.", 1)
+        with open(os.path.join(self.path, "broken.py"), "w") as f:
+            f.write("def not_a_game(): pass\n")
+
+    def tearDown(self):
+        sys.path.remove(self.dir.name)
+        self.dir.cleanup()
+
+    def write(self, name, description, version, mtime=None):
+        path = os.path.join(self.path, name + ".py")
+
+        with open(path, "w") as f:
+            f.write(GAME_SOURCE.format(description=description, version=version))
+
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_discovery(self):
+        self.assertEqual(self.registry.games(), ["first"])
+        self.assertEqual(self.registry.info("first").description, "The first game.")
+        self.assertFalse(self.registry.info("first").has_update)
+        self.assertIn("broken", self.registry.errors)
+        self.assertRaises(ValueError, lambda: self.registry.info("broken"))
+        self.assertRaises(ValueError, lambda: self.registry.info("missing"))
+
+    async def test_hot_reload(self):
+        game = Game("first", self.registry, settings={"LEVEL": 3})
+        old_ctx = Context(pygame.Surface((1, 1)))
+        game.begin(old_ctx)
+        await asyncio.sleep(0)
+
+        self.assertFalse(self.registry.changed("first"))
+
+        self.write("first", "The first game.", 2, mtime=time.time() + 10)
+        self.assertTrue(self.registry.changed("first"))
+
+        new_ctx = Context(pygame.Surface((1, 1)))
+        self.assertTrue(game.reload(old_ctx, new_ctx))
+        await asyncio.sleep(0)
+
+        # the settings are applied to the reloaded module too
+        self.assertEqual(game.game_module.started, [(2, 3)])
+        self.assertFalse(self.registry.changed("first"))
+        self.assertRaises(ValueError, lambda: Game("first", self.registry, settings={"SPEED": 2}))
+
+    async def test_broken_file_reloads_once_fixed(self):
+        game = Game("first", self.registry)
+        old_ctx = Context(pygame.Surface((1, 1)))
+        game.begin(old_ctx)
+        await asyncio.sleep(0)
+
+        path = os.path.join(self.path, "first.py")
+
+        with open(path, "w") as f:
+            f.write("async def on_start(ctx)\n")
+
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertTrue(self.registry.changed("first"))
+        self.assertFalse(game.reload(old_ctx, Context(pygame.Surface((1, 1)))))
+        self.assertFalse(self.registry.changed("first"))
+
+        self.write("first", "The first game.", 3, mtime=time.time() + 20)
+        self.assertTrue(self.registry.changed("first"))
+
+        new_ctx = Context(pygame.Surface((1, 1)))
+        self.assertTrue(game.reload(old_ctx, new_ctx))
+        await asyncio.sleep(0)
+
+        self.assertEqual(game.game_module.started, [(3, 1)])
+        game.stop(new_ctx)
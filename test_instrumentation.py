@@ -0,0 +1,105 @@
+import asyncio
+import time
+import unittest
+import pygame
+from context import Context
+from events import KeyEvent
+from instrumentation import Histogram, Instrumentation, LatencyTracker
+
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = Histogram(max_ms=50)
+
+        for ms in range(1, 101):
+            histogram.add(ms)
+
+        self.assertEqual(histogram.percentile(20), 21)
+        self.assertEqual(histogram.percentile(99), 100) # in the overflow bucket, capped by the maximum
+
+
+class TestLatencyTracker(unittest.IsolatedAsyncioTestCase):
+    async def test_stages(self):
+        now = 100
+        tracker = LatencyTracker(lambda: now)
+        ctx = Context(pygame.Surface((1, 1)))
+        tracker.attach(ctx)
+
+        for event in [KeyEvent(60, 100, True, 97), KeyEvent(61, 100, True)]:
+            ctx.fire_events(event)
+            tracker.dispatched(event)
+
+        now = 105
+        await asyncio.sleep(0)
+        now = 120
+        tracker.presented()
+
+        summary = tracker.summary()
+
+        self.assertEqual({stage: summary[stage]["count"] for stage in summary}, {"dispatch": 1, "handler": 1, "present": 1})
+        self.assertEqual([summary[stage]["max"] for stage in LatencyTracker.STAGES], [3, 8, 23])
+
+
+class TestInstrumentation(unittest.IsolatedAsyncioTestCase):
+    async def test_enable_and_disable_round_trip(self):
+        instrumentation = Instrumentation()
+        ctx, other = Context(pygame.Surface((1, 1))), Context(pygame.Surface((1, 1)))
+        loop = asyncio.get_running_loop()
+        task_factory = loop.get_task_factory()
+
+        instrumentation.disable() # never enabled
+        instrumentation.enable(ctx)
+        instrumentation.enable(ctx)
+        ctx.fire_events(KeyEvent(60, 127, True))
+        other.fire_events(KeyEvent(60, 127, True))
+        instrumentation.end_frame(ctx)
+
+        self.assertEqual(instrumentation.frames[-1]["events_fired"], 1)
+
+        # enabling for another context moves the hook over
+        instrumentation.enable(other)
+        ctx.fire_events(KeyEvent(60, 127, True))
+        other.fire_events(KeyEvent(61, 127, True))
+        other.fire_events(KeyEvent(62, 127, True))
+        instrumentation.end_frame(other)
+
+        self.assertEqual(instrumentation.frames[-1]["events_fired"], 2)
+        self.assertIsNone(ctx.fire_timer)
+
+        instrumentation.disable()
+        instrumentation.disable()
+
+        self.assertIsNone(other.fire_timer)
+        self.assertIs(loop.get_task_factory(), task_factory)
+        other.fire_events(KeyEvent(60, 127, True))
+
+        instrumentation.enable(ctx)
+        ctx.fire_events(KeyEvent(60, 127, True))
+        instrumentation.end_frame(ctx)
+        instrumentation.disable()
+
+        self.assertEqual(instrumentation.frames[-1]["events_fired"], 1)
+
+    async def test_added_time_is_not_counted_twice(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable(Context(pygame.Surface((1, 1))))
+        start = time.perf_counter()
+
+        time.sleep(0.02)
+        instrumentation.lap("update")
+
+        # input dispatched while the loop waits for the next frame
+        time.sleep(0.01)
+        instrumentation.add("midi", 0.03)
+        time.sleep(0.04)
+        instrumentation.lap("wait")
+
+        total = time.perf_counter() - start
+        instrumentation.end_frame(Context(pygame.Surface((1, 1))))
+        instrumentation.disable()
+        phases = instrumentation.frames[-1]["phases_ms"]
+
+        self.assertEqual(set(phases), {"update", "midi", "wait"})
+        self.assertEqual(phases["midi"], 30)
+        self.assertAlmostEqual(phases["wait"], 20, delta=10)
+        self.assertAlmostEqual(sum(phases.values()), total * 1000, delta=1)
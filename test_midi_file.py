@@ -0,0 +1,145 @@
+import asyncio
+import gc
+import os
+import struct
+import tempfile
+import unittest
+import pygame
+import audio
+from context import Context
+from game_loader import Game
+from midi_file import MidiFile, write_midi_file
+
+
+def note(tick: int, key: int, length: int, velocity: int = 100, channel: int = 0) -> list[tuple[int, bytes]]:
+    return [(tick, bytes([0x90 | channel, key, velocity])), (tick + length, bytes([0x80 | channel, key, 0]))]
+
+
+class TestMidiFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "song.mid")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_notes_follow_tempo_map(self):
+        # 120 bpm, then 60 bpm from the third beat
+        conductor = [(0, b"\xff\x51\x03\x07\xa1\x20"), (960, b"\xff\x51\x03\x0f\x42\x40")]
+        melody = [(0, b"\xff\x03\x04lead"), (0, b"\xf0\x03\x7e\x00\xf7")]
+
+        for i, key in enumerate([60, 62, 64, 65]):
+            melody += note(i * 480, key, 240)
+
+        write_midi_file(self.path, [conductor, sorted(melody, key=lambda event: event[0])])
+
+        with MidiFile(self.path) as midi:
+            self.assertEqual(len(midi.tracks), 2)
+            self.assertEqual(midi.first_note_track(), 1)
+
+            notes = list(midi.notes(1))
+
+        self.assertEqual([n.note for n in notes], [60, 62, 64, 65])
+        self.assertEqual([n.start for n in notes], [0.0, 0.5, 1.0, 2.0])
+        self.assertEqual([n.duration for n in notes], [0.25, 0.25, 0.5, 0.5])
+
+    def test_phrases_take_highest_note_of_chords(self):
+        track = note(0, 48, 480) + note(0, 60, 480) + note(480, 62, 480) + note(960, 64, 480) + note(960, 55, 480) + note(1440, 65, 960)
+        write_midi_file(self.path, [sorted(track, key=lambda event: event[0])])
+
+        with MidiFile(self.path) as midi:
+            phrases = list(midi.phrases(2))
+
+        self.assertEqual([[n.note for n in phrase] for phrase in phrases], [[60, 62], [64, 65]])
+        self.assertEqual([n.start for n in phrases[1]], [0.0, 0.5])
+        self.assertEqual(phrases[1][1].duration, 1.0)
+
+    def test_running_status_and_lazy_decoding(self):
+        # note ons with running status and velocity 0 as note off, followed by garbage
+        events = bytes([0x00, 0x90, 60, 90, 0x60, 60, 0, 0x00, 62, 90, 0x60, 62, 0, 0x00, 64, 90, 0x60, 64, 0, 0x00, 0xF3, 0x00])
+
+        with open(self.path, "wb") as f:
+            f.write(struct.pack(">4sIHHH", b"MThd", 6, 0, 1, 96))
+            f.write(struct.pack(">4sI", b"MTrk", len(events)))
+            f.write(events)
+
+        with MidiFile(self.path) as midi:
+            phrases = midi.phrases(2)
+            first = next(phrases)
+
+            self.assertEqual([(n.note, n.velocity, n.duration) for n in first], [(60, 90, 0.5), (62, 90, 0.5)])
+
+            with self.assertRaises(ValueError):
+                next(phrases)
+
+    def test_truncated_tracks_end_at_last_complete_message(self):
+        notes = bytes([0x00, 0x90, 60, 90, 0x60, 0x80, 60, 0])
+
+        with open(self.path, "wb") as f:
+            f.write(struct.pack(">4sIHHH", b"MThd", 6, 1, 4, 96))
+
+            # cut off in a note on, in a delta time and in the length of a meta event,
+            # the first two before the next track starts, the last at the end of the file
+            for cut in [notes + bytes([0x00, 0x90, 62]), notes + bytes([0x81]), notes + bytes([0x00, 0xFF, 0x03, 0x85])]:
+                f.write(struct.pack(">4sI", b"MTrk", len(cut)))
+                f.write(cut)
+
+            f.write(struct.pack(">4sI", b"MTrk", 100))
+            f.write(notes + bytes([0x00, 0x90, 64, 90, 0x60]))
+
+        with MidiFile(self.path) as midi:
+            self.assertEqual(len(midi.tracks), 4)
+
+            for track in range(4):
+                self.assertEqual([(n.note, n.duration) for n in midi.notes(track)], [(60, 0.5)] if track < 3 else [(60, 0.5), (64, 0.0)])
+
+    def test_melody_leaves_out_drums(self):
+        drums = note(0, 36, 240, channel=9) + note(480, 38, 240, channel=9)
+        write_midi_file(self.path, [drums, sorted(drums + note(0, 60, 480) + note(480, 62, 480), key=lambda event: event[0])])
+
+        with MidiFile(self.path) as midi:
+            self.assertEqual(midi.first_note_track(), 0)
+            self.assertEqual([n.note for n in midi.melody()], [60, 62])
+            self.assertEqual([n.note for n in midi.notes(1)], [36, 60, 38, 62])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"RIFF" + bytes(20))
+
+        with self.assertRaises(ValueError):
+            MidiFile(self.path)
+
+
+class TestPlaynotesFromFile(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "song.mid")
+        self.output = audio.RecordingOutput()
+        audio.use_output(self.output)
+
+    def tearDown(self):
+        audio.use_output(None)
+        self.directory.cleanup()
+
+    async def test_stopping_the_game_closes_the_file(self):
+        track = []
+
+        for i, key in enumerate([60, 62, 64, 65, 67, 69, 71, 72]):
+            track += note(i * 240, key, 240)
+
+        write_midi_file(self.path, [track])
+
+        game = Game("playnotes", isolated=True, settings={"MIDI_FILE": self.path})
+        ctx = Context(pygame.Surface((800, 600)))
+        game.begin(ctx)
+        await asyncio.sleep(0)
+
+        opened = [obj for obj in gc.get_objects() if isinstance(obj, MidiFile) and obj.path == self.path]
+        self.assertEqual(len(opened), 1)
+        self.assertFalse(opened[0]._map.closed)
+        self.assertEqual([key for _, key in self.output.note_ons()], [60, 62, 64, 65])
+
+        game.stop(ctx)
+        await asyncio.sleep(0)
+
+        self.assertTrue(opened[0]._map.closed)
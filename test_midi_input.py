@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+from events import ControlChangeEvent, KeyEvent, PitchBendEvent
+from midi_input import FakeMidiInput, MidiReader, decode, decode_packed
+
+
+class TestDecode(unittest.TestCase):
+    def test_decode(self):
+        messages = [
+            [[0x90, 60, 100, 0], 5],
+            [[0x93, 61, 0, 0], 6],
+            [[0x80, 62, 64, 0], 7],
+            [[0xB0, 64, 127, 0], 8],
+            [[0xE1, 0, 0x40, 0], 9],
+            [[0xE1, 0x7F, 0x7F, 0], 10],
+            [[0xF8, 0, 0, 0], 11],
+        ]
+
+        self.assertEqual(decode(messages), [
+            KeyEvent(60, 100, True, 5),
+            KeyEvent(61, 0, False, 6, channel=3),
+            KeyEvent(62, 64, False, 7),
+            ControlChangeEvent(64, 127, 8),
+            PitchBendEvent(0, 9, channel=1),
+            PitchBendEvent(8191, 10, channel=1),
+        ])
+
+
+class TestMidiReader(unittest.IsolatedAsyncioTestCase):
+    async def test_delivers_all_events_in_order(self):
+        device = FakeMidiInput()
+        received = []
+        done = asyncio.Event()
+        n_messages = 5000
+
+        def dispatch(batch):
+            received.extend(decode_packed(batch.messages))
+
+            if len(received) == n_messages:
+                done.set()
+
+        reader = MidiReader(device, asyncio.get_running_loop(), dispatch)
+        reader.start()
+
+        for i in range(0, n_messages, 100):
+            device.feed([[0x90, (i + j) % 128, 100, 0] for j in range(100)], timestamp=i)
+
+        await asyncio.wait_for(done.wait(), 5)
+        reader.stop()
+
+        self.assertEqual([e.key for e in received], [i % 128 for i in range(n_messages)])
+        self.assertEqual(received[-1].timestamp, n_messages - 100)
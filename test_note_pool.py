@@ -0,0 +1,62 @@
+import unittest
+import pygame
+from context import Brush, VisualNote, TREBLE_CLEFF
+from note_pool import NotePool
+
+
+class TestNotePool(unittest.TestCase):
+    def test_advance_expires_notes(self):
+        pool = NotePool(4)
+        first = pool.spawn(60, 0.0, offset=0.1)
+        pool.spawn(62, 1.0)
+
+        self.assertEqual(pool.advance(0.2).tolist(), [first])
+        self.assertEqual(len(pool), 1)
+        self.assertNotIn(first, pool.active().tolist())
+        self.assertAlmostEqual(pool.offset[pool.oldest()], 0.8)
+
+    def test_oldest_at(self):
+        pool = NotePool(4)
+        first = pool.spawn(60, 0.0)
+        second = pool.spawn(62, 4.0, offset=1.5)
+
+        self.assertEqual(pool.oldest_at(2.0, 8.0), first)
+        self.assertEqual(pool.oldest_at(8.0, 8.0), first)
+        self.assertEqual(pool.oldest_at(8.5, 8.0), second)
+        self.assertIsNone(pool.oldest_at(12.5, 8.0))
+
+        # kept past the clef until a later end
+        self.assertEqual(pool.advance(1.03, end=-0.05).tolist(), [])
+        self.assertEqual(pool.advance(0.03, end=-0.05).tolist(), [first])
+
+    def test_remove_and_grow(self):
+        pool = NotePool(2)
+        slots = [pool.spawn(60 + i, float(i)) for i in range(5)]
+
+        self.assertEqual(len(pool), 5)
+        self.assertEqual(pool.oldest(), slots[0])
+
+        pool.remove(slots[0])
+        pool.remove(slots[0])
+
+        self.assertEqual(len(pool), 4)
+        self.assertEqual(pool.pitch[pool.oldest()], 61)
+
+    def test_draws_like_visual_notes(self):
+        pool = NotePool()
+        visual_notes = []
+
+        for i, note in enumerate([40, 55, 61, 72, 90]):
+            offset = (i + 1) / 6
+            pool.spawn(note, 0.0, offset)
+            visual_notes.append(VisualNote(note, pygame.Color(0, 0, 0), offset))
+
+        surfaces = []
+
+        for notes in [pool, visual_notes]:
+            surface = pygame.Surface((800, 600))
+            surface.fill((255, 255, 255))
+            Brush(surface).draw_staff(TREBLE_CLEFF, 30, pygame.Rect(80, 260, 640, 80), notes)
+            surfaces.append(pygame.image.tobytes(surface, "RGB"))
+
+        self.assertEqual(surfaces[0], surfaces[1])
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import notes
+
+
+class TestNoteTables(unittest.TestCase):
+    def test_tables_match_computation(self):
+        for n in range(-24, 160):
+            self.assertEqual(notes.chromatic_to_diatonic(n), notes._compute_chromatic_to_diatonic(n))
+            self.assertEqual(notes.is_black(n), notes._compute_is_black(n))
+            self.assertEqual(notes.format_note_as_str(n), notes._compute_format_note_as_str(n, False))
+
+    def test_known_notes(self):
+        self.assertEqual(notes.chromatic_to_diatonic(60), (35, False))
+        self.assertEqual(notes.chromatic_to_diatonic(61), (35, True))
+        self.assertEqual(notes.format_note_as_str(61, ascii=True), "C#-5")
+        self.assertEqual(notes.note_from_str("C#-5"), 61)
+
+
+class TestBatch(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        all_notes = np.arange(128)
+        diatonic, sharp = notes.chromatic_to_diatonic_batch(all_notes)
+
+        self.assertEqual(list(zip(diatonic.tolist(), sharp.tolist())), [notes.chromatic_to_diatonic(n) for n in range(128)])
+        self.assertEqual(notes.is_white_batch(all_notes).tolist(), [notes.is_white(n) for n in range(128)])
+        self.assertEqual(notes.format_notes_as_str(all_notes, ascii=True).tolist(), [notes.format_note_as_str(n, ascii=True) for n in range(128)])
+
+    def test_format_rejects_out_of_range(self):
+        self.assertRaises(ValueError, lambda: notes.format_notes_as_str([60, 128]))
+
+
+class TestGenerateSequences(unittest.TestCase):
+    def test_constraints(self):
+        sequences = notes.generate_sequences(1000, 16, variability=5, base=60, low=55, high=72, rng=1)
+        steps = np.diff(sequences, axis=1)
+
+        self.assertEqual(sequences.shape, (1000, 16))
+        self.assertTrue((sequences[:, 0] == 60).all())
+        self.assertTrue(((sequences >= 55) & (sequences <= 72)).all())
+        self.assertTrue((np.abs(steps) <= 5).all())
+
+    def test_reproducible(self):
+        a = notes.generate_sequences(100, 8, variability=12, base=60, rng=42)
+        b = notes.generate_sequences(100, 8, variability=12, base=60, rng=42)
+
+        self.assertTrue((a == b).all())
+
+    def test_empty_and_negative_lengths(self):
+        self.assertEqual(notes.generate_sequences(3, 0, variability=2, base=60).shape, (3, 0))
+        self.assertEqual(notes.generate_sequences(3, 0, variability=2, base=60, white_keys_only=True).shape, (3, 0))
+        self.assertRaises(ValueError, lambda: notes.generate_sequences(3, -1, variability=2, base=60))
+
+    def test_white_keys_only(self):
+        sequences = notes.generate_sequences(1000, 16, variability=2, base=60, low=49, high=80, white_keys_only=True, rng=3)
+        diatonic, sharp = notes.chromatic_to_diatonic_batch(sequences)
+
+        self.assertFalse(sharp.any())
+        self.assertTrue(((sequences >= 50) & (sequences <= 79)).all())
+        self.assertTrue((np.abs(np.diff(diatonic, axis=1)) <= 2).all())
+
+    def test_generate_notes(self):
+        gen = notes.generate_notes(variability=3, base=60, rng=7)
+        values = [next(gen) for _ in range(200)]
+
+        self.assertEqual(values[0], 60)
+        self.assertTrue(all(abs(a - b) <= 3 for a, b in zip(values, values[1:])))
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from events import KeyEvent
+from pitch_input import PitchInput, PitchTracker, RingBuffer, WavSource, detect_pitch, write_wav, READ_TIMEOUT, SAMPLE_RATE
+
+
+def tone(note: int, seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * 440 * 2 ** ((note - 69) / 12) * t)
+
+
+class SilentSource:
+    '''
+    A capture device that delivers nothing, like a paused or unplugged microphone.
+    '''
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self):
+        self.closed = False
+
+    def read(self) -> np.ndarray | None:
+        time.sleep(READ_TIMEOUT)
+        return np.zeros(0, np.float32)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestPitchInput(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "melody.wav")
+
+        # C4, E4, a rest, then G4 sung quietly and again loudly
+        write_wav(self.path, np.concatenate([
+            tone(60, 0.5), tone(64, 0.5), np.zeros(int(0.3 * SAMPLE_RATE)), tone(67, 0.5, 0.1), tone(67, 0.4),
+        ]))
+
+    def tearDown(self):
+        os.remove(self.path)
+        os.rmdir(os.path.dirname(self.path))
+
+    def test_detect_pitch(self):
+        t = np.arange(1024) / SAMPLE_RATE
+
+        for frequency in [82.4, 220, 440, 1000]:
+            self.assertAlmostEqual(detect_pitch(np.sin(2 * np.pi * frequency * t), SAMPLE_RATE), frequency, delta=frequency * 0.01)
+
+        self.assertIsNone(detect_pitch(np.random.default_rng(0).uniform(-1, 1, 1024), SAMPLE_RATE))
+
+    def test_ring_buffer(self):
+        buffer = RingBuffer(5)
+        buffer.write(np.arange(3))
+        buffer.write(np.arange(3, 7))
+
+        self.assertEqual(buffer.latest(5).tolist(), [2, 3, 4, 5, 6])
+        self.assertEqual(buffer.latest(2).tolist(), [5, 6])
+
+    def test_onsets_and_offsets(self):
+        source = WavSource(self.path)
+        tracker = PitchTracker(source.sample_rate)
+        events = []
+
+        while (block := source.read()) is not None:
+            events.extend(tracker.process(block))
+
+        events.extend(tracker.finish())
+        source.close()
+
+        expected = [(60, True, 0), (60, False, 500), (64, True, 500), (64, False, 1000), (67, True, 1300), (67, False, 1800), (67, True, 1800), (67, False, 2200)]
+
+        self.assertEqual([(e.key, e.pressing) for e in events], [(key, pressing) for key, pressing, _ in expected])
+
+        for event, (_, _, ms) in zip(events, expected):
+            self.assertAlmostEqual(event.timestamp, ms, delta=60)
+
+        self.assertGreater(events[-2].velocity, events[4].velocity)
+
+    def test_dispatches_to_loop(self):
+        async def listen():
+            received: list[KeyEvent] = []
+            finished = asyncio.Event()
+
+            def dispatch(events):
+                received.extend(events)
+
+                if len(received) == 8:
+                    finished.set()
+
+            pitch_input = PitchInput(WavSource(self.path), asyncio.get_running_loop(), dispatch)
+            pitch_input.start()
+            await asyncio.wait_for(finished.wait(), 5)
+            pitch_input.stop()
+
+            return received
+
+        received = asyncio.run(listen())
+
+        self.assertEqual([e.key for e in received if e.pressing], [60, 64, 67, 67])
+
+    def test_stop_closes_source(self):
+        async def listen(source):
+            pitch_input = PitchInput(source, asyncio.get_running_loop(), lambda events: None)
+            pitch_input.start()
+            await asyncio.sleep(0.2)
+
+            start = time.perf_counter()
+            pitch_input.stop()
+
+            return time.perf_counter() - start
+
+        silent = SilentSource()
+
+        self.assertLess(asyncio.run(listen(silent)), READ_TIMEOUT * 2)
+        self.assertTrue(silent.closed)
+
+        wav = WavSource(self.path, realtime=True)
+        asyncio.run(listen(wav))
+
+        with self.assertRaises(ValueError): # reading a closed wave file
+            wav.read()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+import pygame
+from context import Context
+from events import KeyEvent, KeystrokeEvent
+from game_loader import Game
+from recording import HEADER, MAGIC, RECORD, Recorder, Replay
+from simulation import VirtualClockLoop
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".etrec")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def record(self, events) -> None:
+        ctx = Context(pygame.surface.Surface((10, 10)))
+        recorder = Recorder(self.path)
+        recorder.attach(ctx)
+
+        for event in events:
+            ctx.fire_events(event)
+
+        recorder.close()
+
+    def test_round_trip(self):
+        events = [KeyEvent(60, 100, True, 1234, channel=3), KeystrokeEvent(pygame.K_F1, True), KeyEvent(60, 0, False)]
+        self.record(events)
+
+        replay = Replay(self.path)
+
+        try:
+            self.assertEqual(len(replay), 3)
+            self.assertEqual([event for _, event in replay.events()], events)
+        finally:
+            replay.close()
+
+    def test_truncated_record_is_ignored(self):
+        self.record([KeyEvent(60, 100, True), KeyEvent(62, 100, True)])
+
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - RECORD.size // 2)
+
+        replay = Replay(self.path)
+
+        try:
+            self.assertEqual([event.key for _, event in replay.events()], [60])
+        finally:
+            replay.close()
+
+    def test_play_accelerated(self):
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, -1))
+            f.write(RECORD.pack(1_000_000, -1, 60, 0, 100, 1, 0))
+            f.write(RECORD.pack(3_000_000, -1, 60, 0, 0, 0, 0))
+
+        replay = Replay(self.path)
+        loop = VirtualClockLoop()
+        fired = []
+
+        try:
+            replayed = loop.run_until_complete(replay.play(lambda event: fired.append((loop.time(), event)), speed=2))
+        finally:
+            loop.close()
+            replay.close()
+
+        self.assertEqual(replayed, 2)
+        self.assertAlmostEqual(fired[0][0], 0.5)
+        self.assertAlmostEqual(fired[1][0], 1.5)
+
+    def play_staffwars(self, device_base: int, play_keys) -> tuple[int, int, int]:
+        random.seed(0)
+        loop = VirtualClockLoop()
+        game = Game("staffwars", isolated=True)
+        staffwars = game.game_module
+        ctx = Context(pygame.Surface((800, 600)))
+        ctx.device_clock = lambda: device_base + round(loop.time() * 1000)
+
+        async def session():
+            game.begin(ctx)
+            keys = asyncio.create_task(play_keys(loop, ctx, staffwars))
+
+            while loop.time() < 20:
+                game.update(ctx)
+                await asyncio.sleep(1 / 30)
+
+            await keys
+            game.stop(ctx)
+
+        try:
+            loop.run_until_complete(session())
+        finally:
+            loop.close()
+
+        return staffwars.hits, staffwars.misses, staffwars.score
+
+    def test_replay_scores_like_the_recording(self):
+        async def press_late(loop, ctx, staffwars):
+            recorder = Recorder(self.path, clock=loop.time, device_clock=ctx.device_clock)
+            recorder.attach(ctx)
+
+            # pressed at the given time, but only fired some time later
+            for pressed, fired in [(3, 3.41), (6.5, 6.71)]:
+                await asyncio.sleep(pressed - loop.time())
+                key = int(staffwars.pool.pitch[staffwars.pool.oldest()])
+                await asyncio.sleep(fired - loop.time())
+                ctx.fire_events(KeyEvent(key, 100, True, ctx.device_clock() - round((fired - pressed) * 1000)))
+
+            recorder.close()
+
+        async def replay(loop, ctx, staffwars):
+            replay = Replay(self.path)
+
+            try:
+                await replay.play(ctx.fire_events, device_clock=ctx.device_clock)
+            finally:
+                replay.close()
+
+        recorded = self.play_staffwars(500_000, press_late)
+        self.assertEqual(recorded[:2], (2, 1))
+
+        # on a device clock that started at another time
+        self.assertEqual(self.play_staffwars(7_000, replay), recorded)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import unittest
+import pygame
+from context import Context
+from results import ResultStore
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record_through_context(self):
+        store = ResultStore(self.path)
+        ctx = Context(pygame.Surface((10, 10)))
+        ctx.record_result(60, True) # no store attached yet
+
+        store.attach(ctx, "ada", "playnotes")
+        ctx.record_result(60, True)
+        ctx.record_result(60, False, 0)
+        ctx.record_result(64, True, 4, 850.0)
+
+        by_note = store.accuracy_by_note("ada")
+        self.assertEqual((by_note[60].attempts, by_note[60].correct), (2, 1))
+        self.assertEqual(by_note[64].rate, 1.0)
+        self.assertEqual(sorted(store.accuracy_by_interval("ada")), [0, 4])
+        self.assertEqual(store.accuracy_by_note("grace"), {})
+
+        [(_, game, accuracy)] = store.sessions("ada")
+        self.assertEqual((game, accuracy.attempts), ("playnotes", 3))
+        store.close()
+
+    def test_time_window(self):
+        store = ResultStore(self.path)
+        store.record("ada", "staffwars", 1, 60, True)
+        middle = time.time()
+        time.sleep(0.01)
+        store.record("ada", "staffwars", 2, 60, False)
+
+        self.assertEqual(store.accuracy_by_note("ada", until=middle)[60].correct, 1)
+        self.assertEqual(store.accuracy_by_note("ada", since=middle)[60].correct, 0)
+        store.close()
+
+    def test_batches_survive_reopening(self):
+        store = ResultStore(self.path, flush_interval=60, batch_size=10)
+
+        for i in range(25):
+            store.record("ada", "staffwars", 1, 48 + i % 12, i % 2 == 0)
+
+        store.close()
+
+        store = ResultStore(self.path)
+        self.assertEqual(sum(accuracy.attempts for accuracy in store.accuracy_by_note("ada").values()), 25)
+        store.close()
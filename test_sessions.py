@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+from midi_input import FakeMidiInput
+from sessions import SessionHost
+
+
+class TestSessionHost(unittest.IsolatedAsyncioTestCase):
+    async def test_sessions_are_isolated(self):
+        host = SessionHost(fps=30)
+        device = FakeMidiInput()
+        first = host.add("staffwars", device)
+        second = host.add("staffwars")
+        # both games spawn their first note, then the press comes later than that
+        # on the millisecond device clock
+        await asyncio.sleep(0.01)
+
+        first_pool = first.game.game_module.pool
+        second_pool = second.game.game_module.pool
+
+        self.assertIsNot(first_pool, second_pool)
+
+        device.feed([[0x90, int(first_pool.pitch[first_pool.oldest()]), 100, 0]])
+        stats = await host.run(0.3)
+
+        self.assertEqual(len(first_pool), 0)
+        self.assertEqual(len(second_pool), 1)
+        self.assertEqual(stats.events_fired, 1)
+        self.assertGreater(first.rendered_frames, 1)
+
+    async def test_games_update_without_rendering(self):
+        host = SessionHost(fps=30, render_every=0)
+        device = FakeMidiInput()
+        session = host.add("staffwars", device)
+        await asyncio.sleep(0.01)
+
+        staffwars = session.game.game_module
+        device.feed([[0x90, int(staffwars.pool.pitch[staffwars.pool.oldest()]), 100, 0]])
+        stats = await host.run(0.3)
+
+        self.assertEqual(staffwars.hits, 1)
+        self.assertEqual(stats.rendered_frames, 0)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+import pygame
+from context import Context
+from events import KeyEvent
+from game_loader import Game
+from simulation import VirtualClockLoop, load_script, simulate
+
+
+class TestVirtualClockLoop(unittest.TestCase):
+    def test_sleep_is_instant(self):
+        loop = VirtualClockLoop()
+
+        async def sleeper():
+            await asyncio.sleep(1000)
+            return loop.time()
+
+        start = time.perf_counter()
+
+        try:
+            self.assertGreaterEqual(loop.run_until_complete(sleeper()), 1000)
+        finally:
+            loop.close()
+
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+class TestSimulate(unittest.TestCase):
+    def test_staffwars_session(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# time key velocity pressing\n1.0 60 100 1\n1.5 60 0 0\n")
+
+        try:
+            script = load_script(f.name)
+        finally:
+            os.remove(f.name)
+
+        result = simulate("staffwars", script, duration=30, render_every=10, fps=30)
+
+        self.assertEqual(result.events_fired, 2)
+        self.assertEqual(result.frames, 900)
+        self.assertEqual(result.rendered_frames, 90)
+        self.assertLess(result.wall_seconds, 30)
+
+
+class TestStaffwarsScoring(unittest.TestCase):
+    def test_presses_are_judged_by_their_timestamp(self):
+        loop = VirtualClockLoop()
+        game = Game("staffwars", isolated=True)
+        staffwars = game.game_module
+        ctx = Context(pygame.Surface((800, 600)))
+        ctx.device_clock = lambda: round(loop.time() * 1000)
+
+        async def play():
+            game.begin(ctx)
+            await asyncio.sleep(0)
+            first = staffwars.pool.oldest()
+            spawned = staffwars.pool.spawn_time[first]
+            game.update(ctx)
+
+            # pressed half a second before the note reaches the clef, but only
+            # dispatched after a two second frame in which the note passed it
+            pressed = spawned + staffwars.NOTE_TRAVEL_TIME - 0.5
+            await asyncio.sleep(pressed + 2 - loop.time())
+            ctx.fire_events(KeyEvent(int(staffwars.pool.pitch[first]), 100, True, round(pressed * 1000)))
+            game.update(ctx)
+
+            self.assertEqual((staffwars.hits, staffwars.misses, staffwars.score), (1, 0, round(staffwars.MAX_POINTS * 0.5 / staffwars.NOTE_TRAVEL_TIME)))
+
+            # pressed just after the next note passed the clef, before a frame expired it
+            second = staffwars.pool.oldest()
+            passed = staffwars.pool.spawn_time[second] + staffwars.NOTE_TRAVEL_TIME
+            await asyncio.sleep(passed + 0.1 - loop.time())
+            ctx.fire_events(KeyEvent(int(staffwars.pool.pitch[second]), 100, True, round((passed + 0.05) * 1000)))
+            game.update(ctx)
+
+            self.assertEqual((staffwars.hits, staffwars.misses), (1, 0))
+
+            await asyncio.sleep(staffwars.INPUT_GRACE)
+            game.update(ctx)
+
+            self.assertEqual((staffwars.hits, staffwars.misses), (1, 1))
+            game.stop(ctx)
+
+        try:
+            loop.run_until_complete(play())
+        finally:
+            loop.close()
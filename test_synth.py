@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# SDL's dummy driver plays into nothing, in real time
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import audio
+import synth
+
+
+class TestSynth(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.cache_dir)
+
+    def test_bank_is_cached(self):
+        synth.load_bank(synth.SAMPLE_RATE, self.cache_dir)
+        bank = synth.load_bank(synth.SAMPLE_RATE, self.cache_dir)
+
+        self.assertIsInstance(bank, np.memmap)
+        self.assertEqual(bank.shape, (128, int(synth.BANK_SECONDS * synth.SAMPLE_RATE)))
+
+    def test_unwritable_cache_falls_back_to_silence(self):
+        with mock.patch.object(synth, "load_bank", side_effect=PermissionError("read-only cache")):
+            self.assertIsInstance(audio._open_synth(), audio.NullOutput)
+
+    def test_mix_block(self):
+        output = synth.SynthOutput(cache_dir=self.cache_dir)
+        output.close() # mixed by hand below
+
+        output.note_on(69, 127)
+        self.assertGreater(np.abs(output.mix_block()).max(), 0)
+
+        output.note_off(69)
+
+        for _ in range(20):
+            output.mix_block()
+
+        self.assertEqual(output.active_voices(), 0)
+        self.assertEqual(np.abs(output.mix_block()).max(), 0)
+
+    def test_polyphony_limit(self):
+        output = synth.SynthOutput(max_voices=4, cache_dir=self.cache_dir)
+
+        try:
+            for note in range(60, 66):
+                output.note_on(note, 100)
+
+            time.sleep(0.1)
+
+            self.assertEqual(output.active_voices(), 4)
+            self.assertEqual(sorted(output.voice_note.tolist()), [62, 63, 64, 65])
+            self.assertEqual(len(output.note_latencies), 6)
+        finally:
+            output.close()